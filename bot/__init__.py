@@ -1,5 +1,6 @@
 from abc import ABC
 from decimal import Decimal
+from typing import Optional
 
 from lib.factory import AbstractFactory
 from lib.timer import AbstractTimer
@@ -25,7 +26,7 @@ class AbstractBot(ABC):
 
     def onStatus(self, orderId: str, status: str, price: Decimal, qty: Decimal, pct: Decimal,
                  symbol: str, exchange: str,
-                 timestamp: int, latency: int = 0):
+                 timestamp: int, latency: int = 0, tradeId: Optional[str] = None):
         pass
 
     def onOrderbook(self, askPrice: Decimal, askQty: Decimal, bidPrice: Decimal, bidQty: Decimal,
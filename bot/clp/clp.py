@@ -147,6 +147,8 @@ class CLP(HandleSpread, AbstractBot):
         # Get actual positions from Exchange
         ################################################################
         positions = self._exchange.getPosition()
+        self._exchange.reconcilePosition(positions)
+        self._last_reconcile: Optional[int] = None
 
         ################################################################
         # Build state from them: Empty/Inventory/From Repository
@@ -222,11 +224,16 @@ class CLP(HandleSpread, AbstractBot):
             self._timer.Sleep(1)
             os._exit(-1)
 
-        try:
-            if self._exchange._portfolio != self._state.get(KEY.QTY, 0):
-                print(f'IMBALANCE {self._exchange._portfolio} {self._state}')
-        except Exception as e:
-            print(e)
+        # Check position tracked from order statuses against exchange one (REST, so not too often)
+        if timestamp - (self._last_reconcile or 0) > DEFAULT.RECONCILE_SECONDS * KEY.ONE_SECOND:
+            self._last_reconcile = timestamp
+            try:
+                diff = self._exchange.reconcilePosition()
+                if abs(diff) > KEY.ED:
+                    self._logger.warning('IMBALANCE: tracked position is reset to exchange one', event='IMBALANCE',
+                                         diff=diff, state=self._state)
+            except Exception as e:
+                self._logger.error(f'Position reconciliation error: {e}', event='IMBALANCE')
 
 
     def onAccount(self, price: Decimal, qty: Decimal,
@@ -247,10 +254,10 @@ class CLP(HandleSpread, AbstractBot):
 
     def onStatus(self, orderId: str, status: str, price: Decimal, qty: Decimal, pct: Decimal,
                  symbol: str, exchange: str,
-                 timestamp: int, latency: int = 0):
-        super().onStatus(orderId, status, price, qty, pct, symbol, exchange, timestamp, latency)
+                 timestamp: int, latency: int = 0, tradeId: Optional[str] = None):
+        super().onStatus(orderId, status, price, qty, pct, symbol, exchange, timestamp, latency, tradeId)
 
-        self._exchange.updateOrder(orderId, status, price, qty, pct)
+        self._exchange.updateOrder(orderId, status, price, qty, pct, tradeId)
 
     def Clean(self):
         """
@@ -393,7 +400,6 @@ class CLP(HandleSpread, AbstractBot):
             item[KEY.WAS_UPDATE] = None
             item[KEY.BUY] = None
             item[KEY.SELL] = None
-            item[KEY.ORDER_ID] = []
             item[KEY.DISTANCE] = {KEY.BUY: None, KEY.SELL: None}
 
     def _build_spread(self, spread: dict) -> dict:
@@ -415,7 +421,6 @@ class CLP(HandleSpread, AbstractBot):
             item[KEY.WAS_UPDATE] = None
             item[KEY.BUY] = None
             item[KEY.SELL] = None
-            item[KEY.ORDER_ID] = []
             item[KEY.DISTANCE] = {KEY.BUY: None, KEY.SELL: None}
 
             # For legacy config handle single "qty" correctly
@@ -8,6 +8,11 @@ from lib.constants import KEY
 from lib.exchange import Book, AbstractExchange
 
 
+def _level_key(level_name: str, side: str) -> str:
+    # Order tracker level name for one side of quote level
+    return f'{level_name}.{side}'
+
+
 def handle_level(self, level_name: str, ask: Decimal, bid: Decimal, latency: int):
     exchange: AbstractExchange = self._exchange
 
@@ -68,13 +73,10 @@ def handle_level(self, level_name: str, ask: Decimal, bid: Decimal, latency: int
     holding_time = self._timer.Timestamp() - (level[KEY.WAS_UPDATE] or 0)
 
     if threshold == KEY.HYSTERESIS:
-        # Replace quotes
-        ids_buy = exchange.batchPost(buys)
-        ids_sell = exchange.batchPost(sells)
-        self._exchange.Cancel(level[KEY.ORDER_ID])
-
-        # Save ids
-        level[KEY.ORDER_ID] = [*ids_buy, *ids_sell]
+        # Replace quotes: old (still open) orders are amended in place where exchange supports it
+        for side, orders in [(KEY.BUY, buys), (KEY.SELL, sells)]:
+            ids = exchange.Replace(exchange.getLevelOrders(_level_key(level_name, side)), orders)
+            exchange.setLevelOrders(_level_key(level_name, side), ids)
 
         # Update new Level prices (inner)
         level[KEY.BUY], level[KEY.SELL] = buys[0].price, sells[0].price
@@ -107,9 +109,9 @@ def handle_level(self, level_name: str, ask: Decimal, bid: Decimal, latency: int
             level[KEY.PCT] = mix_qty(self.spread[level_name][KEY.PCT], Decimal(0.01))
 
     else:
-        self._exchange.Cancel(level[KEY.ORDER_ID])
-
-        level[KEY.ORDER_ID]= []
+        for side in [KEY.BUY, KEY.SELL]:
+            exchange.Cancel(exchange.getLevelOrders(_level_key(level_name, side)))
+            exchange.setLevelOrders(_level_key(level_name, side), [])
 
         self._logger.warning(f'Force Order replace for level "{level_name}": Cancel all')
 
@@ -124,9 +126,10 @@ def clear_quotes(self):
     for level_name, level in self._config[KEY.SPREAD].items():
         # First we should cancel all open orders
         self._logger.warning(f'Cancel open orders and reset Buy/Sell for level "{level_name}"')
-        # self._exchange.Cancel(level[KEY.ORDER_ID])
         level[KEY.BUY], level[KEY.SELL] = None, None
         level[KEY.WAS_UPDATE] = None
+        for side in [KEY.BUY, KEY.SELL]:
+            self._exchange.setLevelOrders(_level_key(level_name, side), [])
 
     # Cancel another one time because we could have new from async
     self._exchange.Cancel(wait=True)
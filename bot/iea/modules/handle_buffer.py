@@ -12,23 +12,12 @@ class HandleBuffer(AbstractBot):
 
         self._database: AbstractDatabase = factory.Database(config, factory, timer)
 
-        ################################################################
-        # Public variables
-        ################################################################
-        self._data_buffer = []
-
-    def onTime(self, timestamp: int):
-        super().onTime(timestamp)
-
-        if self._data_buffer:
-            self._database.writeEncoded(self._data_buffer)
-            self._data_buffer = []
-
     def putBuffer(self, fields: dict, tags: Optional[dict] = None):
-        self._data_buffer.append(
+        # Database writer batches lines for the whole process
+        self._database.writeEncoded([
             self._database.Encode(
                 fields=fields,
                 timestamp=self._timer.Timestamp(),
                 tags=tags,
             )
-        )
+        ])
@@ -1,7 +1,7 @@
 import math
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 
 from bot import AbstractBot
 from lib.constants import KEY
@@ -80,8 +80,8 @@ class HandleExchange(AbstractBot):
 
     def onStatus(self, orderId: str, status: str, price: Decimal, qty: Decimal, pct: Decimal,
                  symbol: str, exchange: str,
-                 timestamp: int, latency: int = 0):
-        super().onStatus(orderId, status, price, qty, pct, symbol, exchange, timestamp, latency)
+                 timestamp: int, latency: int = 0, tradeId: Optional[str] = None):
+        super().onStatus(orderId, status, price, qty, pct, symbol, exchange, timestamp, latency, tradeId)
 
         if (symbol, exchange) == (self.default_symbol, self.default_exchange):
-            self.products[KEY.DEFAULT].oms.updateOrder(orderId, status, price, qty, pct)
\ No newline at end of file
+            self.products[KEY.DEFAULT].oms.updateOrder(orderId, status, price, qty, pct, tradeId)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import math
 from decimal import Decimal
+from typing import Optional
 
 from bot import AbstractBot
 from bot.iea.modules.handle_exchange import HandleExchange, Product
@@ -65,8 +66,8 @@ class HandleHedgeExchange(HandleExchange, AbstractBot):
 
     def onStatus(self, orderId: str, status: str, price: Decimal, qty: Decimal, pct: Decimal,
                  symbol: str, exchange: str,
-                 timestamp: int, latency: int = 0):
-        super().onStatus(orderId, status, price, qty, pct, symbol, exchange, timestamp, latency)
+                 timestamp: int, latency: int = 0, tradeId: Optional[str] = None):
+        super().onStatus(orderId, status, price, qty, pct, symbol, exchange, timestamp, latency, tradeId)
 
         if (symbol, exchange) == (self.hedge_symbol, self.hedge_exchange):
-            self.products[KEY.HEDGE].oms.updateOrder(orderId, status, price, qty, pct)
\ No newline at end of file
+            self.products[KEY.HEDGE].oms.updateOrder(orderId, status, price, qty, pct, tradeId)
\ No newline at end of file
@@ -1,17 +1,36 @@
+"""
+Database writes for logs and bot metrics
+
+`start()` encodes line and queues it to the process-wide batching writer of
+database (see `lib.database.batch_writer`), so it runs in place: no thread
+or executor per log line or metric
+
+`RequestEjector` collects exchange request telemetry and writes it in batches
+from its own thread, so order requests never wait for database
+"""
 import json
+import os
 import threading
-from typing import Mapping
+import time
+from typing import Mapping, List, Tuple
 
 from lib.constants import LEVEL, KEY, DB
 from lib.database import AbstractDatabase
+from lib.defaults import DEFAULT
 from lib.helpers import custom_dump
 from lib.timer import AbstractTimer
 
+class AsyncEjector:
+    def start(self) -> None:
+        self.run()
+
+    def run(self) -> None:
+        pass
 
-class LogAsyncEjector(threading.Thread):
+
+class LogAsyncEjector(AsyncEjector):
     def __init__(self, database: AbstractDatabase, timer: AbstractTimer,
                  message: str, data: dict, level: str):
-        super().__init__()
         self._database = database
         self._timer = timer
         self._message = message
@@ -26,7 +45,7 @@ class LogAsyncEjector(threading.Thread):
 
         self._data[KEY.MESSAGE] = self._message
         try:
-            data = json.dumps(self._data, default=custom_dump).replace('"', '\\"')
+            data = json.dumps(self._data, default=custom_dump)
             payload = self._database.Encode(
                 fields={DB.MESSAGE: data},
                 timestamp=self._timer.Timestamp(),
@@ -37,9 +56,8 @@ class LogAsyncEjector(threading.Thread):
             print(f'{__file__}: {e}')
 
 
-class FieldsAsyncEjector(threading.Thread):
+class FieldsAsyncEjector(AsyncEjector):
     def __init__(self, database: AbstractDatabase, timer: AbstractTimer, **kwargs):
-        super().__init__()
         self._database = database
         self._timer = timer
         self._fields: Mapping[str, any] = kwargs
@@ -53,4 +71,75 @@ class FieldsAsyncEjector(threading.Thread):
 
             self._database.writeEncoded([payload])
         except Exception as e:
-            print(f'{__file__}: {e}')
\ No newline at end of file
+            print(f'{__file__}: {e}')
+
+class RequestEjector:
+    def __init__(self, database: AbstractDatabase, name: str = 'requests'):
+        self._database = database
+        self._name = name
+
+        self._pending: List[Tuple[dict, int, dict]] = []
+        self._dropped = 0
+
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def __getstate__(self) -> dict:
+        # Lock and thread belong to process, pending records are written by parent
+        return dict(database=self._database, name=self._name)
+
+    def __setstate__(self, state: dict):
+        self.__init__(**state)
+
+    def Add(self, event: dict, timestamp: int, **fields):
+        """
+        Queue request record: `event` (request and response) is written as json to `DB.REQUEST`
+        (cut to `REQUEST_LOG_MAX_CHARS`), `fields` as is. Record is dropped when queue is full
+
+        Note: `event` is encoded later in background thread, don't change it after call
+        """
+        with self._lock:
+            if len(self._pending) >= DEFAULT.REQUEST_LOG_MAX_PENDING:
+                self._dropped += 1
+                return
+
+            self._pending.append((event, timestamp, fields))
+
+        if self._pid != os.getpid():
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, name=f'{self._name}-ejector', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(DEFAULT.REQUEST_LOG_FLUSH_SECONDS)
+
+            with self._lock:
+                pending, self._pending = self._pending, []
+                dropped, self._dropped = self._dropped, 0
+
+            if not pending:
+                continue
+
+            try:
+                payload = self._database.EncodeMany([self._get_fields(*x) for x in pending])
+
+                if dropped:
+                    payload.append(self._database.Encode(fields={DB.REQUEST_DROPPED: dropped},
+                                                         timestamp=pending[-1][1]))
+
+                self._database.writeEncoded(payload)
+            except Exception as e:
+                print(f'{__file__}: {e}')
+
+    @staticmethod
+    def _get_fields(event: dict, timestamp: int, fields: dict) -> Tuple[dict, int]:
+        message = json.dumps(event, default=custom_dump)
+        if len(message) > DEFAULT.REQUEST_LOG_MAX_CHARS:
+            message = f'{message[:DEFAULT.REQUEST_LOG_MAX_CHARS]}...'
+
+        return {**fields, DB.REQUEST: message}, timestamp
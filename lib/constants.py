@@ -84,6 +84,21 @@ class DB:
     REQUEST_ORDER = "_request_order"
     REQUEST_ORDER10S = "_request_order10s"
     REQUEST_USED = "_request_used"
+    REQUEST_DROPPED = "_request_dropped"
+
+    CONFLATED = "_conflated"
+
+    EXECUTOR_SUBMITTED = "_executor_submitted"
+    EXECUTOR_REJECTED = "_executor_rejected"
+    EXECUTOR_PENDING = "_executor_pending"
+    EXECUTOR_MAX_PENDING = "_executor_max_pending"
+    EXECUTOR_MAX_WAIT = "_executor_max_wait"
+
+    WRITE_DROPPED = "_write_dropped"
+    SPOOL_SPOOLED = "_spool_spooled"
+    SPOOL_REPLAYED = "_spool_replayed"
+    SPOOL_DROPPED = "_spool_dropped"
+    SPOOL_BYTES = "_spool_bytes"
 
     MIN_DELTA = "_min_replace_delta"
     MAX_DELTA = "_max_replace_delta"
@@ -115,6 +130,7 @@ class KEY:
     NODE_URL = "node_url"
     REST_URL = "rest_url"
     WSS_URL = "wss_url"
+    WS_ORDER_URL = "ws_order_url"
     API_LIMIT = "api_limit"
     KEY = "key"
     SECRET = "secret"
@@ -207,6 +223,13 @@ class KEY:
     PASSWORD = "password"
     MEASUREMENT = "measurement"
 
+    ########## Recorder Keys
+    RECORDER = "recorder"
+    PATH = "path"
+    FORMAT = "format"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
     STOPLOSS_COEFF = "stoploss_coeff"
 
     TRAILING_PROFIT = "trailing_profit"
@@ -252,6 +275,7 @@ class KEY:
     POST = "POST"
     GET = "GET"
     DELETE = "DELETE"
+    PUT = "PUT"
 
     STATUS = "status"
 
@@ -386,6 +410,21 @@ class KEY:
     LIVE = "live"
     MIN_ROC = "min_roc"
 
+    CONFLATION = "conflation"
+
+    TRANSPORT = "transport"
+    RING = "ring"
+    SIZE = "size"
+
+    TRACE = "trace"
+
+    ENGINE = "engine"
+    ASYNC = "async"
+
+    ORDER_BOOK = "order_book"
+
+    HTTP_POOL_SIZE = "http_pool_size"
+
 
 class LEVEL:
     TRACE = "trace"  # light blue
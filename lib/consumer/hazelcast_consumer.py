@@ -7,10 +7,11 @@ from typing import List
 import hazelcast
 from hazelcast.proxy.base import TopicMessage
 
-from lib.constants import KEY, QUEUE
+from lib.constants import KEY
 from lib.consumer import AbstractConsumer
+from lib.event import MessageEvent
 from lib.factory import AbstractFactory
-from lib.helpers import custom_load, custom_dump
+from lib.helpers import custom_load
 from lib.logger import AbstractLogger
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
@@ -96,12 +97,11 @@ class HazelcastConsumer(AbstractConsumer):
         try:
             payload = json.loads(event.message, object_hook=custom_load)
             self._supervisor.Queue.put(
-                {
-                    QUEUE.QUEUE: QUEUE.MESSAGE,
-                    KEY.PAYLOAD: json.dumps(payload[KEY.PAYLOAD], default=custom_dump),
-                    KEY.TIMESTAMP: payload[KEY.TIMESTAMP],
-                    KEY.LATENCY: self._timer.Timestamp() - payload[KEY.TIMESTAMP],
-                }
+                MessageEvent(
+                    payload=payload[KEY.PAYLOAD],
+                    timestamp=payload[KEY.TIMESTAMP],
+                    latency=self._timer.Timestamp() - payload[KEY.TIMESTAMP],
+                )
             )
         except Exception as e:
             self._logger.error(
@@ -1,11 +1,14 @@
+import json
 import uuid
 
 import pika
 from pika.exchange_type import ExchangeType
 
-from lib.constants import KEY, QUEUE
+from lib.constants import KEY
 from lib.consumer import AbstractConsumer
+from lib.event import MessageEvent
 from lib.factory import AbstractFactory
+from lib.helpers import custom_load
 from lib.logger import AbstractLogger
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
@@ -69,10 +72,13 @@ class RabbitConsumer(AbstractConsumer):
                 self._logger.error(f'Error MQ connection: {e}. No MQ messages')
 
     def _on_message(self, chan, method_frame, header_frame, body):
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.MESSAGE,
-            KEY.PAYLOAD: body,
-        })
+        try:
+            self._supervisor.Queue.put(MessageEvent(
+                payload=json.loads(body, object_hook=custom_load),
+                timestamp=self._timer.Timestamp(),
+            ))
+        except Exception as e:
+            self._logger.error(f'Error receiving message: {body} with exception {e}')
         chan.basic_ack(delivery_tag=method_frame.delivery_tag)
 
 
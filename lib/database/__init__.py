@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Mapping
+from typing import Optional, Mapping, Iterable, List, Tuple
 
 from lib.factory import AbstractFactory
 from lib.timer import AbstractTimer
@@ -15,6 +15,13 @@ class AbstractDatabase(ABC):
     def Encode(self, fields: Mapping[str, any], timestamp: int, tags: Optional[Mapping[str, any]] = None):
         pass
 
+    def EncodeMany(self, items: Iterable[Tuple[Mapping[str, any], int]],
+                   tags: Optional[Mapping[str, any]] = None) -> List[str]:
+        """
+        Encode (fields, timestamp) pairs with the same tags
+        """
+        return [self.Encode(fields, timestamp, tags) for fields, timestamp in items]
+
     @abstractmethod
     def writeEncoded(self, data: list):
         pass
@@ -0,0 +1,193 @@
+"""
+Process-wide batching writer for database line protocol
+
+Every database instance (logger, state, exchange, stream, ...) of the same
+target shares one writer, `Add` only appends lines under lock. One daemon thread
+per process writes them:
+
+  - every `flush_seconds` or as soon as `batch_size` lines are pending
+
+  - at most `batch_size` lines per request
+
+  - failed lines go to disk spool (see `lib.database.spool`) and are replayed
+    in large batches once database is back; without spool they are kept in
+    memory, but never more than `max_pending` lines: oldest are dropped
+
+  - spool/drop counters are written as metrics (`encode` makes line of them)
+
+`flush_all` writes everything synchronously, it is called from `Watchdog`
+on shutdown and at interpreter exit.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from lib.constants import DB
+from lib.database.spool import Spool
+from lib.defaults import DEFAULT
+
+# Spool counters --> metric fields
+SPOOL_FIELDS = {
+    'spooled': DB.SPOOL_SPOOLED,
+    'replayed': DB.SPOOL_REPLAYED,
+    'dropped': DB.SPOOL_DROPPED,
+    'bytes': DB.SPOOL_BYTES,
+}
+
+
+class BatchWriter:
+    def __init__(self, write: Callable[[List[str]], None], name: str = 'db',
+                 batch_size: int = DEFAULT.DB_BATCH_SIZE,
+                 flush_seconds: float = DEFAULT.DB_FLUSH_SECONDS,
+                 max_pending: int = DEFAULT.DB_MAX_PENDING,
+                 spool: Optional[Spool] = None, encode: Optional[Callable[[dict], str]] = None):
+        """
+        :param write: sends lines to database, raises on error
+        :param spool: keeps failed lines on disk
+        :param encode: metric fields --> line
+        """
+        self._write = write
+        self._spool = spool
+        self._encode = encode
+        self._name = name
+        self._batch_size = batch_size
+        self._flush_seconds = flush_seconds
+        self._max_pending = max_pending
+
+        self._pending: List[str] = []
+        self._dropped = 0
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time (thread and shutdown)
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    def Add(self, lines: List[str]):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+
+            free = self._max_pending - len(self._pending)
+            if len(lines) > free:
+                self._dropped += len(lines) - max(free, 0)
+                lines = lines[:max(free, 0)]
+
+            self._pending.extend(lines)
+
+            if len(self._pending) >= self._batch_size:
+                self._wakeup.set()
+
+    def Flush(self) -> bool:
+        """
+        Write all pending lines
+
+        :return: False if database write failed (lines are kept)
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                dropped, self._dropped = self._dropped, 0
+
+            if dropped:
+                sys.stderr.write(f'{self._name} writer: {dropped} lines dropped\n')
+                if self._encode is not None:
+                    pending.append(self._encode({DB.WRITE_DROPPED: dropped}))
+
+            for idx in range(0, len(pending), self._batch_size):
+                try:
+                    self._write(pending[idx:idx + self._batch_size])
+                except Exception as e:
+                    sys.stderr.write(f'{self._name} writer: {e}\n')
+                    self._keep(pending[idx:])
+                    return False
+
+            return True
+
+    def Replay(self) -> bool:
+        """
+        Write spooled lines (up to `DB_SPOOL_REPLAY_SEGMENTS` segments) and report spool counters
+
+        :return: False if database write failed
+        """
+        if self._spool is None:
+            return True
+
+        try:
+            for _ in range(DEFAULT.DB_SPOOL_REPLAY_SEGMENTS):
+                if not self._spool.Replay(self._write, self._batch_size):
+                    break
+        except Exception as e:
+            sys.stderr.write(f'{self._name} writer: replay: {e}\n')
+            return False
+
+        stats = self._spool.getStats()
+        if self._encode is not None and any(stats.values()):
+            self.Add([self._encode({SPOOL_FIELDS[key]: value for key, value in stats.items()})])
+
+        return True
+
+    def _keep(self, lines: List[str]):
+        if self._spool is not None:
+            try:
+                self._spool.Append(lines)
+                return
+            except Exception as e:
+                sys.stderr.write(f'{self._name} writer: spool: {e}\n')
+
+        # Failed lines go before new ones, oldest are dropped above max_pending
+        with self._lock:
+            self._pending = lines + self._pending
+            if len(self._pending) > self._max_pending:
+                self._dropped += len(self._pending) - self._max_pending
+                self._pending = self._pending[-self._max_pending:]
+
+    def _start(self):
+        # Lines inherited from parent process are written by parent
+        self._pending, self._dropped = [], 0
+        self._wakeup = threading.Event()
+        threading.Thread(target=self._run, name=f'{self._name}-writer', daemon=True).start()
+        self._pid = os.getpid()
+
+    def _run(self):
+        wakeup = self._wakeup
+        while True:
+            wakeup.wait(self._flush_seconds)
+            wakeup.clear()
+
+            if not (self.Flush() and self.Replay()):
+                # Database is down: no retry storm on every new batch
+                time.sleep(self._flush_seconds)
+
+
+_writers: Dict[str, BatchWriter] = dict()
+_lock = threading.Lock()
+
+
+def get_writer(name: str, write: Callable[[List[str]], None], spool: Optional[Callable[[], Spool]] = None,
+               encode: Optional[Callable[[dict], str]] = None) -> BatchWriter:
+    """
+    :param name: target (database url + name), one writer per target in process
+    :param write: used (with `spool` and `encode`) only when writer is created
+    :param spool: creates disk spool for new writer
+    """
+    writer = _writers.get(name, None)
+    if writer is not None:
+        return writer
+
+    with _lock:
+        writer = _writers.get(name, None)
+        if writer is None:
+            writer = _writers[name] = BatchWriter(write, name=name, spool=spool() if spool is not None else None,
+                                                  encode=encode)
+        return writer
+
+
+def flush_all():
+    for writer in list(_writers.values()):
+        writer.Flush()
+
+
+atexit.register(flush_all)
@@ -1,11 +1,16 @@
 import json
-import traceback
+import os
+import tempfile
+import threading
 from decimal import Decimal
-from typing import Mapping, Optional
+from typing import Any, Callable, Collection, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
 
 from influxdb import InfluxDBClient
 from lib.constants import KEY
+from lib.defaults import DEFAULT
 from lib.database import AbstractDatabase
+from lib.database.batch_writer import BatchWriter, get_writer
+from lib.database.spool import Spool
 from lib.factory import AbstractFactory
 from lib.helpers import custom_load
 from lib.timer import AbstractTimer
@@ -15,6 +20,121 @@ DEFAULT_DATABASE = "DEFAULT_DATABASE"
 DEFAULT_SYMBOL = "DEFAULT_SYMBOL"
 DEFAULT_EXCHANGE = "DEFAULT_EXCHANGE"
 
+SPOOL_DIR = os.path.join(tempfile.gettempdir(), "spool")
+
+HEADER_CACHE_SIZE = 10_000  # Headers per distinct tag values
+
+# Line protocol escaping: measurement, tag keys/values and field keys, string field values
+MEASUREMENT_ESCAPE = str.maketrans({",": "\\,", " ": "\\ "})
+KEY_ESCAPE = str.maketrans({",": "\\,", "=": "\\=", " ": "\\ "})
+STRING_ESCAPE = str.maketrans({'"': '\\"', "\\": "\\\\"})
+
+
+def _escape_measurement(value: str) -> str:
+    return value.translate(MEASUREMENT_ESCAPE)
+
+
+def _escape_key(value: str) -> str:
+    return value.translate(KEY_ESCAPE)
+
+
+def _format_string(value: Any) -> str:
+    return f'"{str(value).translate(STRING_ESCAPE)}"'
+
+
+# Written as is by f-string. Note: int has no "i" suffix (float field), as it always was:
+# changing field type breaks writes to existing measurements
+PLAIN_TYPES = frozenset([float, int, bool])
+
+# Other field value formatters by exact type
+FORMATTERS: Dict[type, Callable[[Any], str]] = {
+    Decimal: lambda value: repr(float(value)),
+    str: _format_string,
+}
+
+
+def _format_other(value: Any) -> str:
+    # Subclasses (numpy numbers, enums, ...)
+    if isinstance(value, bool):
+        return str(value)
+    elif isinstance(value, int):
+        return str(int(value))
+    elif isinstance(value, (float, Decimal)):
+        return repr(float(value))
+    else:
+        return _format_string(value)
+
+
+_keys: Dict[str, str] = dict()  # Escaped field keys, same keys come again and again
+
+
+def _get_key(key: str) -> str:
+    escaped = _keys.get(key, None)
+    if escaped is None:
+        escaped = _escape_key(key)
+        if len(_keys) < HEADER_CACHE_SIZE:
+            _keys[key] = escaped
+    return escaped
+
+
+def _encode_fields(fields: Mapping[str, Any], skip: Collection[str] = ()) -> str:
+    # float/int/bool are formatted by f-string itself, others with formatter by type
+    keys, get_formatter = _keys, FORMATTERS.get
+    return ",".join([
+        f"{keys.get(key) or _get_key(key)}="
+        f"{value if type(value) in PLAIN_TYPES else get_formatter(type(value), _format_other)(value)}"
+        for key, value in fields.items() if value is not None and key not in skip
+    ])
+
+
+# One client (HTTP connection pool) per connection settings in process, see `get_client`
+_clients: Dict[str, InfluxDBClient] = dict()
+_clients_pid: Optional[int] = None
+_databases: Set[Tuple[str, str]] = set()  # (client key, database) known to exist
+_lock = threading.Lock()
+
+
+def get_client_key(settings: Mapping[str, Any]) -> str:
+    """
+    Connection settings --> registry key. Database is not a connection setting:
+    requests pass it explicitly, so all databases on server share one client
+    """
+    return json.dumps({k: v for k, v in settings.items() if k != KEY.DATABASE}, sort_keys=True, default=str)
+
+
+def get_client(settings: Mapping[str, Any], key: Optional[str] = None) -> InfluxDBClient:
+    """
+    Shared client for connection settings (gzip request body, write timeout by default).
+    Process gets its own clients: pooled sockets are never used by two processes after fork
+    """
+    global _clients_pid
+
+    key = key or get_client_key(settings)
+
+    with _lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+
+        client = _clients.get(key, None)
+        if client is None:
+            client = _clients[key] = InfluxDBClient(**{
+                "gzip": True, "timeout": DEFAULT.DB_WRITE_TIMEOUT_SECONDS,
+                **{k: v for k, v in settings.items() if k != KEY.DATABASE},
+            })
+        return client
+
+
+def _check_database(key: str, client: InfluxDBClient, database: str):
+    # Once per process and database, on first request (not when instance is created)
+    if (key, database) in _databases:
+        return
+
+    if database not in [x["name"] for x in client.get_list_database()]:
+        client.create_database(database)
+
+    _databases.add((key, database))
+
 
 class InfluxDb(AbstractDatabase):
     def __init__(self, config: dict, factory: AbstractFactory, timer: AbstractTimer):
@@ -31,66 +151,88 @@ class InfluxDb(AbstractDatabase):
         influx_settings = self._config.get(KEY.INFLUX_DB, {})
         self._database = influx_settings.get(KEY.DATABASE, DEFAULT_DATABASE)
 
-        # Pre-create header to speed-up operations
-        self._header = f"{self._table},exchange={self._exchange},symbol={self._symbol}"
-
-        # Open database connection
-        self._client = InfluxDBClient(**influx_settings)
-        if self._database not in [
-            database["name"] for database in self._client.get_list_database()
-        ]:
-
-            self._client.create_database(self._database)
+        # Pre-create headers to speed-up operations: default one and per tag set
+        self._headers: Dict[Tuple[Tuple[str, Any], ...], str] = dict()
+        self._header = self._get_header(())
+
+        # No request here: client is shared and database is checked/created on first write or read
+        self._settings = influx_settings
+        self._client_key = get_client_key(influx_settings)
+
+        # All instances writing to the same database share one batching writer (see `_get_writer`),
+        # lines which could not be written wait in spool on disk
+        host, port = influx_settings.get("host", "localhost"), influx_settings.get("port", 8086)
+        self._writer_name = f"influx://{host}:{port}/{self._database}"
+        self._spool_directory = os.path.join(SPOOL_DIR, f"{host}_{port}_{self._database}")
+
+    def Encode(self, fields: Mapping[str, Any], timestamp: int,
+               tags: Optional[Union[Iterable[str], Mapping[str, Any]]] = None) -> str:
+        """
+        :param tags: tag names taken from `fields`, or mapping tag --> value.
+                     Default exchange/symbol tags are added if not given
+        """
+        if tags:
+            if isinstance(tags, dict):
+                header = self._get_header(tuple(tags.items()))
+            else:
+                header = self._get_header(tuple([(tag, fields[tag]) for tag in tags]))
+            body = _encode_fields(fields, skip=tags)
+        else:
+            header, body = self._header, _encode_fields(fields)
 
-    def _create_header(self, tags: Mapping[str, any]) -> str:
-        tags_as_str = ",".join([f"{key}={value}" for key, value in tags.items()])
-        return f"{self._table},{tags_as_str}"
+        return f"{header} {body} {int(timestamp)}"
 
-    # NOTE: Code is pretty UNSAFE in order to speed-uo
-    def Encode(self, fields: Mapping[str, any], timestamp: int, tags: list = []):
+    def EncodeMany(self, items: Iterable[Tuple[Mapping[str, Any], int]],
+                   tags: Optional[Union[Iterable[str], Mapping[str, Any]]] = None) -> List[str]:
+        return [self.Encode(fields, timestamp, tags) for fields, timestamp in items]
 
-        fields = fields.copy()
+    def _get_header(self, tags: Tuple[Tuple[str, Any], ...]) -> str:
+        header = self._headers.get(tags, None)
+        if header is None:
+            names = {tag for tag, _ in tags}
+            defaults = [(tag, value) for tag, value in [("exchange", self._exchange), ("symbol", self._symbol)]
+                        if tag not in names]
 
-        def fn(value):
-            if isinstance(value, bool):
-                return value
-            elif isinstance(value, int):
-                return f"{value}"
-            elif isinstance(value, Decimal):
-                return float(value)
-            elif isinstance(value, float):
-                return value
-            else:
-                return f'"{str(value)}"'
+            header = ",".join([
+                _escape_measurement(self._table),
+                *[f"{_escape_key(tag)}={_escape_key(str(value))}" for tag, value in [*defaults, *tags]],
+            ])
 
-        header = f"{self._table}"
-        if "exchange" not in tags:
-            header += f",exchange={self._exchange}"
-        if "symbol" not in tags:
-            header += f",symbol={self._symbol}"
+            if len(self._headers) >= HEADER_CACHE_SIZE:
+                self._headers.clear()
+            self._headers[tags] = header
 
-        for tag in tags:
-            header += f",{tag}={fields[tag]}"
-            fields.pop(tag)
+        return header
 
-        body = ",".join(
-            [f"{key}={fn(value)}" for key, value in fields.items() if value is not None]
+    def writeEncoded(self, data: list):
+        # Only queued here: background writer sends batches (and retries them)
+        self._get_writer().Add(data)
+        return {
+            "ok": True,
+        }
+
+    def _get_writer(self) -> BatchWriter:
+        # Looked up instead of kept in instance: instance (with stream, logger, ...) is pickled
+        # to spawned process, which gets writer of its own
+        return get_writer(self._writer_name, self._write, spool=self._create_spool, encode=self._encode_metrics)
+
+    def _create_spool(self) -> Spool:
+        return Spool(
+            directory=self._spool_directory,
+            segment_bytes=DEFAULT.DB_SPOOL_SEGMENT_BYTES,
+            max_bytes=DEFAULT.DB_SPOOL_MAX_BYTES,
         )
 
-        return f"{header} {body} {int(timestamp)}"
+    def _encode_metrics(self, fields: dict) -> str:
+        return self.Encode(fields, timestamp=self._timer.Timestamp())
 
-    def writeEncoded(self, data: list):
-        try:
-            self._client.write(data, params=dict(db=self._database), protocol="line")
-            return {
-                "ok": True,
-            }
-        except Exception as e:
-            return {
-                "ok": False,
-                "exception": e,
-                "traceback": traceback.format_exc(),
-            }
+    def _get_client(self) -> InfluxDBClient:
+        client = get_client(self._settings, key=self._client_key)
+        _check_database(self._client_key, client, self._database)
+        return client
+
+    def _write(self, data: list):
+        self._get_client().write(data, params=dict(db=self._database), protocol="line")
 
     def readLast(self, field: str):
         query = (
@@ -99,7 +241,7 @@ class InfluxDb(AbstractDatabase):
             f"order by time desc limit 1"
         )
 
-        reply = self._client.query(query)
+        reply = self._get_client().query(query, database=self._database)
 
         for item in reply.get_points():
             data = item[field]
@@ -0,0 +1,234 @@
+"""
+Columnar market data recorder (Parquet or Arrow IPC)
+
+Streams pass every published event to `Add`, book/trade/candle/level events are
+kept as rows in memory and one daemon thread per process writes them:
+
+  - every `flush_seconds` or as soon as `max_rows` rows are pending
+
+  - one file per event kind and hour of event timestamp per flush, hive partitioned:
+    `{path}/{kind}/date=YYYY-MM-DD/hour=HH/{pid}-{time_ns}.{format}`
+
+  - timestamps are int64 ns, symbol/exchange/side are dictionary encoded,
+    prices and quantities are float64 (levels: list of [price, qty])
+
+  - files are written under temp name and renamed, readers never see half-written file
+
+Other events (account, status, messages) are not market data and are skipped.
+`flush_all` writes everything synchronously (shutdown and interpreter exit).
+Requires `pyarrow` only when recorder is configured.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from lib.constants import KEY, DB
+from lib.defaults import DEFAULT
+from lib.event import BookEvent, TradeEvent, CandleEvent, LevelEvent
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+except ImportError:
+    pa = pq = None
+
+BOOK = 'book'
+TRADE = 'trade'
+CANDLE = 'candle'
+LEVEL = 'level'
+
+# Columns per kind, in row order (see `_row`)
+COLUMNS = {
+    BOOK: (KEY.TIMESTAMP, KEY.SYMBOL, KEY.EXCHANGE,
+           KEY.ASK_PRICE, KEY.ASK_QTY, KEY.BID_PRICE, KEY.BID_QTY, DB.BOOK_LATENCY),
+    TRADE: (KEY.TIMESTAMP, KEY.SYMBOL, KEY.EXCHANGE,
+            KEY.PRICE, KEY.QTY, KEY.SIDE, DB.TRADE_LATENCY),
+    CANDLE: (KEY.TIMESTAMP, KEY.SYMBOL, KEY.EXCHANGE,
+             KEY.OPEN, KEY.HIGH, KEY.LOW, KEY.CLOSE, KEY.VOLUME, KEY.FINISHED),
+    LEVEL: (KEY.TIMESTAMP, KEY.SYMBOL, KEY.EXCHANGE,
+            KEY.ASKS, KEY.BIDS, DB.BOOK_LATENCY),
+}
+
+DICTIONARY_COLUMNS = {KEY.SYMBOL, KEY.EXCHANGE, KEY.SIDE}
+
+COMPRESSION = 'zstd'
+
+
+def _types() -> Dict[str, 'pa.DataType']:
+    levels = pa.list_(pa.list_(pa.float64()))
+    return {
+        KEY.TIMESTAMP: pa.int64(), DB.BOOK_LATENCY: pa.int64(), DB.TRADE_LATENCY: pa.int64(),
+        KEY.SYMBOL: pa.string(), KEY.EXCHANGE: pa.string(), KEY.SIDE: pa.string(),
+        KEY.FINISHED: pa.bool_(), KEY.ASKS: levels, KEY.BIDS: levels,
+    }
+
+
+def get_partition(path: str, kind: str, hour: int) -> str:
+    """
+    Directory of event kind for hour (timestamp // ONE_HOUR)
+    """
+    moment = datetime.fromtimestamp(hour * KEY.ONE_HOUR // KEY.ONE_SECOND, tz=timezone.utc)
+    return os.path.join(path, kind, f'date={moment:%Y-%m-%d}', f'hour={moment:%H}')
+
+
+def _levels(levels) -> List[List[float]]:
+    return [[price, qty] for price, qty in levels.asFloats()]
+
+
+def _row(event) -> Tuple[Optional[str], tuple]:
+    """
+    Return (kind, row) of market data event, kind is None for other events
+    """
+    kind = type(event)
+
+    if kind is BookEvent:
+        return BOOK, (event.timestamp, event.symbol, event.exchange,
+                      float(event.ask_price), float(event.ask_qty),
+                      float(event.bid_price), float(event.bid_qty), event.latency)
+
+    if kind is TradeEvent:
+        return TRADE, (event.timestamp, event.symbol, event.exchange,
+                       float(event.price), float(event.qty), event.side, event.latency)
+
+    if kind is CandleEvent:
+        return CANDLE, (event.timestamp, event.symbol, event.exchange,
+                        float(event.open), float(event.high), float(event.low), float(event.close),
+                        float(event.volume), event.finished)
+
+    if kind is LevelEvent:
+        return LEVEL, (event.timestamp, event.symbol, event.exchange,
+                       _levels(event.asks), _levels(event.bids), event.latency)
+
+    return None, ()
+
+
+class Recorder:
+    def __init__(self, path: str, fmt: str = KEY.PARQUET,
+                 flush_seconds: float = DEFAULT.RECORDER_FLUSH_SECONDS,
+                 max_rows: int = DEFAULT.RECORDER_MAX_ROWS):
+        """
+        :param path: root directory of dataset
+        :param fmt: `parquet` or `arrow` (IPC file)
+        """
+        if pa is None:
+            raise ImportError('Market data recorder requires pyarrow')
+
+        if fmt not in (KEY.PARQUET, KEY.ARROW):
+            raise ValueError(f'Unknown recorder format: {fmt}')
+
+        self._path = path
+        self._format = fmt
+        self._flush_seconds = flush_seconds
+        self._max_rows = max_rows
+
+        self._types = _types()
+
+        # (kind, hour) --> rows
+        self._pending: Dict[Tuple[str, int], List[tuple]] = defaultdict(list)
+        self._rows = 0
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    def Add(self, event):
+        kind, row = _row(event)
+        if kind is None:
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+
+            self._pending[(kind, event.timestamp // KEY.ONE_HOUR)].append(row)
+            self._rows += 1
+
+            if self._rows >= self._max_rows:
+                self._wakeup.set()
+
+    def Flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(list)
+                self._rows = 0
+
+            for (kind, hour), rows in pending.items():
+                try:
+                    self._write(kind, hour, rows)
+                except Exception as e:
+                    # Disk is full or not writable: market data is lost, bot keeps running
+                    sys.stderr.write(f'recorder: {kind}: {len(rows)} rows dropped: {e}\n')
+
+    def _write(self, kind: str, hour: int, rows: List[tuple]):
+        table = self._table(kind, rows)
+
+        directory = get_partition(self._path, kind, hour)
+        os.makedirs(directory, exist_ok=True)
+
+        path = os.path.join(directory, f'{os.getpid()}-{time.time_ns()}.{self._format}')
+        temp_path = f'{path}.tmp'
+
+        if self._format == KEY.PARQUET:
+            pq.write_table(table, temp_path, compression=COMPRESSION)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+            with pa.OSFile(temp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+
+        os.replace(temp_path, path)
+
+    def _table(self, kind: str, rows: List[tuple]) -> 'pa.Table':
+        arrays = []
+        for name, values in zip(COLUMNS[kind], zip(*rows)):
+            array = pa.array(values, type=self._types.get(name, pa.float64()))
+            arrays.append(array.dictionary_encode() if name in DICTIONARY_COLUMNS else array)
+
+        return pa.Table.from_arrays(arrays, names=list(COLUMNS[kind]))
+
+    def _start(self):
+        # Rows inherited from parent process are written by parent
+        self._pending, self._rows = defaultdict(list), 0
+        self._wakeup = threading.Event()
+        threading.Thread(target=self._run, name='recorder', daemon=True).start()
+        self._pid = os.getpid()
+
+    def _run(self):
+        wakeup = self._wakeup
+        while True:
+            wakeup.wait(self._flush_seconds)
+            wakeup.clear()
+            self.Flush()
+
+
+_recorders: Dict[str, Recorder] = dict()
+_lock = threading.Lock()
+
+
+def get_recorder(path: str, fmt: str = KEY.PARQUET) -> Recorder:
+    """
+    One recorder per dataset path in process (all streams of service share it)
+    """
+    recorder = _recorders.get(path, None)
+    if recorder is not None:
+        return recorder
+
+    with _lock:
+        recorder = _recorders.get(path, None)
+        if recorder is None:
+            recorder = _recorders[path] = Recorder(path, fmt)
+        return recorder
+
+
+def flush_all():
+    for recorder in list(_recorders.values()):
+        recorder.Flush()
+
+
+atexit.register(flush_all)
@@ -0,0 +1,183 @@
+"""
+Write-ahead spool on local disk for database lines that could not be written
+
+Lines go to append-only segment files (plain line protocol, one line per row):
+
+  - `{created ns}-{pid}.open` is written by one process, renamed to `.lp`
+    when it reaches `segment_bytes` or before replay
+
+  - replay claims oldest `.lp` segment by rename (so processes sharing the
+    directory never replay the same segment), maps it, writes lines in
+    batches and deletes it; on error segment goes back to `.lp`
+
+  - directory is kept under `max_bytes`: oldest segments are deleted (and
+    counted as dropped)
+
+Segments left by dead processes are picked up by the next one.
+Replaying a segment twice (crash in the middle) is harmless: the same points are overwritten.
+"""
+import mmap
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+OPEN = '.open'
+CLOSED = '.lp'
+REPLAY = '.replay'
+
+
+class Spool:
+    def __init__(self, directory: str, segment_bytes: int, max_bytes: int):
+        self._directory = directory
+        self._segment_bytes = segment_bytes
+        self._max_bytes = max_bytes
+
+        self._fp = None
+        self._path: Optional[str] = None
+        self._pid = None
+
+        self._stats = dict(spooled=0, replayed=0, dropped=0)
+        self._lock = threading.Lock()
+
+    def Append(self, lines: List[str]):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._recover()
+
+            if self._fp is None:
+                self._path = os.path.join(self._directory, f'{time.time_ns()}-{os.getpid()}{OPEN}')
+                self._fp = open(self._path, 'a')
+
+            self._fp.write('\n'.join(lines) + '\n')
+            self._fp.flush()
+            self._stats['spooled'] += len(lines)
+
+            if self._fp.tell() >= self._segment_bytes:
+                self._close()
+                self._trim()
+
+    def Replay(self, write: Callable[[List[str]], None], batch_size: int) -> bool:
+        """
+        Write oldest segment
+
+        :return: False if nothing to replay or write failed
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._recover()
+            self._close()
+
+        path = self._claim()
+        if path is None:
+            return False
+
+        try:
+            lines = self._read(path)
+            for idx in range(0, len(lines), batch_size):
+                write(lines[idx:idx + batch_size])
+        except Exception:
+            os.replace(path, path[:-len(f'{REPLAY}-{os.getpid()}')] + CLOSED)
+            raise
+
+        os.remove(path)
+        with self._lock:
+            self._stats['replayed'] += len(lines)
+
+        return True
+
+    def getStats(self) -> Dict[str, int]:
+        """
+        Lines spooled, replayed and dropped (since last call), bytes waiting on disk
+        """
+        with self._lock:
+            stats, self._stats = self._stats, dict(spooled=0, replayed=0, dropped=0)
+        stats['bytes'] = sum(size for _, size in self._segments())
+        return stats
+
+    def _claim(self) -> Optional[str]:
+        for name, _ in self._segments():
+            if name.endswith(CLOSED):
+                source = os.path.join(self._directory, name)
+                target = f'{source[:-len(CLOSED)]}{REPLAY}-{os.getpid()}'
+                try:
+                    os.rename(source, target)
+                    return target
+                except OSError:
+                    continue  # Claimed by another process
+
+        return None
+
+    @staticmethod
+    def _read(path: str) -> List[str]:
+        with open(path, 'rb') as fp:
+            if os.fstat(fp.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return data[:].decode().splitlines()
+
+    def _segments(self) -> List[tuple]:
+        # (name, size) oldest first
+        result = []
+        for name in os.listdir(self._directory):
+            try:
+                result.append((name, os.path.getsize(os.path.join(self._directory, name))))
+            except OSError:
+                pass
+        return sorted(result, key=lambda x: int(x[0].split('-')[0]) if x[0][0].isdigit() else 0)
+
+    def _trim(self):
+        segments = self._segments()
+        total = sum(size for _, size in segments)
+
+        for name, size in segments:
+            if total <= self._max_bytes:
+                break
+
+            if name.endswith(CLOSED):
+                path = os.path.join(self._directory, name)
+                try:
+                    lines = len(self._read(path))
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self._stats['dropped'] += lines
+
+    def _close(self):
+        if self._fp is not None:
+            self._fp.close()
+            os.replace(self._path, self._path[:-len(OPEN)] + CLOSED)
+            self._fp, self._path = None, None
+
+    def _recover(self):
+        # New process: forget parent's segment, close ones of dead processes
+        self._fp, self._path = None, None
+        os.makedirs(self._directory, exist_ok=True)
+
+        for name in os.listdir(self._directory):
+            if name.endswith(OPEN):
+                stem = name[:-len(OPEN)]
+                pid = stem.rpartition('-')[2]  # writer
+            elif REPLAY in name:
+                stem, _, pid = name.partition(f'{REPLAY}-')  # replayer
+            else:
+                continue
+
+            if not _is_alive(int(pid)):
+                try:
+                    os.replace(os.path.join(self._directory, name), os.path.join(self._directory, stem + CLOSED))
+                except OSError:
+                    pass
+
+        self._pid = os.getpid()
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
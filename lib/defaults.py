@@ -29,4 +29,41 @@ class DEFAULT:
 
     MAX_RATIO = 0.6
 
-    MAX_DEQUE = 10
\ No newline at end of file
+    MAX_DEQUE = 10
+
+    RING_SIZE = 64 * 1024 * 1024
+
+    TRACE_FLUSH_SECONDS = 10
+
+    LEVEL_DB_INTERVAL = 100 * KEY.ONE_MS  # Min interval between level records written from local order book
+    ORDER_BOOK_MAX_PENDING = 1000  # Diff updates kept while waiting for order book snapshot
+
+    HTTP_POOL_SIZE = 10  # Keep-alive connections per exchange instance (concurrent REST requests)
+
+    WS_ORDER_TIMEOUT_SECONDS = 1  # Wait for websocket order entry reply
+
+    RATE_LIMIT_RESERVE = 0.02  # Part of every API limit kept for cancels and market orders
+    RATE_LIMIT_WAIT_SECONDS = 0.2  # Max wait for API limit tokens before LIMIT order is skipped
+
+    INSTRUMENTS_TTL_SECONDS = 60 * 60  # Exchange instruments (tick, lot size) cache shared by all bots on the host
+
+    EXECUTOR_MAX_PENDING = 100  # Queued REST requests per exchange before new LIMIT orders are rejected
+    EXECUTOR_STATS_SECONDS = 10  # Order executor queue counters are written this often
+
+    DB_BATCH_SIZE = 5000  # Max lines per database write request
+    DB_FLUSH_SECONDS = 1  # Pending lines are written at least this often
+    DB_MAX_PENDING = 100_000  # Lines kept in memory (spool is off or failed), oldest are dropped
+    DB_WRITE_TIMEOUT_SECONDS = 5  # Stalled database write fails (lines go to spool) instead of blocking writer
+    DB_SPOOL_SEGMENT_BYTES = 4 * 1024 * 1024  # Spool file size
+    DB_SPOOL_MAX_BYTES = 1024 * 1024 * 1024  # Spool directory cap, oldest files are dropped
+    DB_SPOOL_REPLAY_SEGMENTS = 4  # Spool files replayed per flush once database is back
+
+    RECORDER_FLUSH_SECONDS = 60  # Recorded market data goes to a new columnar file at least this often
+    RECORDER_MAX_ROWS = 100_000  # ... or as soon as this many rows are pending
+
+    REQUEST_LOG_FLUSH_SECONDS = 1  # Exchange request telemetry is written in batches
+    REQUEST_LOG_MAX_PENDING = 10_000  # Records waiting for write, newer are dropped (and counted)
+    REQUEST_LOG_MAX_CHARS = 2000  # Request/response json is cut to this length
+
+    ORDER_TRACKER_HISTORY = 10_000  # Finished order ids and trade ids kept to drop late/duplicate status events
+    RECONCILE_SECONDS = 60  # Tracked position is checked against exchange position (REST) this often
@@ -0,0 +1,101 @@
+"""
+Typed events for the supervisor queue
+
+Streams and consumers create these objects instead of string-keyed dicts:
+
+  - events are tuple-backed (NamedTuple), so they are small and fast to pickle
+    over `multiprocessing.Queue`
+
+  - all numeric fields are decoded (Decimal) in the producer process, so
+    the single-threaded supervisor loop only dispatches them by type
+
+Market data events have optional `trace`: (received, created) stamps from
+`time.perf_counter_ns` made in stream process (see `lib.tracer`)
+"""
+from decimal import Decimal
+from typing import NamedTuple, Any, Optional, Tuple
+
+from lib.constants import QUEUE
+from lib.levels import Levels
+
+
+class BookEvent(NamedTuple):
+    ask_price: Decimal
+    ask_qty: Decimal
+    bid_price: Decimal
+    bid_qty: Decimal
+    symbol: str
+    exchange: str
+    timestamp: int
+    latency: int = 0
+    trace: Optional[Tuple[int, int]] = None
+
+
+class TradeEvent(NamedTuple):
+    price: Decimal
+    qty: Decimal
+    side: str
+    symbol: str
+    exchange: str
+    timestamp: int
+    latency: int = 0
+    trace: Optional[Tuple[int, int]] = None
+
+
+class CandleEvent(NamedTuple):
+    open: Decimal
+    high: Decimal
+    low: Decimal
+    close: Decimal
+    volume: Decimal
+    symbol: str
+    exchange: str
+    timestamp: int
+    finished: bool = True
+    trace: Optional[Tuple[int, int]] = None
+
+
+class LevelEvent(NamedTuple):
+    asks: Levels  # scaled integers, Decimals are created lazily on access
+    bids: Levels
+    symbol: str
+    exchange: str
+    timestamp: int
+    latency: int = 0
+    trace: Optional[Tuple[int, int]] = None
+
+
+class AccountEvent(NamedTuple):
+    price: Decimal
+    qty: Decimal
+    symbol: str
+    exchange: str
+
+
+class StatusEvent(NamedTuple):
+    order_id: str
+    status: str
+    price: Decimal
+    qty: Decimal
+    pct: Decimal
+    symbol: str
+    exchange: str
+    trade_id: Optional[str] = None
+
+
+class MessageEvent(NamedTuple):
+    payload: Any
+    timestamp: int
+    latency: int = 0
+
+
+# Event type --> queue name (used as event "kind" in logs and metrics)
+EVENT_QUEUE = {
+    BookEvent: QUEUE.ORDERBOOK,
+    TradeEvent: QUEUE.TRADES,
+    CandleEvent: QUEUE.CANDLES,
+    LevelEvent: QUEUE.LEVEL,
+    AccountEvent: QUEUE.ACCOUNT,
+    StatusEvent: QUEUE.STATUS,
+    MessageEvent: QUEUE.MESSAGE,
+}
@@ -1,10 +1,18 @@
+import queue
 from abc import ABC, abstractmethod
 from collections import deque
+from concurrent import futures
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Optional, Dict, Type, List, Union
+from typing import Optional, Dict, Type, List, Union, Callable, Any
 
-from lib.constants import KEY, STATUS
+import requests
+from requests.adapters import HTTPAdapter
+
+from lib.constants import KEY, DB
+from lib.defaults import DEFAULT
+from lib.exchange.order_tracker import OrderTracker, TrackedOrder
+from lib.executor import PriorityExecutor, PRIORITY
 from lib.factory import AbstractFactory
 from lib.init import get_project_id
 from lib.timer import AbstractTimer
@@ -45,6 +53,10 @@ class Balance:
 
 
 class AbstractExchange(ABC):
+    # Max orders/ids in one batch request (1 - no batch API: one request per order)
+    BATCH_POST_LIMIT = 1
+    BATCH_CANCEL_LIMIT = 1
+
     def __init__(self, config: dict, factory: AbstractFactory, timer: AbstractTimer, symbol: Optional[str] = None):
         self._config = config.copy()
         self._factory = factory
@@ -56,8 +68,66 @@ class AbstractExchange(ABC):
         self._id = get_project_id(config)
 
         self._top_book: Optional[Book] = None
-        self._order_state: Dict[str, dict] = dict()
-        self._portfolio:  Union[int, Decimal] = 0
+
+        # Open orders, quote levels and position from status events
+        self._tracker = OrderTracker()
+
+        pool_size = int(self._config.get(KEY.HTTP_POOL_SIZE, 0) or DEFAULT.HTTP_POOL_SIZE)
+
+        # Keep-alive connection pool for all REST calls: no TCP+TLS handshake per order
+        self._session = self._create_session(pool_size)
+
+        # Bounded pool of order threads (one per connection), cancels and market orders go first
+        self._executor = PriorityExecutor(workers=pool_size, max_pending=DEFAULT.EXECUTOR_MAX_PENDING,
+                                          name=self.__class__.__name__, report=self._report_executor)
+
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """
+        Session with connection pool sized for concurrent order/cancel threads.
+        No adapter retries: `_request` has its own retry logic
+        """
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _report_executor(self, stats: Dict[str, int]):
+        """
+        Order executor back-pressure: queue depth, longest wait and rejected LIMIT orders
+        """
+        if not stats['submitted'] and not stats['rejected'] and not stats['pending']:
+            return
+
+        payload = self._database.Encode(
+            fields={
+                DB.EXECUTOR_SUBMITTED: stats['submitted'],
+                DB.EXECUTOR_REJECTED: stats['rejected'],
+                DB.EXECUTOR_PENDING: stats['pending'],
+                DB.EXECUTOR_MAX_PENDING: stats['max_pending'],
+                DB.EXECUTOR_MAX_WAIT: stats['max_wait'],
+            },
+            timestamp=self._timer.Timestamp(),
+        )
+        self._database.writeEncoded([payload])
+
+    def _dispatch(self, fn: Callable, urgent: bool = True, wait: bool = False, **kwargs) -> futures.Future:
+        """
+        Run request in order executor (instead of new thread per request)
+
+        :param urgent: cancels and market orders, never rejected and go before LIMIT orders
+        :param wait: block until request is done
+        """
+        future = self._executor.Submit(fn, priority=PRIORITY.URGENT if urgent else PRIORITY.NORMAL, **kwargs)
+
+        if future.done() and isinstance(future.exception(), queue.Full):
+            self._logger.error(f'BLOCK {fn.__name__}: {future.exception()}', event='API', **kwargs)
+
+        if wait:
+            futures.wait([future])
+
+        return future
 
     @abstractmethod
     def isOnline(self) -> bool:
@@ -103,22 +173,140 @@ class AbstractExchange(ABC):
     def Cancel(self, ids: Optional[Union[str, List]] = None, wait=False):
         pass
 
+    def Replace(self, ids: List[Optional[str]], orders: List[Order], wait=False) -> List[str]:
+        """
+        Replace open orders: `ids[i]` --> `orders[i]` (same side), extra ids are canceled and
+        extra orders are posted. Returns ids of the new orders (amended orders keep their id)
+
+        Default is post new then cancel old (no moment without quotes), exchanges with
+        native amend/cancel-replace override it
+        """
+        new_ids = self.batchPost(orders, wait=wait) or []
+
+        ids = [x for x in ids if x is not None]
+        if ids:
+            self.Cancel(ids, wait=wait)
+
+        return new_ids
+
+    def massPost(self, orders: List[Order], wait=False) -> Dict[str, futures.Future]:
+        """
+        Post many orders: chunks of `BATCH_POST_LIMIT` go to order executor at once, so they
+        run concurrently on pooled connections
+
+        :return: future per posted order id with exchange reply for this order (zero orders are skipped)
+        """
+        result = dict()
+        for idx in range(0, len(orders), self.BATCH_POST_LIMIT):
+            result.update(self._post_chunk(orders[idx:idx + self.BATCH_POST_LIMIT]))
+
+        if wait:
+            futures.wait(list(result.values()))
+
+        return result
+
+    def massCancel(self, ids: List[Optional[str]], wait=False) -> Dict[str, futures.Future]:
+        """
+        Cancel many orders by chunks of `BATCH_CANCEL_LIMIT` concurrently
+
+        :return: future per order id with exchange reply for this order
+        """
+        ids = [x for x in ids if x is not None]
+
+        result = dict()
+        for idx in range(0, len(ids), self.BATCH_CANCEL_LIMIT):
+            result.update(self._cancel_chunk(ids[idx:idx + self.BATCH_CANCEL_LIMIT]))
+
+        if wait:
+            futures.wait(list(result.values()))
+
+        return result
+
+    def _post_chunk(self, orders: List[Order]) -> Dict[str, futures.Future]:
+        """
+        Override with venue batch request. Default is `Post` per order (no reply)
+        """
+        return {self.Post(order): self._done(None) for order in orders if order.qty != 0}
+
+    def _cancel_chunk(self, ids: List[str]) -> Dict[str, futures.Future]:
+        for order_id in ids:
+            self.Cancel(order_id)
+
+        return {x: self._done(None) for x in ids}
+
+    @staticmethod
+    def _done(value: Any) -> futures.Future:
+        future = futures.Future()
+        future.set_result(value)
+        return future
+
+    @staticmethod
+    def _split_reply(future: futures.Future, ids: List[str],
+                     split: Optional[Callable[[Any], List[Any]]] = None) -> Dict[str, futures.Future]:
+        """
+        Future of one batch request --> future per order
+
+        :param split: batch reply --> replies in `ids` order. Default: list is per order,
+                      anything else (single reply, error) is the same for every order
+        """
+        result = {x: futures.Future() for x in ids}
+
+        def on_done(batch: futures.Future):
+            try:
+                reply = batch.result()
+                replies = split(reply) if split is not None else reply
+                if not isinstance(replies, list) or len(replies) != len(ids):
+                    replies = [reply] * len(ids)
+            except BaseException as e:
+                for item in result.values():
+                    item.set_exception(e)
+                return
+
+            for item, value in zip(result.values(), replies):
+                item.set_result(value)
+
+        future.add_done_callback(on_done)
+        return result
+
     def updateBook(self, top_book: Book):
         self._top_book = top_book
 
-    def updateOrder(self, orderId: str, status: str, price: Decimal, qty: Union[int, Decimal], pct: Union[int, Decimal]):
-        if status == STATUS.CANCELED:
-            if orderId in self._order_state:
-                del self._order_state[orderId]
-        elif status == STATUS.OPEN:
-            self._order_state[orderId] = {KEY.STATUS: status, KEY.PRICE: price, KEY.QTY: qty, KEY.PCT: 0}
-        elif status == STATUS.PARTIALLY_FILLED:
-            self._order_state[orderId][KEY.PCT] += pct
-            self._portfolio += pct * qty
-        elif status == STATUS.FILLED:
-            self._portfolio += pct * qty
-            if orderId in self._order_state:
-                del self._order_state[orderId]
+    def updateOrder(self, orderId: str, status: str, price: Decimal, qty: Union[int, Decimal], pct: Union[int, Decimal],
+                    tradeId: Optional[str] = None):
+        """
+        :param pct: filled part of order (cumulative, as exchange reports it)
+        :param tradeId: last fill id, duplicated fill events are dropped
+        """
+        self._tracker.Update(orderId, status, price, qty, pct, trade_id=tradeId)
+
+    def getOrder(self, orderId: str) -> Optional[TrackedOrder]:
+        return self._tracker.getOrder(orderId)
+
+    def getLevelOrders(self, level: str) -> List[str]:
+        """
+        Live order ids assigned to quote level with `setLevelOrders`
+        """
+        return self._tracker.getLevel(level)
+
+    def setLevelOrders(self, level: str, ids: List[Optional[str]]):
+        self._tracker.Assign(level, ids)
+
+    def reconcilePosition(self, position: Optional[Order] = None) -> Union[int, Decimal]:
+        """
+        Check tracked position against exchange (REST request if `position` is not given, not for hot path)
+
+        :return: exchange - tracked difference, tracked position is reset to exchange one
+        """
+        position = position if position is not None else self.getPosition()
+        return self._tracker.Reconcile(position.qty)
+
+    @property
+    def _portfolio(self) -> Union[int, Decimal]:
+        return self._tracker.position
+
+    @_portfolio.setter
+    def _portfolio(self, value: Union[int, Decimal]):
+        self._tracker.position = value
 
 def get_exchange(config: dict, exchange: Optional[str] = None) -> Type[AbstractExchange]:
 
@@ -1,10 +1,9 @@
-import hashlib
-import hmac
 import json
 import math
-import threading
+import time
 import urllib.parse
 from collections import deque
+from concurrent import futures
 from decimal import Decimal
 from http import HTTPStatus
 from pprint import pprint
@@ -12,14 +11,20 @@ from typing import Optional, Dict, List, Union
 
 import requests
 
+from lib.async_ejector import RequestEjector
 from lib.constants import KEY, DB, SIDE, ORDER_TYPE, TIF, MONTH_MAP
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
 from lib.exchange import AbstractExchange, Order, Book, Balance
+from lib.exchange.rate_limiter import RateLimiter
+from lib.exchange.signer import Signer
+from lib.exchange.ws_order_entry import WsOrderEntry
 from lib.factory import AbstractFactory
 from lib.helpers import custom_dump, sign
+from lib.instruments import get_instruments
 from lib.logger import AbstractLogger
 from lib.timer import AbstractTimer
+from lib.tracer import TRACER, STAGE
 from lib.vault import AbstractVault, VAULT
 
 
@@ -27,19 +32,45 @@ DEFAULT_REST_URL = 'https://fapi.binance.com'
 
 KLINES_LIMIT = 1500
 
-SOFT_LIMIT_10_RATE = 200
-HARD_LIMIT_10_RATE = 250
+# Rate limiter buckets: request weight per minute (`api_limit`), orders per 10s and per minute
+BUCKET_WEIGHT = 'weight'
+BUCKET_ORDERS_10S = 'orders_10s'
+BUCKET_ORDERS_1M = 'orders_1m'
 
-SOFT_LIMIT_ORDERS = 1200 - 120
-HARD_LIMIT_ORDERS = 1200 - 60
-REPLACE_LIMITS_AFTER = 15 * KEY.ONE_SECOND
+ORDERS_10S_LIMIT = 300
+ORDERS_1M_LIMIT = 1200
+
+# Request weight if not 1
+REQUEST_WEIGHTS = {
+    (KEY.GET, '/fapi/v1/ticker/bookTicker'): 2,
+    (KEY.GET, '/fapi/v2/balance'): 5,
+    (KEY.GET, '/fapi/v1/klines'): 10,  # KLINES_LIMIT > 1000
+    (KEY.POST, '/fapi/v1/order'): 0,
+    (KEY.POST, '/fapi/v1/batchOrders'): 5,
+}
 
 REQUEST_ATTEMPT = 3
 REQUEST_TIMEOUT = 0.5
 
+BATCH_MODIFY_LIMIT = 5  # orders per PUT /fapi/v1/batchOrders
+AMEND_NOT_NEEDED = '-5027'  # "No need to modify the order": order is alive as is
+
+# REST order endpoints --> websocket API methods (batches are sent as separate messages)
+WS_METHODS = {
+    (KEY.POST, '/fapi/v1/order'): 'order.place',
+    (KEY.PUT, '/fapi/v1/order'): 'order.modify',
+    (KEY.DELETE, '/fapi/v1/order'): 'order.cancel',
+    (KEY.POST, '/fapi/v1/batchOrders'): 'order.place',
+    (KEY.PUT, '/fapi/v1/batchOrders'): 'order.modify',
+    (KEY.DELETE, '/fapi/v1/batchOrders'): 'order.cancel',
+}
+
 
 
 class BinanceFuturesExchange(AbstractExchange):
+    BATCH_POST_LIMIT = 5
+    BATCH_CANCEL_LIMIT = 10
+
     def __init__(self, config: dict, factory: AbstractFactory, timer: AbstractTimer, symbol: Optional[str] = None):
         super().__init__(config, factory, timer, symbol)
 
@@ -51,30 +82,51 @@ class BinanceFuturesExchange(AbstractExchange):
         self._logger: AbstractLogger = factory.Logger(self._config, factory=factory, timer=timer)
         self._vault: AbstractVault = factory.Vault(self._config, factory=factory, timer=timer)
 
+        self._request_ejector = RequestEjector(self._database, name=self.__class__.__name__)
+
         self._rest_url = self._config.get(self._exchange, {}).get(KEY.REST_URL, None) or DEFAULT_REST_URL
 
         api_limit = self._config.get(self._exchange, {}).get(KEY.API_LIMIT, None) or DEFAULT.BINANCE_API_LIMIT
-        self._soft_api_limit = int(api_limit * 0.95)  # First we have SOFT limit 5% before API LIMIT: we pause quoting
-        self._hard_api_limit = int(api_limit * 0.98)  # Nex we have HARD limit 2% before API LIMIT: we skip LIMIT orders
 
         self._logger.info(f'Exchange: {self._rest_url} with limit={api_limit}')
 
         self._key = self._vault.Get(VAULT.KEY)
         self._secret = self._vault.Get(VAULT.SECRET)
+        self._signer = Signer(self._secret)
 
+        # Last usage reported by exchange (for database)
         self._requests_counter = 0
         self._orders_counter = 0
         self._orders10s_counter = 0
-        self._replace_limits_after = None
+
+        # Limits are shared with all bots on this host with the same key
+        self._limiter = RateLimiter(
+            f'{self._exchange}:{self._key}',
+            limits={
+                BUCKET_WEIGHT: (api_limit, KEY.ONE_MINUTE),
+                BUCKET_ORDERS_10S: (ORDERS_10S_LIMIT, 10 * KEY.ONE_SECOND),
+                BUCKET_ORDERS_1M: (ORDERS_1M_LIMIT, KEY.ONE_MINUTE),
+            },
+            reserve=DEFAULT.RATE_LIMIT_RESERVE,
+            timeout=DEFAULT.RATE_LIMIT_WAIT_SECONDS,
+        )
 
         self._dry = self._key is None or self._secret is None
         if self._dry:
             self._logger.error('Exchange: No KEY/SECRET given. Running in DRY mode')
 
-        exchange_info = self._get_exchange_info()
-        self._tick = self._get_tick(exchange_info)
-        self._min_qty = self._get_min_qty(exchange_info)
-        self._min_notional = self._get_min_notional(exchange_info)
+        # Optional order entry over websocket API, REST is used while it is not connected
+        ws_order_url = self._config.get(self._exchange, {}).get(KEY.WS_ORDER_URL, None)
+        self._ws: Optional[WsOrderEntry] = None
+        if ws_order_url and not self._dry:
+            self._ws = WsOrderEntry(ws_order_url, self._logger, timeout=DEFAULT.WS_ORDER_TIMEOUT_SECONDS,
+                                    name=self.__class__.__name__)
+
+        product_info = get_instruments(self._exchange, lambda: self._get_exchange_info()['symbols'],
+                                       symbol=self._symbol)[self._symbol]
+        self._tick = self._get_tick(product_info)
+        self._min_qty = self._get_min_qty(product_info)
+        self._min_notional = self._get_min_notional(product_info)
 
 
     ##############################################################################
@@ -87,29 +139,11 @@ class BinanceFuturesExchange(AbstractExchange):
         """
         This function handle only API/Order limits as online tag
 
-        All limits are clear if `self._replace_limits_after` has
-        timestamp and that timestamp > current_timestamp
+        Offline when any limit is used up to urgent reserve: LIMIT orders would not pass anyway
 
         :return:
         """
-        if self._replace_limits_after is not None:
-            if self._timer.Timestamp() > self._replace_limits_after:
-                self._requests_counter = 0
-                self._orders_counter = 0
-                self._orders10s_counter = 0
-
-                self._replace_limits_after = None
-
-        if self._requests_counter > self._soft_api_limit:
-            return False
-
-        if self._orders10s_counter > SOFT_LIMIT_10_RATE:
-            return False
-
-        if self._orders_counter > SOFT_LIMIT_ORDERS:
-            return False
-
-        return True
+        return all(x < 1 - DEFAULT.RATE_LIMIT_RESERVE for x in self._limiter.getUsage().values())
 
     def getTick(self) -> Decimal:
         return self._tick
@@ -228,91 +262,98 @@ class BinanceFuturesExchange(AbstractExchange):
         if not params['quantity'] > 0:
             return params['newClientOrderId']
 
-        # Prepare thread for order processing
-        request = threading.Thread(
-            target=self._request,
-            kwargs=dict(method=KEY.POST, endpoint='/fapi/v1/order', params=params, signed=True)
+        # Run in order executor
+        self._dispatch(
+            self._request, urgent=self._is_urgent_order(KEY.POST, params), wait=wait,
+            method=KEY.POST, endpoint='/fapi/v1/order', params=params, signed=True
         )
 
-        # Run order thread
-        request.start()
-
-        if wait:
-            request.join()
-
         return params['newClientOrderId']
 
 
     def batchPost(self, orders: List[Order], wait=False) -> List[str]:
-        # Create "params" dicts for exchange api
-        params = [self._get_params(order) for order in orders]
+        # Batches of BATCH_POST_LIMIT orders are sent concurrently
+        return list(self.massPost(orders, wait=wait))
 
-        # Filer orders and skip "zero"
-        params = [x for x in params if x['quantity'] > 0]
+    def Cancel(self, ids: Optional[Union[str, List]] = None, wait=False):
+        if isinstance(ids, str):
+            ids = [ids]
 
-        # Just return
-        if not params:
-                return []
-
-        # Prepare thread for order processing
-        request = threading.Thread(
-            target=self._request,
-            kwargs=dict(
-                method=KEY.POST,
-                endpoint='/fapi/v1/batchOrders',
-                params=dict(batchOrders=json.dumps(params, default=custom_dump)),
-                signed=True
+        # If no orderId given --> make CANCEL ALL
+        if ids is None:
+            self._dispatch(
+                self._request, urgent=True, wait=wait,
+                method=KEY.DELETE, endpoint='/fapi/v1/allOpenOrders', params=dict(symbol=self._symbol), signed=True
             )
-        )
 
-        # Run order thread
-        request.start()
+        # Else CANCEL (one) or BATCH CANCEL by BATCH_CANCEL_LIMIT ids
+        else:
+            self.massCancel(ids, wait=wait)
 
-        if wait:
-            request.join()
+    def Replace(self, ids: List[Optional[str]], orders: List[Order], wait=False) -> List[str]:
+        """
+        LIMIT orders are modified in place (PUT order, or batchOrders by 5), so order keeps
+        its id and there is no moment with both old and new quotes. Everything else
+        (market/stop/liquidation, no old id, zero qty) is posted/canceled as usual
 
-        return [x['newClientOrderId'] for x in params]
+        Amend replies are waited for: order which was not modified (filled, canceled, rejected)
+        is canceled and posted again as new one, so only live ids are returned
+        """
+        amend, post, cancel = [], [], [x for x in ids[len(orders):] if x is not None]
 
+        for idx, order in enumerate(orders):
+            old_id = ids[idx] if idx < len(ids) else None
 
-    def Cancel(self, ids: Optional[Union[str, List]] = None, wait=False):
-        params = dict(symbol=self._symbol)
+            if old_id is None:
+                post.append(order)
 
-        if isinstance(ids, str):
-            ids = [ids]
+            elif order.price is None or order.stopmarket or order.liquidation:
+                post.append(order)
+                cancel.append(old_id)
 
-        # If no orderId given --> make CANCEL ALL
-        if ids is None:
-            endpoint = '/fapi/v1/allOpenOrders'
+            else:
+                params = self._get_amend_params(old_id, order)
+                if params['quantity'] > 0:
+                    amend.append((params, order))
+                else:
+                    cancel.append(old_id)
 
-        else:
-            # Filter None ordersId
-            ids = [x for x in ids if x is not None]
+        new_ids = self.batchPost(post, wait=wait) if post else []
 
-            # If only one orderId given --> make CANCEL
-            if len(ids) == 1:
-                params['origClientOrderId'] = ids[0]
-                endpoint = '/fapi/v1/order'
+        replies = dict()
+        for idx in range(0, len(amend), BATCH_MODIFY_LIMIT):
+            chunk = [params for params, _ in amend[idx:idx + BATCH_MODIFY_LIMIT]]
 
-            # If several orderId given --> make BATCH CANCEL
-            elif ids:
-                params['origClientOrderIdList'] = json.dumps(ids)
+            if len(chunk) == 1:
+                endpoint, params = '/fapi/v1/order', chunk[0]
+            else:
                 endpoint = '/fapi/v1/batchOrders'
+                params = dict(batchOrders=json.dumps(chunk, default=custom_dump))
+
+            future = self._dispatch(
+                self._request, urgent=True,
+                method=KEY.PUT, endpoint=endpoint, params=params, signed=True
+            )
+            replies.update(self._split_reply(future, [x['origClientOrderId'] for x in chunk]))
+
+        futures.wait(list(replies.values()))
 
-            # Return if no one "not-null" orderId is found
+        amended, repost = [], []
+        for params, order in amend:
+            old_id = params['origClientOrderId']
+            if self._is_amended(replies[old_id]):
+                amended.append(old_id)
             else:
-                return
+                repost.append(order)
+                cancel.append(old_id)
 
-        # Prepare thread for order canceling
-        request = threading.Thread(
-            target=self._request,
-            kwargs=dict(method=KEY.DELETE, endpoint=endpoint, params=params, signed=True)
-        )
+        if repost:
+            new_ids.extend(self.batchPost(repost, wait=wait))
 
-        # Run thread
-        request.start()
+        if cancel:
+            self.Cancel(cancel, wait=wait)
 
-        if wait:
-            request.join()
+        return [*amended, *new_ids]
 
     ##############################################################################
     #
@@ -320,6 +361,46 @@ class BinanceFuturesExchange(AbstractExchange):
     #
     ##############################################################################
 
+    def _post_chunk(self, orders: List[Order]) -> Dict[str, futures.Future]:
+        # Create "params" dicts for exchange api and skip "zero"
+        params = [self._get_params(order) for order in orders]
+        params = [x for x in params if x['quantity'] > 0]
+
+        if not params:
+            return dict()
+
+        # Run in order executor
+        future = self._dispatch(
+            self._request, urgent=any(self._is_urgent_order(KEY.POST, x) for x in params),
+            method=KEY.POST,
+            endpoint='/fapi/v1/batchOrders',
+            params=dict(batchOrders=json.dumps(params, default=custom_dump)),
+            signed=True
+        )
+
+        return self._split_reply(future, [x['newClientOrderId'] for x in params])
+
+    def _cancel_chunk(self, ids: List[str]) -> Dict[str, futures.Future]:
+        params = dict(symbol=self._symbol)
+
+        # If only one orderId given --> make CANCEL
+        if len(ids) == 1:
+            params['origClientOrderId'] = ids[0]
+            endpoint = '/fapi/v1/order'
+
+        # If several orderId given --> make BATCH CANCEL
+        else:
+            params['origClientOrderIdList'] = json.dumps(ids)
+            endpoint = '/fapi/v1/batchOrders'
+
+        # Run in order executor
+        future = self._dispatch(
+            self._request, urgent=True,
+            method=KEY.DELETE, endpoint=endpoint, params=params, signed=True
+        )
+
+        return self._split_reply(future, ids)
+
     def _get_params(self, order: Order) -> dict:
         params = dict(
             symbol=self._symbol,
@@ -347,13 +428,41 @@ class BinanceFuturesExchange(AbstractExchange):
 
         return params
 
-    def _sign(self, params) -> dict:
-        if 'signature' in params.keys():
-            del params['signature']
-        params['timestamp'] = self._timer.Timestamp() // KEY.ONE_MS
-        query = urllib.parse.urlencode([(key, value) for key, value in params.items()])
-        params['signature'] = hmac.new(self._secret.encode(), query.encode(),  digestmod=hashlib.sha256).hexdigest()
-        return params
+    def _get_amend_params(self, order_id: str, order: Order) -> dict:
+        return dict(
+            symbol=self._symbol,
+            origClientOrderId=order_id,
+            side=SIDE.BUY if order.qty > 0 else SIDE.SELL,
+            quantity=abs(order.qty),
+            price=order.price,
+        )
+
+    @staticmethod
+    def _is_amended(reply: futures.Future) -> bool:
+        """
+        Order is alive after amend: modified, or there was nothing to modify
+        """
+        if reply.exception() is not None:
+            return False
+
+        result = reply.result()
+        return isinstance(result, dict) and ('orderId' in result or AMEND_NOT_NEEDED in str(result))
+
+    def _ws_sign(self, params: dict) -> dict:
+        """
+        WS API signature is made over all params sorted by name (apiKey included)
+        """
+        params = dict(params, apiKey=self._key, timestamp=self._timer.Timestamp() // KEY.ONE_MS)
+        query = urllib.parse.urlencode(sorted(params.items()))
+        return dict(params, signature=self._signer.Hex(query))
+
+    def _sign(self, params: dict) -> str:
+        """
+        Signed query string, sent as is (encoded once, same bytes as signed).
+        Caller's `params` are not changed, so retry is signed again from the original ones
+        """
+        query = urllib.parse.urlencode([*params.items(), ('timestamp', self._timer.Timestamp() // KEY.ONE_MS)])
+        return f'{query}&signature={self._signer.Hex(query)}'
 
     def _is_urgent_order(self, method: str, params: dict) -> bool:
         """
@@ -369,32 +478,50 @@ class BinanceFuturesExchange(AbstractExchange):
 
         return True
 
-    def _request(self, method: str, endpoint: str, params: Optional[dict] = None, signed: bool = False, **kwargs) -> dict:
+    def _get_costs(self, method: str, endpoint: str, params: Optional[dict]) -> Dict[str, int]:
+        costs = {BUCKET_WEIGHT: REQUEST_WEIGHTS.get((method, endpoint), 1)}
+
+        # New and modified orders are counted in order limits
+        if method in (KEY.POST, KEY.PUT) and endpoint in ('/fapi/v1/order', '/fapi/v1/batchOrders'):
+            orders = len(json.loads(params['batchOrders'])) if 'batchOrders' in (params or {}) else 1
+            costs[BUCKET_ORDERS_10S] = costs[BUCKET_ORDERS_1M] = orders
+
+        return costs
+
+    def _request(self, method: str, endpoint: str, params: Optional[dict] = None, signed: bool = False,
+                 ws: bool = True, **kwargs) -> dict:
+        """
+        :param ws: order requests could go over websocket API (False: REST only)
+        """
         for request_counter in range(REQUEST_ATTEMPT):
 
-            # Sign request if we need. We r using new `_params` variable
+            # Sign request if we need. We r using new `_params` variable (query string)
             # because we have to sign original 'params' in case of some errors
             if signed and not self._dry:
                 _params = self._sign(params or {})
             else:
                 _params = params
 
-            # If we are close to HARD api limits and order is not URGENT --> skip i
-            if self._requests_counter > self._hard_api_limit or \
-                    self._orders_counter > HARD_LIMIT_ORDERS or \
-                    self._orders10s_counter > HARD_LIMIT_10_RATE:
+            # Take request weight before sending: URGENT always goes, others wait for tokens or skip
+            if not self._limiter.Acquire(self._get_costs(method, endpoint, params),
+                                         urgent=self._is_urgent_order(method, params)):
+
+                self._logger.error(f'Hit API limits. Use Request Priorities', event='API',
+                                   **{f'used_{k}': v for k, v in self._limiter.getUsage().items()})
 
-                self._logger.error(f'Hit HARD API limits. Use Request Priorities', event='API',
-                                   used_weights=self._requests_counter, used_orders=self._orders_counter,
-                                   used_orders_10s=self._orders10s_counter)
+                self._logger.error(f'BLOCK {method} {endpoint}', event='API')
+                return {'error': 'Priorities Block', 'code': 0, 'text': 'Priorities Block', 'params': params}
 
-                if not self._is_urgent_order(method, params):
-                    self._logger.error(f'BLOCK {method} {endpoint}', event='API')
-                    return {'error': 'Priorities Block', 'code': 0, 'text': 'Priorities Block', 'params': params}
+            # Order requests go over websocket API if it is connected
+            if request_counter == 0 and ws and self._ws is not None and (method, endpoint) in WS_METHODS:
+                result = self._ws_request(method, endpoint, params)
+                if result is not None:
+                    return result
 
             # Try to make request
+            _started = time.perf_counter_ns()
             try:
-                _api_result = requests.request(
+                _api_result = self._session.request(
                     method=method,
                     url=self._rest_url + endpoint,
                     headers={'X-MBX-APIKEY': self._key if signed and not self._dry else None},
@@ -403,6 +530,7 @@ class BinanceFuturesExchange(AbstractExchange):
                 # pprint(_api_result.text)
             except:
                 _api_result = requests.Response()
+            TRACER.Add(STAGE.ORDER, method.lower(), time.perf_counter_ns() - _started)
 
             """
             Retry requests for CANCEL orders (N times each 0.5s) -- they are very important
@@ -450,40 +578,109 @@ class BinanceFuturesExchange(AbstractExchange):
             }
 
         # Get Limits from API reply
+        used = dict()
         if 'X-MBX-ORDER-COUNT-1M' in _api_result.headers:
-            self._orders_counter = int(_api_result.headers['X-MBX-ORDER-COUNT-1M'])
+            self._orders_counter = used[BUCKET_ORDERS_1M] = int(_api_result.headers['X-MBX-ORDER-COUNT-1M'])
 
         if 'X-MBX-ORDER-COUNT-10S' in _api_result.headers:
-            self._orders10s_counter = int(_api_result.headers['X-MBX-ORDER-COUNT-10S'])
+            self._orders10s_counter = used[BUCKET_ORDERS_10S] = int(_api_result.headers['X-MBX-ORDER-COUNT-10S'])
 
         if 'X-MBX-USED-WEIGHT-1M' in _api_result.headers:
-            self._requests_counter = int(_api_result.headers['X-MBX-USED-WEIGHT-1M'])
+            self._requests_counter = used[BUCKET_WEIGHT] = int(_api_result.headers['X-MBX-USED-WEIGHT-1M'])
 
-        if self._orders_counter > SOFT_LIMIT_ORDERS or \
-           self._orders10s_counter > SOFT_LIMIT_10_RATE or \
-           self._requests_counter > self._soft_api_limit:
-            self._replace_limits_after = self._timer.Timestamp() + REPLACE_LIMITS_AFTER
+        self._limiter.Sync(used)
 
-        message = json.dumps({
-            'event': method.upper(),
-            'endpoint': endpoint,
-            'response': result
-        }, default=custom_dump).replace('"', '\\"')
+        self._log_request(method, endpoint, result)
 
-        payload = self._database.Encode(fields={
-            DB.REQUEST_ORDER: self._orders_counter,
-            DB.REQUEST_ORDER10S: self._orders10s_counter,
-            DB.REQUEST_USED: self._requests_counter,
-            DB.REQUEST: message,
-        }, timestamp=self._timer.Timestamp())
+        return result
+
+    def _ws_request(self, method: str, endpoint: str, params: dict) -> Optional[Union[dict, list]]:
+        """
+        Same order request over websocket API. There are no batch methods in WS API,
+        so batch is sent as separate messages at once and replies are collected back to list
+
+        :return: REST-like result or None if request was not sent (go with REST)
+        """
+        if 'batchOrders' in params:
+            items = json.loads(params['batchOrders'])
+        elif 'origClientOrderIdList' in params:
+            items = [dict(symbol=params['symbol'], origClientOrderId=x) for x in json.loads(params['origClientOrderIdList'])]
+        else:
+            items = [params]
+
+        _started = time.perf_counter_ns()
+        sent = self._ws.Request([dict(method=WS_METHODS[(method, endpoint)], params=self._ws_sign(x)) for x in items])
+        if sent is None:
+            return None
+
+        replies, unsent = sent
+
+        # Cancels are safe to repeat: go with REST if any of them got no reply
+        if method == KEY.DELETE and None in replies:
+            return None
+
+        TRACER.Add(STAGE.ORDER, f'ws_{method.lower()}', time.perf_counter_ns() - _started)
+
+        # Socket failed in the middle of batch: orders which were not sent go over REST
+        rest = dict()
+        if unsent:
+            batch = dict(params, batchOrders=json.dumps([items[x] for x in unsent], default=custom_dump))
+            reply = self._request(method, endpoint, params=batch, signed=True, ws=False)
+            rest = dict(zip(unsent, reply if isinstance(reply, list) else [reply] * len(unsent)))
+
+        results = []
+        for idx, reply in enumerate(replies):
+            if idx in rest:
+                results.append(rest[idx])
+                continue
+
+            reply = reply or {'status': 0, 'error': {'code': 0, 'msg': 'No websocket reply'}}
+
+            # Get Limits from API reply
+            used = dict()
+            for limit in reply.get('rateLimits', None) or []:
+                interval = (limit['rateLimitType'], limit['interval'], limit['intervalNum'])
+                if interval == ('ORDERS', 'MINUTE', 1):
+                    self._orders_counter = used[BUCKET_ORDERS_1M] = limit['count']
+                elif interval == ('ORDERS', 'SECOND', 10):
+                    self._orders10s_counter = used[BUCKET_ORDERS_10S] = limit['count']
+                elif interval == ('REQUEST_WEIGHT', 'MINUTE', 1):
+                    self._requests_counter = used[BUCKET_WEIGHT] = limit['count']
 
-        error = self._database.writeEncoded([payload])
+            self._limiter.Sync(used)
 
-        if error is not None:
-            self._logger.error(f'Cant write Request result to database: {error}')
+            results.append(reply['result'] if reply['status'] == HTTPStatus.OK else reply['error'])
+
+        if endpoint.endswith('batchOrders'):
+            result = results
+
+        elif replies[0] is not None and replies[0]['status'] == HTTPStatus.OK:
+            result = results[0]
+
+        else:
+            result = {
+                'error': results[0]['msg'],
+                'code': replies[0]['status'] if replies[0] is not None else 0,
+                'text': json.dumps(results[0]).replace('"', ''),
+                'params': params,
+            }
+
+        self._log_request(method, f'ws:{endpoint}', result)
 
         return result
 
+    def _log_request(self, method: str, endpoint: str, result: Union[dict, list]):
+        # Written to database in background batches
+        self._request_ejector.Add(
+            {'event': method.upper(), 'endpoint': endpoint, 'response': result},
+            timestamp=self._timer.Timestamp(),
+            **{
+                DB.REQUEST_ORDER: self._orders_counter,
+                DB.REQUEST_ORDER10S: self._orders10s_counter,
+                DB.REQUEST_USED: self._requests_counter,
+            }
+        )
+
     def _get_exchange_info(self) -> dict:
         return self._request(
             method=KEY.GET,
@@ -491,23 +688,17 @@ class BinanceFuturesExchange(AbstractExchange):
             params=dict()
         )
 
-    def _get_tick(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info['symbols'] if x[KEY.SYMBOL] == self._symbol][0]
-
+    def _get_tick(self, product_info: dict) -> Decimal:
         filter = [x for x in product_info['filters'] if x ['filterType'] == 'PRICE_FILTER'][0]
 
         return Decimal(filter['tickSize'])
 
-    def _get_min_qty(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info['symbols'] if x[KEY.SYMBOL] == self._symbol][0]
-
+    def _get_min_qty(self, product_info: dict) -> Decimal:
         filter = [x for x in product_info['filters'] if x ['filterType'] == 'LOT_SIZE'][0]
 
         return Decimal(filter['stepSize'])
 
-    def _get_min_notional(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info['symbols'] if x[KEY.SYMBOL] == self._symbol][0]
-
+    def _get_min_notional(self, product_info: dict) -> Decimal:
         filter = [x for x in product_info['filters'] if x ['filterType'] == 'MIN_NOTIONAL'][0]
 
         return Decimal(filter['notional'])
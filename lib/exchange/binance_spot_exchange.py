@@ -1,10 +1,9 @@
-import hashlib
-import hmac
 import json
 import math
-import threading
+import time
 import urllib.parse
 from collections import deque
+from concurrent import futures
 from decimal import Decimal
 from http import HTTPStatus
 from pprint import pprint
@@ -16,10 +15,13 @@ from lib.constants import KEY, DB, SIDE, ORDER_TYPE, TIF, MONTH_MAP
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
 from lib.exchange import AbstractExchange, Order, Book, Balance
+from lib.exchange.signer import Signer
+from lib.exchange.ws_order_entry import WsOrderEntry
 from lib.factory import AbstractFactory
 from lib.helpers import custom_dump, sign
 from lib.logger import AbstractLogger
 from lib.timer import AbstractTimer
+from lib.tracer import TRACER, STAGE
 from lib.vault import AbstractVault, VAULT
 
 
@@ -37,6 +39,16 @@ REPLACE_LIMITS_AFTER = 15 * KEY.ONE_SECOND
 REQUEST_ATTEMPT = 3
 REQUEST_TIMEOUT = 0.5
 
+# REST order endpoints --> websocket API methods (batches are sent as separate messages)
+WS_METHODS = {
+    (KEY.POST, "/api/v3/order"): "order.place",
+    (KEY.DELETE, "/api/v3/order"): "order.cancel",
+    (KEY.POST, "/api/v3/order/cancelReplace"): "order.cancelReplace",
+    (KEY.POST, "/api/v3/batchOrders"): "order.place",
+    (KEY.DELETE, "/api/v3/batchOrders"): "order.cancel",
+    (KEY.DELETE, "/api/v3/openOrders"): "openOrders.cancelAll",
+}
+
 
 class BinanceSpotExchange(AbstractExchange):
     def __init__(
@@ -91,6 +103,7 @@ class BinanceSpotExchange(AbstractExchange):
 
         self._key = self._vault.Get(VAULT.KEY)
         self._secret = self._vault.Get(VAULT.SECRET)
+        self._signer = Signer(self._secret)
 
         self._requests_counter = 0
         self._orders_counter = 0
@@ -101,6 +114,17 @@ class BinanceSpotExchange(AbstractExchange):
         if self._dry:
             self._logger.error("Exchange: No KEY/SECRET given. Running in DRY mode")
 
+        # Optional order entry over websocket API, REST is used while it is not connected
+        ws_order_url = self._config.get(self._exchange, {}).get(KEY.WS_ORDER_URL, None)
+        self._ws: Optional[WsOrderEntry] = None
+        if ws_order_url and not self._dry:
+            self._ws = WsOrderEntry(
+                ws_order_url,
+                self._logger,
+                timeout=DEFAULT.WS_ORDER_TIMEOUT_SECONDS,
+                name=self.__class__.__name__,
+            )
+
         # exchange_info = self._get_exchange_info()
         # self._tick = self._get_tick(exchange_info)
         # self._min_qty = self._get_min_qty(exchange_info)
@@ -298,20 +322,17 @@ class BinanceSpotExchange(AbstractExchange):
         if not params["quantity"] > 0:
             return params["newClientOrderId"]
 
-        # Prepare thread for order processing
-        request = threading.Thread(
-            target=self._request,
-            kwargs=dict(
-                method=KEY.POST, endpoint="/api/v3/order", params=params, signed=True
-            ),
+        # Run in order executor
+        self._dispatch(
+            self._request,
+            urgent=self._is_urgent_order(KEY.POST, params),
+            wait=wait,
+            method=KEY.POST,
+            endpoint="/api/v3/order",
+            params=params,
+            signed=True,
         )
 
-        # Run order thread
-        request.start()
-
-        if wait:
-            request.join()
-
         return params["newClientOrderId"]
 
     def batchPost(self, orders: List[Order], wait=False) -> List[str]:
@@ -325,23 +346,17 @@ class BinanceSpotExchange(AbstractExchange):
         if not params:
             return []
 
-        # Prepare thread for order processing
-        request = threading.Thread(
-            target=self._request,
-            kwargs=dict(
-                method=KEY.POST,
-                endpoint="/api/v3/batchOrders",
-                params=dict(batchOrders=json.dumps(params, default=custom_dump)),
-                signed=True,
-            ),
+        # Run in order executor
+        self._dispatch(
+            self._request,
+            urgent=any(self._is_urgent_order(KEY.POST, x) for x in params),
+            wait=wait,
+            method=KEY.POST,
+            endpoint="/api/v3/batchOrders",
+            params=dict(batchOrders=json.dumps(params, default=custom_dump)),
+            signed=True,
         )
 
-        # Run order thread
-        request.start()
-
-        if wait:
-            request.join()
-
         return [x["newClientOrderId"] for x in params]
 
     def Cancel(self, ids: Optional[Union[str, List]] = None, wait=False):
@@ -372,19 +387,74 @@ class BinanceSpotExchange(AbstractExchange):
             else:
                 return
 
-        # Prepare thread for order canceling
-        request = threading.Thread(
-            target=self._request,
-            kwargs=dict(
-                method=KEY.DELETE, endpoint=endpoint, params=params, signed=True
-            ),
+        # Run in order executor
+        self._dispatch(
+            self._request,
+            urgent=True,
+            wait=wait,
+            method=KEY.DELETE,
+            endpoint=endpoint,
+            params=params,
+            signed=True,
         )
 
-        # Run thread
-        request.start()
+    def Replace(
+        self, ids: List[Optional[str]], orders: List[Order], wait=False
+    ) -> List[str]:
+        """
+        Every LIMIT order with old id is one atomic cancelReplace request instead of
+        post + cancel. Everything else (market/stop, no old id, zero qty) is posted/canceled as usual
+
+        cancelReplace replies are waited for: if new order was not placed (old one is filled
+        or canceled, request failed), old id is canceled and order is posted again as new one
+        """
+        result, post, cancel = [], [], [x for x in ids[len(orders):] if x is not None]
+        replace = []
+
+        for idx, order in enumerate(orders):
+            old_id = ids[idx] if idx < len(ids) else None
+            params = self._get_params(order)
+
+            if old_id is None:
+                post.append(order)
+
+            elif not params["quantity"] > 0:
+                cancel.append(old_id)
+
+            elif params["type"] != ORDER_TYPE.LIMIT:
+                post.append(order)
+                cancel.append(old_id)
 
-        if wait:
-            request.join()
+            else:
+                params["cancelReplaceMode"] = "STOP_ON_FAILURE"
+                params["cancelOrigClientOrderId"] = old_id
+
+                future = self._dispatch(
+                    self._request,
+                    urgent=True,
+                    method=KEY.POST,
+                    endpoint="/api/v3/order/cancelReplace",
+                    params=params,
+                    signed=True,
+                )
+                replace.append((params, order, future))
+
+        futures.wait([future for _, _, future in replace])
+
+        for params, order, future in replace:
+            if self._is_replaced(future):
+                result.append(params["newClientOrderId"])
+            else:
+                post.append(order)
+                cancel.append(params["cancelOrigClientOrderId"])
+
+        if post:
+            result.extend(self.batchPost(post, wait=wait))
+
+        if cancel:
+            self.Cancel(cancel, wait=wait)
+
+        return result
 
     ##############################################################################
     #
@@ -416,15 +486,36 @@ class BinanceSpotExchange(AbstractExchange):
 
         return params
 
-    def _sign(self, params) -> dict:
-        if "signature" in params.keys():
-            del params["signature"]
-        params["timestamp"] = self._timer.Timestamp() // KEY.ONE_MS
-        query = urllib.parse.urlencode([(key, value) for key, value in params.items()])
-        params["signature"] = hmac.new(
-            self._secret.encode(), query.encode(), digestmod=hashlib.sha256
-        ).hexdigest()
-        return params
+    @staticmethod
+    def _is_replaced(reply: futures.Future) -> bool:
+        """
+        New order of cancelReplace is placed
+        """
+        if reply.exception() is not None:
+            return False
+
+        result = reply.result()
+        return isinstance(result, dict) and result.get("newOrderResult") == "SUCCESS"
+
+    def _ws_sign(self, params: dict) -> dict:
+        """
+        WS API signature is made over all params sorted by name (apiKey included)
+        """
+        params = dict(
+            params, apiKey=self._key, timestamp=self._timer.Timestamp() // KEY.ONE_MS
+        )
+        query = urllib.parse.urlencode(sorted(params.items()))
+        return dict(params, signature=self._signer.Hex(query))
+
+    def _sign(self, params: dict) -> str:
+        """
+        Signed query string, sent as is (encoded once, same bytes as signed).
+        Caller's `params` are not changed, so retry is signed again from the original ones
+        """
+        query = urllib.parse.urlencode(
+            [*params.items(), ("timestamp", self._timer.Timestamp() // KEY.ONE_MS)]
+        )
+        return f"{query}&signature={self._signer.Hex(query)}"
 
     def _is_urgent_order(self, method: str, params: dict) -> bool:
         """
@@ -446,13 +537,18 @@ class BinanceSpotExchange(AbstractExchange):
         endpoint: str,
         params: Optional[dict] = None,
         signed: bool = False,
+        ws: bool = True,
         **kwargs,
     ) -> dict:
+        """
+        :param ws: order requests could go over websocket API (False: REST only)
+        """
         for request_counter in range(REQUEST_ATTEMPT):
 
-            # Sign request if we need. We r using new `_params` variable
-            # because we have to sign original 'params' in case of some errors
-            if signed and not self._dry:
+            # Sign request if we need. We r using new `_params` variable (query string)
+            # because we have to sign original 'params' in case of some errors.
+            # userDataStream (listenKey) takes only API key header, no timestamp/signature
+            if signed and not self._dry and "userDataStream" not in endpoint:
                 _params = self._sign(params or {})
             else:
                 _params = params
@@ -481,13 +577,21 @@ class BinanceSpotExchange(AbstractExchange):
                         "params": params,
                     }
 
+            # Order requests go over websocket API if it is connected
+            if (
+                request_counter == 0
+                and ws
+                and self._ws is not None
+                and (method, endpoint) in WS_METHODS
+            ):
+                result = self._ws_request(method, endpoint, params)
+                if result is not None:
+                    return result
+
             # Try to make request
+            _started = time.perf_counter_ns()
             try:
-                if "userDataStream" in endpoint:
-                    del _params["timestamp"]
-                    del _params["signature"]
-
-                _api_result = requests.request(
+                _api_result = self._session.request(
                     method=method,
                     url=self._rest_url + endpoint,
                     headers={
@@ -502,6 +606,7 @@ class BinanceSpotExchange(AbstractExchange):
 
             except:
                 _api_result = requests.Response()
+            TRACER.Add(STAGE.ORDER, method.lower(), time.perf_counter_ns() - _started)
 
             """
             Retry requests for CANCEL orders (N times each 0.5s) -- they are very important
@@ -558,6 +663,107 @@ class BinanceSpotExchange(AbstractExchange):
         if "X-MBX-USED-WEIGHT-1M" in _api_result.headers:
             self._requests_counter = int(_api_result.headers["X-MBX-USED-WEIGHT-1M"])
 
+        self._log_request(method, endpoint, result)
+
+        return result
+
+    def _ws_request(
+        self, method: str, endpoint: str, params: dict
+    ) -> Optional[Union[dict, list]]:
+        """
+        Same order request over websocket API. There are no batch methods in WS API,
+        so batch is sent as separate messages at once and replies are collected back to list
+
+        :return: REST-like result or None if request was not sent (go with REST)
+        """
+        if "batchOrders" in params:
+            items = json.loads(params["batchOrders"])
+        elif "origClientOrderIdList" in params:
+            items = [
+                dict(symbol=params["symbol"], origClientOrderId=x)
+                for x in json.loads(params["origClientOrderIdList"])
+            ]
+        else:
+            items = [params]
+
+        _started = time.perf_counter_ns()
+        sent = self._ws.Request(
+            [
+                dict(method=WS_METHODS[(method, endpoint)], params=self._ws_sign(x))
+                for x in items
+            ]
+        )
+        if sent is None:
+            return None
+
+        replies, unsent = sent
+
+        # Cancels are safe to repeat: go with REST if any of them got no reply
+        if method == KEY.DELETE and None in replies:
+            return None
+
+        TRACER.Add(STAGE.ORDER, f"ws_{method.lower()}", time.perf_counter_ns() - _started)
+
+        # Socket failed in the middle of batch: orders which were not sent go over REST
+        rest = dict()
+        if unsent:
+            batch = dict(
+                params,
+                batchOrders=json.dumps([items[x] for x in unsent], default=custom_dump),
+            )
+            reply = self._request(method, endpoint, params=batch, signed=True, ws=False)
+            rest = dict(
+                zip(unsent, reply if isinstance(reply, list) else [reply] * len(unsent))
+            )
+
+        results = []
+        for idx, reply in enumerate(replies):
+            if idx in rest:
+                results.append(rest[idx])
+                continue
+
+            reply = reply or {
+                "status": 0,
+                "error": {"code": 0, "msg": "No websocket reply"},
+            }
+
+            # Get Limits from API reply
+            for limit in reply.get("rateLimits", None) or []:
+                interval = (
+                    limit["rateLimitType"],
+                    limit["interval"],
+                    limit["intervalNum"],
+                )
+                if interval == ("ORDERS", "MINUTE", 1):
+                    self._orders_counter = limit["count"]
+                elif interval == ("ORDERS", "SECOND", 10):
+                    self._orders10s_counter = limit["count"]
+                elif interval == ("REQUEST_WEIGHT", "MINUTE", 1):
+                    self._requests_counter = limit["count"]
+
+            results.append(
+                reply["result"] if reply["status"] == HTTPStatus.OK else reply["error"]
+            )
+
+        if endpoint.endswith("batchOrders"):
+            result = results
+
+        elif replies[0] is not None and replies[0]["status"] == HTTPStatus.OK:
+            result = results[0]
+
+        else:
+            result = {
+                "error": results[0]["msg"],
+                "code": replies[0]["status"] if replies[0] is not None else 0,
+                "text": json.dumps(results[0]).replace('"', ""),
+                "params": params,
+            }
+
+        self._log_request(method, f"ws:{endpoint}", result)
+
+        return result
+
+    def _log_request(self, method: str, endpoint: str, result: Union[dict, list]):
         if (
             self._orders_counter > SOFT_LIMIT_ORDERS
             or self._orders10s_counter > SOFT_LIMIT_10_RATE
@@ -585,8 +791,6 @@ class BinanceSpotExchange(AbstractExchange):
         #if error is not None:
         #    self._logger.error(f"Cant write Request result to database: {error}")
 
-        return result
-
     def _get_exchange_info(self) -> dict:
         return self._request(
             method=KEY.GET, endpoint="/api/v3/exchangeInfo", params=dict()
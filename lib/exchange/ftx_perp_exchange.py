@@ -1,7 +1,5 @@
-import hmac
 import json
 import math
-import threading
 import time
 from collections import deque
 from decimal import Decimal
@@ -11,12 +9,15 @@ from typing import Optional, Dict, List, Tuple, Union
 import ccxt
 import requests
 
+from lib.async_ejector import RequestEjector
 from lib.constants import KEY, DB, ORDER_TYPE, MONTH_MAP, ORDER_TAG
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
 from lib.exchange import AbstractExchange, Order, Book, Balance
+from lib.exchange.signer import Signer
 from lib.factory import AbstractFactory
 from lib.helpers import custom_dump, sign
+from lib.instruments import get_instruments
 from lib.logger import AbstractLogger
 from lib.timer import AbstractTimer
 from lib.vault import AbstractVault, VAULT
@@ -42,6 +43,8 @@ class FtxPerpExchange(AbstractExchange):
         self._logger: AbstractLogger = factory.Logger(self._config, factory=factory, timer=timer)
         self._vault: AbstractVault = factory.Vault(self._config, factory=factory, timer=timer)
 
+        self._request_ejector = RequestEjector(self._database, name=self.__class__.__name__)
+
         self._rest_url = self._config.get(self._exchange, {}).get(KEY.REST_URL, None) or DEFAULT_REST_URL
 
         api_limit = self._config.get(self._exchange, {}).get(KEY.API_LIMIT, None) or DEFAULT.HUOBI_API_LIMIT
@@ -54,6 +57,7 @@ class FtxPerpExchange(AbstractExchange):
 
         self._key = self._vault.Get(VAULT.KEY)
         self._secret = self._vault.Get(VAULT.SECRET)
+        self._signer = Signer(self._secret)
 
         self._symbol = self._construct_symbol()
 
@@ -63,10 +67,10 @@ class FtxPerpExchange(AbstractExchange):
         if self._dry:
             self._logger.error('Exchange: No KEY/SECRET given. Running in DRY mode')
 
-        exchange_info = self._ftx.fetch_markets()
-        self._tick = self._get_tick(exchange_info)
-        self._min_qty = self._get_min_qty(exchange_info)
-        self._contract_value = self._get_contract_value(exchange_info)
+        product_info = get_instruments(self._exchange, self._ftx.fetch_markets, symbol=self._symbol)[self._symbol]
+        self._tick = self._get_tick(product_info)
+        self._min_qty = self._get_min_qty(product_info)
+        self._contract_value = self._get_contract_value(product_info)
 
     ##############################################################################
     #
@@ -122,14 +126,13 @@ class FtxPerpExchange(AbstractExchange):
         ts = int(time.time() * 1000)
         request = requests.Request('GET', url=endpoint, params={'showAvgPrice': True})
         prepared = request.prepare()
-        signature_payload = f'{ts}{prepared.method}{prepared.path_url}'.encode()
-        signature = hmac.new(self._secret.encode(), signature_payload, 'sha256').hexdigest()
+        signature = self._signer.Hex(f'{ts}{prepared.method}{prepared.path_url}')
 
         request.headers['FTX-KEY'] = self._key
         request.headers['FTX-SIGN'] = signature
         request.headers['FTX-TS'] = str(ts)
 
-        r = requests.Session().send(request.prepare())
+        r = self._session.send(request.prepare())
 
         return r.json()['result']
 
@@ -153,16 +156,8 @@ class FtxPerpExchange(AbstractExchange):
     def _method_with_log(self, method, **kwargs):
         r = method(**kwargs)
 
-        message = json.dumps({
-            'event': method.__str__(),
-            'response': r,
-        }, default=custom_dump).replace('"', '\\"')
-
-        payload = self._database.Encode(fields={DB.REQUEST: message}, timestamp=self._timer.Timestamp())
-        error = self._database.writeEncoded([payload])
-
-        if error is not None:
-            self._logger.error(f'Cant write Request result to database: {error}')
+        # Written to database in background batches
+        self._request_ejector.Add({'event': method.__str__(), 'response': r}, timestamp=self._timer.Timestamp())
 
 
     def Post(self, order: Order, wait=False) -> str:
@@ -174,24 +169,17 @@ class FtxPerpExchange(AbstractExchange):
         if abs(order.qty) < self._min_qty:
             return order_id
         else:
-            request = threading.Thread(
-                target=self._method_with_log,
-                kwargs=dict(
-                    method=self._ftx.create_order,
-                    symbol=self._symbol,
-                    type=order_type,
-                    side=order_side,
-                    amount=abs(order.qty),
-                    price=order.price,
-                    params={'clientOrderId': order_id}
-                )
+            self._dispatch(
+                self._method_with_log, urgent=order.price is None, wait=wait,
+                method=self._ftx.create_order,
+                symbol=self._symbol,
+                type=order_type,
+                side=order_side,
+                amount=abs(order.qty),
+                price=order.price,
+                params={'clientOrderId': order_id}
             )
 
-            request.start()
-
-            if wait:
-                request.join()
-
             return order_id
 
 
@@ -200,38 +188,24 @@ class FtxPerpExchange(AbstractExchange):
 
     def Cancel(self, ids: Optional[Union[str, List]] = None, wait=False):
         if ids is None:
-            request = threading.Thread(
-                target=self._method_with_log,
-                kwargs=dict(
-                    method=self._ftx.cancel_all_orders,
-                    symbol=self._symbol,
-                )
+            self._dispatch(
+                self._method_with_log, urgent=True, wait=wait,
+                method=self._ftx.cancel_all_orders,
+                symbol=self._symbol
             )
 
-            request.start()
-
-            if wait:
-                request.join()
-
             return
         elif isinstance(ids, str):
             ids = [ids]
 
         for id in ids:
-            request = threading.Thread(
-                target=self._method_with_log,
-                kwargs=dict(
-                    method=self._ftx.cancel_order,
-                    symbol=self._symbol,
-                    params={'clientOrderId': id}
-                )
+            self._dispatch(
+                self._method_with_log, urgent=True, wait=wait,
+                method=self._ftx.cancel_order,
+                symbol=self._symbol,
+                params={'clientOrderId': id}
             )
 
-            request.start()
-
-            if wait:
-                request.join()
-
     ##############################################################################
     #
     # Private Methods
@@ -245,19 +219,13 @@ class FtxPerpExchange(AbstractExchange):
             if self._symbol.upper().endswith(_tail):
                 return f'{self._symbol.upper()[:-len(_tail)]}-PERP'
 
-    def _get_tick(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info if x['symbol'] == self._symbol][0]
-
+    def _get_tick(self, product_info: dict) -> Decimal:
         return Decimal(str(product_info['precision']['price']))
 
-    def _get_min_qty(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info if x['symbol'] == self._symbol][0]
-
+    def _get_min_qty(self, product_info: dict) -> Decimal:
         return Decimal(str(product_info['precision']['amount']))
 
-    def _get_contract_value(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info if x['symbol'] == self._symbol][0]
-
+    def _get_contract_value(self, product_info: dict) -> Decimal:
         value = product_info['limits']['cost']['min']
 
         return Decimal('0') if value is None else Decimal(str(value))
@@ -1,12 +1,9 @@
-import base64
-import hmac
 import json
 import math
-import threading
+import time
 from collections import deque
 from datetime import datetime
 from decimal import Decimal
-from hashlib import sha256
 from http import HTTPStatus
 from pprint import pprint
 from typing import Optional, Dict, List, Tuple
@@ -14,14 +11,18 @@ from urllib import parse
 
 import requests
 
+from lib.async_ejector import RequestEjector
 from lib.constants import KEY, DB, ORDER_TYPE, MONTH_MAP, ORDER_TAG
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
 from lib.exchange import AbstractExchange, Order, Book, Balance
+from lib.exchange.signer import Signer
 from lib.factory import AbstractFactory
 from lib.helpers import custom_dump, sign
+from lib.instruments import get_instruments
 from lib.logger import AbstractLogger
 from lib.timer import AbstractTimer
+from lib.tracer import TRACER, STAGE
 from lib.vault import AbstractVault, VAULT
 
 DEFAULT_REST_URL = 'https://api.hbdm.com'
@@ -46,6 +47,8 @@ class HuobiSwapExchange(AbstractExchange):
         self._logger: AbstractLogger = factory.Logger(self._config, factory=factory, timer=timer)
         self._vault: AbstractVault = factory.Vault(self._config, factory=factory, timer=timer)
 
+        self._request_ejector = RequestEjector(self._database, name=self.__class__.__name__)
+
         self._symbol = self._construct_symbol()
         self._target_side = self._construct_side()
         self._target_side_coeff = +1 if self._target_side == KEY.LONG else -1
@@ -62,15 +65,17 @@ class HuobiSwapExchange(AbstractExchange):
 
         self._key = self._vault.Get(VAULT.KEY)
         self._secret = self._vault.Get(VAULT.SECRET)
+        self._signer = Signer(self._secret)
 
         self._dry = self._key is None or self._secret is None
         if self._dry:
             self._logger.error('Exchange: No KEY/SECRET given. Running in DRY mode')
 
-        exchange_info = self._get_exchange_info()
-        self._tick = self._get_tick(exchange_info)
-        self._min_qty = self._get_min_qty(exchange_info)
-        self._contract_value = self._get_contract_value(exchange_info)
+        product_info = get_instruments(self._exchange, lambda: self._get_exchange_info()['data'],
+                                       key='contract_code', symbol=self._symbol)[self._symbol]
+        self._tick = self._get_tick(product_info)
+        self._min_qty = self._get_min_qty(product_info)
+        self._contract_value = self._get_contract_value(product_info)
 
     ##############################################################################
     #
@@ -169,16 +174,11 @@ class HuobiSwapExchange(AbstractExchange):
 
         else:
 
-            request = threading.Thread(
-                target=self._request,
-                kwargs=dict(method=KEY.POST, endpoint='/linear-swap-api/v1/swap_cross_order', params=params, signed=True)
+            self._dispatch(
+                self._request, urgent=order.price is None, wait=wait,
+                method=KEY.POST, endpoint='/linear-swap-api/v1/swap_cross_order', params=params, signed=True
             )
 
-        request.start()
-
-        if wait:
-            request.join()
-
         return order_id
 
 
@@ -276,8 +276,7 @@ class HuobiSwapExchange(AbstractExchange):
 
         payload = f'POST\napi.hbdm.com\n{endpoint}\n{suffix}'
 
-        digest = hmac.new(self._secret.encode('utf8'), payload.encode('utf8'), digestmod=sha256).digest()
-        signature = base64.b64encode(digest).decode()
+        signature = self._signer.Base64(payload)
 
         suffix = f'{suffix}&Signature={parse.quote(signature)}'
 
@@ -288,6 +287,7 @@ class HuobiSwapExchange(AbstractExchange):
     def _request(self, method: str, endpoint: str, params: Optional[dict] = None, signed: bool = False, **kwargs) -> dict:
 
         for request_counter in range(REQUEST_ATTEMPT):
+            _started = time.perf_counter_ns()
             try:
 
                 def get_headers() -> dict:
@@ -295,17 +295,18 @@ class HuobiSwapExchange(AbstractExchange):
 
                 url = self._rest_url + endpoint
                 if method == KEY.GET:
-                    _api_result = requests.get(url=url, headers=get_headers(), params=params)
+                    _api_result = self._session.get(url=url, headers=get_headers(), params=params)
                 elif method == KEY.POST:
                     signature = self._sign(endpoint=endpoint)
                     url = f'{url}?{signature}'; print(url)
-                    _api_result = requests.post(url=url, headers=get_headers(), json=params)
+                    _api_result = self._session.post(url=url, headers=get_headers(), json=params)
                 elif method == KEY.DELETE:
-                    _api_result = requests.delete(url=url, headers=get_headers(), params=params)
+                    _api_result = self._session.delete(url=url, headers=get_headers(), params=params)
 
             except Exception as e:
                 _api_result = requests.models.Response()
                 print(e)
+            TRACER.Add(STAGE.ORDER, method.lower(), time.perf_counter_ns() - _started)
 
             break
 
@@ -327,20 +328,11 @@ class HuobiSwapExchange(AbstractExchange):
                 'params': params,
             }
 
-        message = json.dumps({
-            'event': method.upper(),
-            'endpoint': endpoint,
-            'response': result
-        }, default=custom_dump).replace('"', '\\"')
-
-        payload = self._database.Encode(fields={
-            DB.REQUEST: message,
-        }, timestamp=self._timer.Timestamp())
-
-        error = self._database.writeEncoded([payload])
-
-        if error is not None:
-            self._logger.error(f'Cant write Request result to database: {error}')
+        # Written to database in background batches
+        self._request_ejector.Add(
+            {'event': method.upper(), 'endpoint': endpoint, 'response': result},
+            timestamp=self._timer.Timestamp(),
+        )
 
         return result
 
@@ -352,19 +344,13 @@ class HuobiSwapExchange(AbstractExchange):
             params=dict()
         )
 
-    def _get_tick(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info['data'] if x['contract_code'] == self._symbol][0]
-
+    def _get_tick(self, product_info: dict) -> Decimal:
         return Decimal(str(product_info['price_tick']))
 
-    def _get_min_qty(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info['data'] if x['contract_code'] == self._symbol][0]
-
+    def _get_min_qty(self, product_info: dict) -> Decimal:
         return Decimal(str(product_info['contract_size']))
 
-    def _get_contract_value(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info['data'] if x['contract_code'] == self._symbol][0]
-
+    def _get_contract_value(self, product_info: dict) -> Decimal:
         return Decimal(str(product_info['contract_size']))
 
     def _get_id_timestamp(self) -> str:
@@ -1,11 +1,10 @@
-import base64
 import copy
-import hmac
 import json
 import math
-import threading
+import time
 import urllib.parse
 from collections import deque
+from concurrent import futures
 from datetime import datetime, timezone
 from decimal import Decimal
 from http import HTTPStatus
@@ -14,14 +13,18 @@ from typing import Optional, Dict, List, Tuple, Union
 import ciso8601
 import requests
 
+from lib.async_ejector import RequestEjector
 from lib.constants import KEY, DB, ORDER_TYPE, MONTH_MAP
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
 from lib.exchange import AbstractExchange, Order, Book, Balance
+from lib.exchange.signer import Signer
 from lib.factory import AbstractFactory
 from lib.helpers import custom_dump, sign
+from lib.instruments import get_instruments
 from lib.logger import AbstractLogger
 from lib.timer import AbstractTimer
+from lib.tracer import TRACER, STAGE
 from lib.vault import AbstractVault, VAULT
 
 
@@ -70,6 +73,9 @@ REQUEST_ATTEMPT = 2
 REQUEST_TIMEOUT = 0.5
 
 class OkexPerpExchange(AbstractExchange):
+    BATCH_POST_LIMIT = 10
+    BATCH_CANCEL_LIMIT = 10
+
     def __init__(self, config: dict, factory: AbstractFactory, timer: AbstractTimer, symbol: Optional[str] = None):
         super().__init__(config, factory, timer, symbol)
 
@@ -81,6 +87,8 @@ class OkexPerpExchange(AbstractExchange):
         self._logger: AbstractLogger = factory.Logger(self._config, factory=factory, timer=timer)
         self._vault: AbstractVault = factory.Vault(self._config, factory=factory, timer=timer)
 
+        self._request_ejector = RequestEjector(self._database, name=self.__class__.__name__)
+
         self._symbol = self._construct_symbol()
         self._max_market_qty = MARKET_ORDER_LIMITS.get(self._symbol, MARKET_ORDER_LIMIT_DEFAULT)
 
@@ -98,6 +106,7 @@ class OkexPerpExchange(AbstractExchange):
         self._key = self._vault.Get(VAULT.KEY)
         self._secret = self._vault.Get(VAULT.SECRET)
         self._passphrase = self._vault.Get(VAULT.PASSPHRASE)
+        self._signer = Signer(self._secret)
 
         self._requests_counter = 0
         self._orders_counter = 0
@@ -355,87 +364,44 @@ class OkexPerpExchange(AbstractExchange):
         # return order_id
 
         if order.price is None:  # For Okex and Market order we have to cancel everything first
-            request = threading.Thread(
-                target=self._cancel_and_post_thread,
-                kwargs=dict(params=params)
-            )
+            self._dispatch(self._cancel_and_post_thread, urgent=True, wait=wait, params=params)
         else:
-            request = threading.Thread(
-                target=self._request,
-                kwargs=dict(method=KEY.POST, endpoint='/api/swap/v3/order', params=params, signed=True)
+            self._dispatch(
+                self._request, urgent=False, wait=wait,
+                method=KEY.POST, endpoint='/api/swap/v3/order', params=params, signed=True
             )
 
-        request.start()
-
-        if wait:
-            request.join()
-
         return order_id
 
 
     def _batch_post_without_adjustments(self, orders: List[Order], wait=False) -> List[str]:
         print('<<<<<', orders)
 
-        params = [self._get_params(order) for order in orders]
-
-        non_zero_orders = [x for x in params if float(x['size']) > KEY.E]
-
-        print(f'POST {non_zero_orders}')
-
-        if non_zero_orders:
-            request = threading.Thread(
-                target=self._request,
-                kwargs=dict(
-                    method=KEY.POST,
-                    endpoint='/api/swap/v3/orders',
-                    params=dict(instrument_id=self._symbol,
-                                order_data=non_zero_orders),
-                    signed=True
-                )
-            )
-
-            request.start()
-
-            if wait:
-                request.join()
-
-        return [x['client_oid'] for x in params]
+        return list(super().massPost(orders, wait=wait))
 
     def batchPost(self, orders: List[Order], wait=False) -> List[str]:
         print('>>>>', orders)
         print(self._portfolio)
 
-        adjusted_orders = self.adjust_orders(self._portfolio, orders)
+        return list(self.massPost(orders, wait=wait))
 
-        return self._batch_post_without_adjustments(adjusted_orders)
+    def massPost(self, orders: List[Order], wait=False) -> Dict[str, futures.Future]:
+        adjusted_orders = self.adjust_orders(self._portfolio, orders)
 
+        return super().massPost(adjusted_orders, wait=wait)
 
     def Cancel(self, ids: Optional[Union[str, List]] = None, wait=False):
-        if isinstance(ids, str) and ids is not None:
-            endpoint = f'/api/swap/v3/cancel_order/{self._symbol}/{ids}'
-            params = None
-        else:
-            if ids is None:  # load ids from
-                ids = self._get_open_orders_list()
-
-            open_orders = [x for x in ids if x is not None]
-
-            if open_orders:
-                params = {'client_oids': open_orders}
-                endpoint = f'/api/swap/v3/cancel_batch_orders/{self._symbol}'
-            else:
-                endpoint = None
-
-        if endpoint is not None:
-            request = threading.Thread(
-                target=self._request,
-                kwargs=dict(method=KEY.POST, endpoint=endpoint, params=params, signed=True)
+        if isinstance(ids, str):
+            self._dispatch(
+                self._request, urgent=True, wait=wait,
+                method=KEY.POST, endpoint=f'/api/swap/v3/cancel_order/{self._symbol}/{ids}', params=None, signed=True
             )
+            return
 
-            request.start()
+        if ids is None:  # load ids from
+            ids = self._get_open_orders_list()
 
-            if wait:
-                request.join()
+        self.massCancel(ids, wait=wait)
 
     ##############################################################################
     #
@@ -443,6 +409,40 @@ class OkexPerpExchange(AbstractExchange):
     #
     ##############################################################################
 
+    def _post_chunk(self, orders: List[Order]) -> Dict[str, futures.Future]:
+        params = [self._get_params(order) for order in orders]
+
+        non_zero_orders = [x for x in params if float(x['size']) > KEY.E]
+
+        print(f'POST {non_zero_orders}')
+
+        if not non_zero_orders:
+            return dict()
+
+        future = self._dispatch(
+            self._request, urgent=False,
+            method=KEY.POST,
+            endpoint='/api/swap/v3/orders',
+            params=dict(instrument_id=self._symbol,
+                        order_data=non_zero_orders),
+            signed=True
+        )
+
+        # Reply is {"order_info": [result per order], ...}
+        return self._split_reply(
+            future, [x['client_oid'] for x in non_zero_orders],
+            split=lambda reply: reply.get('order_info') if isinstance(reply, dict) else reply
+        )
+
+    def _cancel_chunk(self, ids: List[str]) -> Dict[str, futures.Future]:
+        future = self._dispatch(
+            self._request, urgent=True,
+            method=KEY.POST, endpoint=f'/api/swap/v3/cancel_batch_orders/{self._symbol}',
+            params={'client_oids': ids}, signed=True
+        )
+
+        return self._split_reply(future, ids)
+
     """
     Decode normalized symbol name to Okex notation and Sise
     """
@@ -529,18 +529,14 @@ class OkexPerpExchange(AbstractExchange):
 
         return params
 
-    def _sign(self, timestamp: str, method: str, endpoint: str, params: dict) -> str:
+    def _sign(self, timestamp: str, method: str, endpoint: str, payload: str) -> str:
+        """
+        :param payload: "?query" for GET/DELETE or json body for POST, exactly as sent
+        """
         if self._dry:
             return ''
 
-        if method in [KEY.GET, KEY.DELETE]:
-            query = urllib.parse.urlencode([(key, value) for key, value in params.items()])
-            query = f'{timestamp}{method.upper()}{endpoint}{("?" if query != "" else "" )}{query}'
-        else:
-            _params = json.dumps(params) if params != {} else ''
-            query = f'{timestamp}{method.upper()}{endpoint}{_params}'
-        signature = hmac.new(bytes(self._secret, encoding='utf8'), bytes(query, encoding='utf-8'), digestmod='sha256').digest()
-        return base64.b64encode(signature)
+        return self._signer.Base64(f'{timestamp}{method.upper()}{endpoint}{payload}')
 
     def _timestamp2str(self, timestamp: int) -> str:
         dt = datetime.fromtimestamp(timestamp / KEY.ONE_SECOND, tz=timezone.utc).replace(tzinfo=None)
@@ -564,8 +560,16 @@ class OkexPerpExchange(AbstractExchange):
         timestamp = self._timestamp2str(self._timer.Timestamp())
 
         for request_counter in range(REQUEST_ATTEMPT):
-            signature = self._sign(timestamp, method, endpoint, params or {})
+            # Encode params once: the same string is signed and sent
+            if method in [KEY.GET, KEY.DELETE]:
+                query = urllib.parse.urlencode(params or {})
+                payload = f'?{query}' if query else ''
+            else:
+                payload = json.dumps(params) if params else ''
+
+            signature = self._sign(timestamp, method, endpoint, payload)
 
+            _started = time.perf_counter_ns()
             try:
 
                 def get_headers() -> dict:
@@ -579,15 +583,16 @@ class OkexPerpExchange(AbstractExchange):
 
                 url = self._rest_url + endpoint
                 if method == KEY.GET:
-                    _api_result = requests.get(url=url, headers=get_headers(), params=params)
+                    _api_result = self._session.get(url=url + payload, headers=get_headers())
                 elif method == KEY.POST:
-                    _api_result = requests.post(url=url, headers=get_headers(), json=params)
+                    _api_result = self._session.post(url=url, headers=get_headers(), data=payload)
                 elif method == KEY.DELETE:
-                    _api_result = requests.delete(url=url, headers=get_headers(), params=params)
+                    _api_result = self._session.delete(url=url + payload, headers=get_headers())
 
             except Exception as e:
                 _api_result = requests.models.Response()
                 print(e)
+            TRACER.Add(STAGE.ORDER, method.lower(), time.perf_counter_ns() - _started)
 
             """
             Retry requests for CANCEL orders (N times each 0.5s) -- they are very important
@@ -655,21 +660,11 @@ class OkexPerpExchange(AbstractExchange):
                 'text': _api_result.text.replace('"', ''),
             }
 
-        message = json.dumps({
-            'event': method.upper(),
-            'endpoint': endpoint,
-            'response': result,
-            'params': params,
-        }, default=custom_dump).replace('"', '\\"')
-
-        payload = self._database.Encode(fields={
-            DB.REQUEST: message,
-        }, timestamp=self._timer.Timestamp())
-
-        error = self._database.writeEncoded([payload])
-
-        if error is not None:
-            self._logger.error(f'Cant write Request result to database: {error}')
+        # Written to database in background batches
+        self._request_ejector.Add(
+            {'event': method.upper(), 'endpoint': endpoint, 'response': result, 'params': params},
+            timestamp=self._timer.Timestamp(),
+        )
 
         return result
 
@@ -680,26 +675,18 @@ class OkexPerpExchange(AbstractExchange):
             params=dict()
         )
 
-    def _get_contract_val(self) -> Decimal:
-        symbols = self._get_exchange_info()
+    def _get_product_info(self) -> dict:
+        return get_instruments(self._exchange, self._get_exchange_info, key='instrument_id',
+                               symbol=self._symbol)[self._symbol]
 
-        product_info = [x for x in symbols if x['instrument_id'] == self._symbol][0]
-
-        return Decimal(product_info['contract_val'])
+    def _get_contract_val(self) -> Decimal:
+        return Decimal(self._get_product_info()['contract_val'])
 
     def _get_tick(self) -> Decimal:
-        symbols = self._get_exchange_info()
-
-        product_info = [x for x in symbols if x['instrument_id'] == self._symbol][0]
-
-        return Decimal(product_info['tick_size'])
+        return Decimal(self._get_product_info()['tick_size'])
 
     def _get_min_qty(self) -> Decimal:
-        symbols = self._get_exchange_info()
-
-        product_info = [x for x in symbols if x['instrument_id'] == self._symbol][0]
-
-        return Decimal(product_info['size_increment'])
+        return Decimal(self._get_product_info()['size_increment'])
 
     def _get_top_book(self) -> dict:
         return self._request(
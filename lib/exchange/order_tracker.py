@@ -0,0 +1,158 @@
+"""
+In-memory order and position state of one exchange instance
+
+  - orders by client id: dict, O(1) update on every status event
+
+  - orders by level: bot assigns ids it posted for a level (quote side),
+    finished orders leave their level automatically
+
+  - fills: status events carry cumulative filled part (`pct`), position
+    changes by the difference only, so repeated or late events are no-op;
+    events with already seen trade id are dropped
+
+  - reconciliation: tracked position is compared with exchange position
+    from time to time and reset to it when they differ
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional, Union
+
+from lib.constants import KEY, STATUS
+from lib.defaults import DEFAULT
+
+FILL_STATUSES = (STATUS.PARTIALLY_FILLED, STATUS.FILLED)
+FINAL_STATUSES = (STATUS.CANCELED, STATUS.FILLED)
+
+
+@dataclass
+class TrackedOrder:
+    status: str = STATUS.NEW
+    price: Optional[Decimal] = None
+    qty: Union[int, Decimal] = Decimal(0)
+    filled: Union[int, Decimal] = Decimal(0)
+    level: Optional[str] = None
+
+
+class OrderTracker:
+    def __init__(self, history: int = DEFAULT.ORDER_TRACKER_HISTORY):
+        """
+        :param history: finished order ids and trade ids to remember
+        """
+        self._history = history
+
+        self._orders: Dict[str, TrackedOrder] = dict()
+        self._levels: Dict[str, Dict[str, None]] = dict()  # level --> ordered set of ids
+
+        self._finished: Dict[str, None] = OrderedDict()
+        self._trades: Dict[str, None] = OrderedDict()
+
+        self.position: Union[int, Decimal] = Decimal(0)
+
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Exchange is pickled to spawned stream process: state goes, lock is created there
+        return {k: v for k, v in self.__dict__.items() if k != '_lock'}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state, _lock=threading.Lock())
+
+    def Update(self, order_id: str, status: str, price: Optional[Decimal], qty: Union[int, Decimal],
+               pct: Union[int, Decimal], trade_id: Optional[str] = None) -> Union[int, Decimal]:
+        """
+        Apply order status event
+
+        :param qty: signed order qty
+        :param pct: filled part of order (cumulative)
+        :return: position change
+        """
+        with self._lock:
+            if order_id in self._finished:
+                return 0
+
+            if trade_id is not None and status in FILL_STATUSES:
+                if trade_id in self._trades:
+                    return 0
+                self._remember(self._trades, trade_id)
+
+            order = self._orders.get(order_id, None)
+            if order is None:
+                order = self._orders[order_id] = TrackedOrder()
+
+            order.status, order.qty = status, qty
+            order.price = price if price is not None else order.price
+
+            delta = 0
+            if status in FILL_STATUSES:
+                filled = (1 if status == STATUS.FILLED and not pct else pct) * qty
+                # Only growth of filled qty moves position (late event has less filled)
+                if abs(filled) > abs(order.filled):
+                    delta = filled - order.filled
+                    order.filled = filled
+                    self.position += delta
+
+            if status in FINAL_STATUSES:
+                self._drop(order_id)
+                self._remember(self._finished, order_id)
+
+            return delta
+
+    def Assign(self, level: str, ids: List[Optional[str]]):
+        """
+        Set orders of level (replace previous ones). Not confirmed orders which left level are forgotten
+        """
+        with self._lock:
+            ids = [x for x in ids if x is not None]
+
+            for order_id in self._levels.get(level, {}):
+                order = self._orders.get(order_id, None)
+                if order is not None and order_id not in ids:
+                    order.level = None
+                    if order.status == STATUS.NEW:
+                        del self._orders[order_id]
+
+            self._levels[level] = dict.fromkeys(ids)
+
+            for order_id in ids:
+                if order_id in self._finished:
+                    del self._levels[level][order_id]
+                    continue
+
+                order = self._orders.get(order_id, None)
+                if order is None:
+                    order = self._orders[order_id] = TrackedOrder()
+                order.level = level
+
+    def Reconcile(self, position: Union[int, Decimal]) -> Union[int, Decimal]:
+        """
+        :param position: position reported by exchange
+        :return: difference exchange - tracked (tracked is reset to exchange)
+        """
+        with self._lock:
+            diff = position - self.position
+            if abs(diff) > KEY.ED:
+                self.position = position
+            return diff
+
+    def getOrder(self, order_id: str) -> Optional[TrackedOrder]:
+        return self._orders.get(order_id, None)
+
+    def getLevel(self, level: str) -> List[str]:
+        with self._lock:
+            return list(self._levels.get(level, ()))
+
+    def getOpen(self) -> List[str]:
+        with self._lock:
+            return list(self._orders)
+
+    def _drop(self, order_id: str):
+        order = self._orders.pop(order_id, None)
+        if order is not None and order.level is not None:
+            self._levels.get(order.level, {}).pop(order_id, None)
+
+    def _remember(self, history: Dict[str, None], key: str):
+        history[key] = None
+        if len(history) > self._history:
+            history.popitem(last=False)
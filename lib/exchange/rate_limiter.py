@@ -0,0 +1,163 @@
+"""
+Token-bucket rate limiter shared by all processes using the same API key
+
+One bucket per exchange limit (request weight per minute, orders per 10s, ...):
+
+  - bucket refills continuously with `limit / interval`, request takes its
+    weight before it is sent, so usage is predicted instead of read from
+    response headers after the fact
+
+  - non-urgent requests keep `reserve` part of every bucket free and wait (up to
+    `timeout`) for tokens, urgent requests (cancels, market orders) could take
+    everything and are never blocked
+
+  - exchange reports real usage with `Sync` (from headers), bucket is never
+    above what exchange says is left
+
+State is kept in small file in `/dev/shm` (or temp dir) and guarded with
+`flock`, so independent bots on the same host and key see the same buckets
+(file is opened again after fork or unpickling: flock is per open file, not per process).
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+BUCKET = struct.Struct('<dq')  # tokens left, last refill (monotonic ns, 0 - not initialized)
+
+SHM_DIR = '/dev/shm'
+
+
+class RateLimiter:
+    def __init__(self, name: str, limits: Dict[str, Tuple[int, int]], reserve: float = 0.0, timeout: float = 0.0):
+        """
+        :param name: shared state name (exchange + API key), hashed for file name
+        :param limits: bucket name --> (limit, interval in ns)
+        :param reserve: part of every bucket kept for urgent requests
+        :param timeout: max seconds non-urgent request waits for tokens
+        """
+        self._limits = limits
+        self._reserve = reserve
+        self._timeout = timeout
+
+        self._offsets = {bucket: idx * BUCKET.size for idx, bucket in enumerate(sorted(limits))}
+
+        directory = SHM_DIR if os.path.isdir(SHM_DIR) else tempfile.gettempdir()
+        digest = hashlib.sha1(f'{name}:{sorted(limits.items())}'.encode()).hexdigest()[:16]
+        self._path = os.path.join(directory, f'rate-limiter-{digest}')
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._memory = None
+
+    def __getstate__(self) -> dict:
+        # Lock, file and mapping belong to process: pickled copy opens shared file again
+        return {k: v for k, v in self.__dict__.items() if k not in ('_lock', '_pid', '_fd', '_memory')}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state, _lock=threading.Lock(), _pid=None, _fd=None, _memory=None)
+
+    def Acquire(self, costs: Dict[str, int], urgent: bool = False) -> bool:
+        """
+        Take tokens from buckets before request
+
+        :param costs: bucket name --> tokens (unknown buckets are ignored)
+        :return: False if non-urgent request got no tokens in `timeout` (nothing is taken)
+        """
+        deadline = time.monotonic() + self._timeout
+
+        while True:
+            delay = self._take(costs, urgent)
+            if delay == 0:
+                return True
+
+            if time.monotonic() + delay > deadline:
+                return False
+
+            time.sleep(delay)
+
+    def Sync(self, used: Dict[str, int]):
+        """
+        Correct buckets with real usage reported by exchange (headers or WS `rateLimits`)
+        """
+        with self._locked():
+            now = time.monotonic_ns()
+            for bucket, value in used.items():
+                if bucket in self._offsets:
+                    tokens = self._refill(bucket, now)
+                    self._write(bucket, min(tokens, self._limits[bucket][0] - value), now)
+
+    def getUsage(self) -> Dict[str, float]:
+        """
+        Used part of every bucket (0 - idle, 1 - exhausted)
+        """
+        with self._locked():
+            now = time.monotonic_ns()
+            return {bucket: 1 - self._refill(bucket, now) / limit for bucket, (limit, _) in self._limits.items()}
+
+    def _take(self, costs: Dict[str, int], urgent: bool) -> float:
+        """
+        :return: 0 if tokens are taken, else seconds until they could be
+        """
+        with self._locked():
+            now = time.monotonic_ns()
+            tokens = {bucket: self._refill(bucket, now) for bucket in costs if bucket in self._offsets}
+
+            if not urgent:
+                delay = 0
+                for bucket, value in tokens.items():
+                    limit, interval = self._limits[bucket]
+                    missing = costs[bucket] + self._reserve * limit - value
+                    if missing > 0:
+                        delay = max(delay, missing * interval / limit * 1e-9)
+
+                if delay > 0:
+                    return delay
+
+            for bucket, value in tokens.items():
+                self._write(bucket, value - costs[bucket], now)
+
+            return 0
+
+    def _refill(self, bucket: str, now: int) -> float:
+        limit, interval = self._limits[bucket]
+        tokens, updated = BUCKET.unpack_from(self._memory, self._offsets[bucket])
+
+        if updated == 0:
+            return float(limit)
+
+        return min(float(limit), tokens + (now - updated) * limit / interval)
+
+    def _write(self, bucket: str, tokens: float, now: int):
+        BUCKET.pack_into(self._memory, self._offsets[bucket], tokens, now)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _open(self):
+        size = BUCKET.size * len(self._limits)
+
+        self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        self._memory = mmap.mmap(self._fd, size)
+        self._pid = os.getpid()
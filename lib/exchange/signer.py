@@ -0,0 +1,35 @@
+"""
+Request signing with pre-keyed HMAC
+
+Key schedule (inner/outer padded key) is computed once per exchange instance,
+every signature is only `copy` + `update` of that prepared state.
+"""
+import base64
+import hashlib
+import hmac
+from typing import Optional
+
+
+class Signer:
+    def __init__(self, secret: Optional[str], digestmod=hashlib.sha256):
+        self._secret = secret
+        self._digestmod = digestmod
+        self._hmac = hmac.new(secret.encode(), digestmod=digestmod) if secret is not None else None
+
+    def __getstate__(self) -> dict:
+        # HMAC state could not be pickled (exchange sent to spawned process): key schedule is made again
+        return dict(secret=self._secret, digestmod=self._digestmod)
+
+    def __setstate__(self, state: dict):
+        self.__init__(**state)
+
+    def Hex(self, payload: str) -> str:
+        return self._digest(payload).hexdigest()
+
+    def Base64(self, payload: str) -> str:
+        return base64.b64encode(self._digest(payload).digest()).decode()
+
+    def _digest(self, payload: str):
+        digest = self._hmac.copy()
+        digest.update(payload.encode())
+        return digest
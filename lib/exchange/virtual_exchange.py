@@ -20,6 +20,7 @@ from lib.exchange import AbstractExchange, Order, Book, Balance
 from lib.factory import AbstractFactory
 from lib.helpers import custom_dump, sign
 from lib.history import AbstractHistory
+from lib.instruments import get_instruments
 from lib.logger import AbstractLogger
 from lib.producer import AbstractProducer
 from lib.timer import AbstractTimer
@@ -40,6 +41,8 @@ REPLACE_LIMITS_AFTER = 15 * KEY.ONE_SECOND
 REQUEST_ATTEMPT = 3
 REQUEST_TIMEOUT = 0.5
 
+DATA_INSTRUMENTS = 'BINANCE.FUTURES.DATA'  # Instruments cache name for `data/binance.futures.json`
+
 
 class VirtualExchange(AbstractExchange):
     def __init__(self, config: dict, factory: AbstractFactory, timer: AbstractTimer, symbol: Optional[str] = None):
@@ -54,10 +57,12 @@ class VirtualExchange(AbstractExchange):
         # Override exchange name
         self._symbol, self._exchange = self._config[KEY.SYMBOL], self._config[KEY.EXCHANGE]
 
-        exchange_info = self._get_exchange_info()
-        self._tick = self._get_tick(exchange_info)
-        self._min_qty = self._get_min_qty(exchange_info)
-        self._min_notional = self._get_min_notional(exchange_info)
+        # Cached apart from live exchange: data file could differ from exchange
+        product_info = get_instruments(DATA_INSTRUMENTS, lambda: self._get_exchange_info()['symbols'],
+                                       symbol=self._symbol)[self._symbol]
+        self._tick = self._get_tick(product_info)
+        self._min_qty = self._get_min_qty(product_info)
+        self._min_notional = self._get_min_notional(product_info)
 
 
     ##############################################################################
@@ -173,23 +178,17 @@ class VirtualExchange(AbstractExchange):
                 'symbols': yaml.load(fp, Loader=yaml.Loader)
             }
 
-    def _get_tick(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info['symbols'] if x[KEY.SYMBOL] == self._symbol][0]
-
+    def _get_tick(self, product_info: dict) -> Decimal:
         filter = [x for x in product_info['filters'] if x ['filterType'] == 'PRICE_FILTER'][0]
 
         return Decimal(filter['tickSize'])
 
-    def _get_min_qty(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info['symbols'] if x[KEY.SYMBOL] == self._symbol][0]
-
+    def _get_min_qty(self, product_info: dict) -> Decimal:
         filter = [x for x in product_info['filters'] if x ['filterType'] == 'LOT_SIZE'][0]
 
         return Decimal(filter['stepSize'])
 
-    def _get_min_notional(self, exchange_info: dict) -> Decimal:
-        product_info = [x for x in exchange_info['symbols'] if x[KEY.SYMBOL] == self._symbol][0]
-
+    def _get_min_notional(self, product_info: dict) -> Decimal:
         filter = [x for x in product_info['filters'] if x ['filterType'] == 'MIN_NOTIONAL'][0]
 
         return Decimal(filter['notional'])
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Order entry over websocket (Binance WS API and other JSON request/reply venues)
+
+One persistent connection per exchange instance. Every request is JSON message
+with unique "id" and reply is matched back by the same "id", so any number of
+orders could be in flight on one socket without HTTP overhead.
+
+Nothing is resent here: if socket is not connected `Request` returns None and
+exchange goes with usual REST request, messages which could not be sent (socket
+failed in the middle of batch) are reported back for the same REST fallback.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent import futures
+from typing import Callable, Dict, List, Optional, Tuple
+
+import websocket
+
+from lib.helpers import custom_dump
+from lib.logger import AbstractLogger
+
+RECONNECT_SECONDS = 5
+CONNECT_TIMEOUT_SECONDS = 5
+
+
+class WsOrderEntry:
+    def __init__(self, url: str, logger: AbstractLogger, timeout: float, name: str = 'ws',
+                 on_connect: Optional[Callable[[websocket.WebSocket], None]] = None):
+        """
+        :param timeout: seconds to wait for reply
+        :param on_connect: called with fresh socket before any request (login etc.)
+        """
+        self._url = url
+        self._logger = logger
+        self._timeout = timeout
+        self._name = name
+        self._on_connect = on_connect
+
+        self._ws: Optional[websocket.WebSocket] = None
+        self._pending: Dict[str, futures.Future] = dict()
+        self._sequence = itertools.count()
+
+        self._lock = threading.Lock()  # One writer at a time
+        self._pid = None
+
+    def isOnline(self) -> bool:
+        return self._ws is not None and self._pid == os.getpid()
+
+    def Request(self, messages: List[dict]) -> Optional[Tuple[List[Optional[dict]], List[int]]]:
+        """
+        Send messages (all at once) and wait for replies
+
+        :return: (reply per message, indexes of messages which were not sent), reply is None if
+                 there was no reply in time or message was not sent. None if nothing was sent
+        """
+        self._start()
+
+        ws = self._ws
+        if ws is None:
+            return None
+
+        sent: Dict[int, Tuple[str, futures.Future]] = dict()
+        unsent = []
+
+        for idx, message in enumerate(messages):
+            # Socket is broken: the rest of batch is not even tried
+            if unsent:
+                unsent.append(idx)
+                continue
+
+            message_id = str(next(self._sequence))
+            future = self._pending[message_id] = futures.Future()
+
+            try:
+                with self._lock:
+                    ws.send(json.dumps(dict(message, id=message_id), default=custom_dump))
+            except Exception:
+                self._pending.pop(message_id, None)
+                unsent.append(idx)
+                continue
+
+            sent[idx] = (message_id, future)
+
+        if not sent:
+            return None
+
+        futures.wait([x for _, x in sent.values()], timeout=self._timeout)
+
+        # Late replies are dropped by reader
+        for message_id, _ in sent.values():
+            self._pending.pop(message_id, None)
+
+        replies = [None] * len(messages)
+        for idx, (_, future) in sent.items():
+            if future.done() and future.exception() is None:
+                replies[idx] = future.result()
+
+        return replies, unsent
+
+    def __getstate__(self) -> dict:
+        # Socket, lock and reader thread belong to process: pickled copy connects again on first request
+        return dict(url=self._url, logger=self._logger, timeout=self._timeout, name=self._name,
+                    on_connect=self._on_connect)
+
+    def __setstate__(self, state: dict):
+        self.__init__(**state)
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._ws = None
+                self._pending = dict()
+                threading.Thread(target=self._run, name=f'{self._name}-ws', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            try:
+                ws = websocket.create_connection(self._url, timeout=CONNECT_TIMEOUT_SECONDS)
+                ws.settimeout(None)
+
+                if self._on_connect is not None:
+                    self._on_connect(ws)
+
+                self._ws = ws
+                self._logger.info(f'Order websocket connected: {self._url}', event='API')
+
+                while True:
+                    message = json.loads(ws.recv())
+
+                    future = self._pending.pop(str(message.get('id', None)), None)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+
+            except Exception as e:
+                self._logger.warning(f'Order websocket disconnected: {e}', event='API')
+
+            self._ws = None
+
+            # In-flight requests will not get reply
+            pending, self._pending = self._pending, dict()
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f'{self._name}: websocket disconnected'))
+
+            time.sleep(RECONNECT_SECONDS)
@@ -0,0 +1,126 @@
+"""
+Bounded priority executor for REST orders and other background jobs
+
+Fixed number of daemon workers take jobs from one priority queue:
+
+  - URGENT (cancels, market/liquidation orders) jumps ahead of NORMAL
+    (new LIMIT orders) and LOW (background jobs)
+
+  - queue is bounded: when `max_pending` jobs are waiting, non-urgent jobs are
+    rejected (future gets `queue.Full`), urgent jobs are always accepted
+
+  - queue wait is traced as `dispatch` stage, `getStats` gives back-pressure counters,
+    which are passed to `report` every `EXECUTOR_STATS_SECONDS` (exchange writes them to database)
+
+Workers are started on first `Submit` (and again after fork), so executor
+could be created in constructors and module scope. Pickled executor (exchange
+sent to spawned process) is created again there, without queued jobs.
+"""
+import itertools
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+from lib.defaults import DEFAULT
+from lib.tracer import TRACER, STAGE
+
+
+class PRIORITY:
+    URGENT = 0
+    NORMAL = 1
+    LOW = 2
+
+
+PRIORITY_NAMES = {PRIORITY.URGENT: 'urgent', PRIORITY.NORMAL: 'normal', PRIORITY.LOW: 'low'}
+
+
+class PriorityExecutor:
+    def __init__(self, workers: int, max_pending: int, name: str = 'executor',
+                 report: Optional[Callable[[Dict[str, int]], None]] = None):
+        """
+        :param report: called with `getStats` periodically (from own thread) once executor is used
+        """
+        self._workers = workers
+        self._max_pending = max_pending
+        self._name = name
+        self._report = report
+
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()  # FIFO inside one priority
+        self._lock = threading.Lock()
+        self._pid = None
+
+        self._stats = dict(submitted=0, rejected=0, max_pending=0, max_wait=0)
+
+    def __getstate__(self) -> dict:
+        # Queue, lock and worker threads belong to process
+        return dict(workers=self._workers, max_pending=self._max_pending, name=self._name, report=self._report)
+
+    def __setstate__(self, state: dict):
+        self.__init__(**state)
+
+    def Submit(self, fn: Callable, *args, priority: int = PRIORITY.NORMAL, **kwargs) -> Future:
+        future = Future()
+
+        pending = self._queue.qsize()
+        if pending >= self._max_pending and priority != PRIORITY.URGENT:
+            self._stats['rejected'] += 1
+            future.set_exception(queue.Full(f'{self._name}: {pending} jobs pending'))
+            return future
+
+        self._start()
+
+        self._stats['submitted'] += 1
+        self._stats['max_pending'] = max(self._stats['max_pending'], pending + 1)
+
+        self._queue.put((priority, next(self._sequence), time.perf_counter_ns(), fn, args, kwargs, future))
+        return future
+
+    def getStats(self) -> Dict[str, int]:
+        """
+        Counters since previous call (`max_wait` in ns) and current queue size
+        """
+        stats, self._stats = self._stats, dict(submitted=0, rejected=0, max_pending=0, max_wait=0)
+        return dict(stats, pending=self._queue.qsize(), workers=self._workers)
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                for idx in range(self._workers):
+                    threading.Thread(target=self._work, name=f'{self._name}-{idx}', daemon=True).start()
+                if self._report is not None:
+                    threading.Thread(target=self._run_report, name=f'{self._name}-stats', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run_report(self):
+        while True:
+            time.sleep(DEFAULT.EXECUTOR_STATS_SECONDS)
+
+            try:
+                self._report(self.getStats())
+            except Exception as e:
+                sys.stderr.write(f'{self._name}: stats: {e}\n')
+
+    def _work(self):
+        while True:
+            priority, _, submitted, fn, args, kwargs, future = self._queue.get()
+
+            wait = time.perf_counter_ns() - submitted
+            TRACER.Add(STAGE.DISPATCH, PRIORITY_NAMES[priority], wait)
+            if wait > self._stats['max_wait']:
+                self._stats['max_wait'] = wait
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
@@ -1,5 +1,6 @@
 from typing import Type
 
+from lib.constants import KEY
 from lib.consumer import AbstractConsumer
 from lib.consumer.hazelcast_consumer import HazelcastConsumer
 from lib.consumer.no_consumer import NoConsumer
@@ -54,4 +55,9 @@ class BacktestFactory(AbstractFactory):
 
     @property
     def History(self) -> Type[AbstractHistory]:
+        # Recorder files (config `history: {path: ...}`) instead of Influx queries
+        if KEY.PATH in self._config.get(KEY.HISTORY_DB, {}):
+            from lib.history.recorder_history import RecorderHistory
+            return RecorderHistory
+
         return InfluxDbHistory
@@ -2,12 +2,13 @@
 Set of short helpers for various simple tasks
 """
 import importlib.util
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from pathlib import Path
 from pprint import pprint
 from typing import Any, List, Optional
 import json
+import re
 
 from lib.constants import KEY
 
@@ -75,44 +76,98 @@ Makes custom JSON dump with
 """
 
 
+def _dump_datetime(o: datetime) -> str:
+    return o.strftime(FORMAT)
+
+
+DUMPERS = {
+    Decimal: str,
+    datetime: _dump_datetime,
+}
+
+
 def custom_dump(o):
-    if isinstance(o, datetime):
-        return o.strftime(FORMAT)
+    dumper = DUMPERS.get(type(o))
+    if dumper is not None:
+        return dumper(o)
+    elif isinstance(o, datetime):
+        return _dump_datetime(o)
     elif isinstance(o, Decimal):
-        return f"{str(o)}"
+        return str(o)
     return o
 
 
 """
 Decode dump from previous function to JSON
+
+Every string is classified with one regex match instead of trying
+`strptime` and `Decimal` and catching exceptions:
+
+  - `FORMAT` datetime (with timezone) --> datetime
+
+  - number (as written by `str(Decimal)`) --> Decimal
+
+  - anything else is left as string
 """
 
+RE_VALUE = re.compile(
+    r"(?P<datetime>(\d{4})-(\d{1,2})-(\d{1,2})T(\d{1,2}):(\d{1,2}):(\d{1,2})\.(\d{1,6})"
+    r"(?:Z|([+-])(\d{2}):?([0-5]\d)(?::?([0-5]\d)(?:\.(\d{1,6}))?)?))"
+    r"|(?P<decimal>[+-]?(?:(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?|(?i:inf(?:inity)?|s?nan\d*)))"
+)
+
+
+def _load_datetime(match) -> Optional[datetime]:
+    year, month, day, hour, minute, second, fraction, tz_sign, tz_hour, tz_minute, tz_second, tz_fraction = \
+        match.group(2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13)
+
+    offset = timedelta()
+    if tz_sign is not None:
+        offset = timedelta(hours=int(tz_hour), minutes=int(tz_minute), seconds=int(tz_second or 0),
+                           microseconds=int((tz_fraction or "0").ljust(6, "0")))
+        if tz_sign == "-":
+            offset = -offset
+
+    try:
+        return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                        int(fraction.ljust(6, "0")), tzinfo=timezone(offset))
+    except ValueError:
+        # Looks like datetime, but out of range values (e.g. month 13)
+        return None
+
+
+def _load_str(value: str, datetimes: bool = True):
+    match = RE_VALUE.fullmatch(value)
+    if match is None:
+        return value
+    elif match.lastgroup == "decimal":
+        return Decimal(value)
+    elif datetimes:
+        result = _load_datetime(match)
+        if result is not None:
+            return result
+    return value
+
 
 def load_list(l: list) -> list:
     result = []
     for item in l:
-        if isinstance(item, str):
-            try:
-                result.append(Decimal(item))
-            except:
-                result.append(item)
-        elif isinstance(item, list):
+        if type(item) is str:
+            # Only numbers are decoded in lists (levels, prices...)
+            result.append(_load_str(item, datetimes=False))
+        elif type(item) is list:
             result.append(load_list(item))
+        else:
+            result.append(item)
     return result
 
 
 def custom_load(o):
     for key, value in o.items():
-        try:
-            o[key] = datetime.strptime(value, FORMAT)
-        except:
-            if isinstance(value, str):
-                try:
-                    o[key] = Decimal(value)
-                except:
-                    o[key] = value
-            elif isinstance(value, list):
-                o[key] = load_list(value)
+        if type(value) is str:
+            o[key] = _load_str(value)
+        elif type(value) is list:
+            o[key] = load_list(value)
     return o
 
 
@@ -132,19 +187,19 @@ def create_subscriptions(config: dict) -> dict:
             raise KeyError("Symbol, symbols or subscriptions missing in config file")
 
         config[KEY.SUBSCRIPTION] = {
-            config[KEY.EXCHANGE]: [config.get(KEY.SYMBOLS, [config.get(KEY.SYMBOL)])]
+            config[KEY.EXCHANGE]: list(config.get(KEY.SYMBOLS, None) or [config.get(KEY.SYMBOL)])
         }
 
-    for key, value in config.items():
+    for key, value in list(config.items()):
         if isinstance(value, dict):
             symbol, exchange = (
                 value.get(KEY.SYMBOL, None),
                 value.get(KEY.EXCHANGE, None),
             )
             if all([symbol, exchange]):
-                config[KEY.SUBSCRIPTION].append(
-                    {KEY.SYMBOL: symbol, KEY.EXCHANGE: exchange}
-                )
+                symbols = config[KEY.SUBSCRIPTION].setdefault(exchange, [])
+                if symbol not in symbols:
+                    symbols.append(symbol)
 
     return config
 
@@ -4,11 +4,10 @@ from pprint import pprint
 from typing import Optional, List
 
 import ciso8601
-from influxdb import InfluxDBClient
 from influxdb.resultset import ResultSet
 
 from lib.constants import KEY
-from lib.database.influx_db import DEFAULT_DATABASE
+from lib.database.influx_db import DEFAULT_DATABASE, get_client
 from lib.factory import AbstractFactory
 from lib.history import AbstractHistory
 from lib.timer import AbstractTimer
@@ -32,8 +31,8 @@ class InfluxDbHistory(AbstractHistory):
         if KEY.MEASUREMENT in influx_settings:
             del influx_settings[KEY.MEASUREMENT]
 
-        # Open database connection
-        self._client = InfluxDBClient(**influx_settings)
+        # Shared database connection, no write timeout: long queries are fine here
+        self._client = get_client({"timeout": None, **influx_settings})
 
 
     def getHistory(self, start_timestamp: int, end_timestamp: int, fields: Optional[List[str]] = None) -> list:
@@ -46,7 +45,7 @@ class InfluxDbHistory(AbstractHistory):
         query = f'SELECT {fields} FROM "{self._measurement}" WHERE "symbol"=\'{self._symbol}\' AND "exchange"=\'{self._exchange}\' ' \
                 f'AND TIME >= \'{start_time}\' AND TIME < \'{end_time}\' '
 
-        reply: ResultSet = self._client.query(query, chunked=True, chunk_size=CHUNK_SIZE)
+        reply: ResultSet = self._client.query(query, database=self._database, chunked=True, chunk_size=CHUNK_SIZE)
 
         payload = []
 
@@ -0,0 +1,73 @@
+import os
+from typing import Optional, List
+
+import pyarrow.dataset as ds
+
+from lib.constants import KEY
+from lib.database.recorder import BOOK, TRADE, CANDLE, COLUMNS, get_partition
+from lib.factory import AbstractFactory
+from lib.history import AbstractHistory
+from lib.timer import AbstractTimer
+
+# Recorder format --> pyarrow dataset format
+FORMATS = {KEY.PARQUET: 'parquet', KEY.ARROW: 'ipc'}
+
+
+class RecorderHistory(AbstractHistory):
+    """
+    History from files of market data recorder (see `lib.database.recorder`),
+    config `history: {path: ..., format: parquet}`
+
+    Rows are the same as `InfluxDbHistory` ones: dict with all requested fields
+    (None if event has no such field) and `timestamp`, ordered by timestamp
+    """
+    def __init__(self, config: dict, factory: AbstractFactory, timer: AbstractTimer):
+        super().__init__(config, factory, timer)
+
+        self._symbol = self._config[KEY.SYMBOL]
+        self._exchange = self._config[KEY.EXCHANGE]
+
+        settings = self._config.get(KEY.HISTORY_DB, {})
+        self._path = settings[KEY.PATH]
+        self._format = settings.get(KEY.FORMAT, KEY.PARQUET)
+
+    def getHistory(self, start_timestamp: int, end_timestamp: int, fields: Optional[List[str]] = None) -> list:
+        payload = []
+
+        for kind in (BOOK, TRADE, CANDLE):
+            columns = [x for x in COLUMNS[kind] if x not in (KEY.SYMBOL, KEY.EXCHANGE)]
+            if fields is not None:
+                columns = [x for x in columns if x in fields or x == KEY.TIMESTAMP]
+
+            files = self._get_files(kind, start_timestamp, end_timestamp)
+            if not files or len(columns) == 1:
+                continue
+
+            table = ds.dataset(files, format=FORMATS[self._format]).to_table(
+                columns=columns,
+                filter=(ds.field(KEY.SYMBOL) == self._symbol) & (ds.field(KEY.EXCHANGE) == self._exchange) &
+                       (ds.field(KEY.TIMESTAMP) >= start_timestamp) & (ds.field(KEY.TIMESTAMP) < end_timestamp))
+
+            data = table.to_pydict()
+            empty = dict.fromkeys(fields or [])
+            payload.extend({**empty, **dict(zip(columns, values))} for values in zip(*data.values()))
+
+        # Stable sort: book, trade and candle with the same timestamp keep this order
+        payload.sort(key=lambda x: x[KEY.TIMESTAMP])
+
+        return payload
+
+    def _get_files(self, kind: str, start_timestamp: int, end_timestamp: int) -> List[str]:
+        """
+        Files of hour partitions overlapping [start, end)
+        """
+        files = []
+
+        for hour in range(start_timestamp // KEY.ONE_HOUR, (end_timestamp - 1) // KEY.ONE_HOUR + 1):
+            directory = get_partition(self._path, kind, hour)
+
+            if os.path.isdir(directory):
+                files.extend(os.path.join(directory, x) for x in sorted(os.listdir(directory))
+                             if x.endswith(f'.{self._format}'))
+
+        return files
@@ -0,0 +1,79 @@
+"""
+Instrument metadata cache (tick size, lot size, contract value, ...)
+
+exchangeInfo/instruments requests are heavy and the same for every product, so
+they are made once per `ttl` for all exchange instances, streams and tools on the host:
+
+  - in memory: instruments indexed by symbol, per cache name (one per exchange)
+
+  - on disk: json file per cache name in temp dir, shared between processes
+
+`loader` (REST request or data file) is called only if both are missing or expired,
+or if they have no `symbol` asked for (listed after cache was made).
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from lib.defaults import DEFAULT
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'instruments')
+
+_instruments: Dict[str, Tuple[float, Dict[str, dict]]] = dict()
+_lock = threading.Lock()
+
+
+def get_instruments(name: str, loader: Callable[[], Iterable[dict]], key: str = 'symbol',
+                    ttl: float = DEFAULT.INSTRUMENTS_TTL_SECONDS, symbol: Optional[str] = None) -> Dict[str, dict]:
+    """
+    :param name: cache name (exchange)
+    :param loader: returns all instruments of exchange
+    :param key: instrument field with symbol
+    :param ttl: seconds
+    :param symbol: instrument which has to be in result, cache without it is loaded again regardless of `ttl`
+    :return: {symbol: instrument}
+    """
+    with _lock:
+        now = time.time()
+
+        updated, instruments = _instruments.get(name, (0, None))
+        if instruments is not None and now - updated < ttl and (symbol is None or symbol in instruments):
+            return instruments
+
+        path = os.path.join(CACHE_DIR, f'{name}.json')
+        try:
+            updated = os.path.getmtime(path)
+            if now - updated < ttl:
+                with open(path, 'r') as fp:
+                    instruments = json.load(fp)
+
+                if symbol is None or symbol in instruments:
+                    _instruments[name] = (updated, instruments)
+                    return instruments
+
+        except (OSError, ValueError):
+            pass
+
+        instruments = {x[key]: x for x in loader()}
+        _instruments[name] = (now, instruments)
+        _save(path, instruments)
+
+        return instruments
+
+
+def _save(path: str, instruments: Dict[str, dict]):
+    # Write and rename: other processes never read half-written file
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+
+        temp_path = f'{path}.{os.getpid()}'
+        with open(temp_path, 'w') as fp:
+            json.dump(instruments, fp, default=str)
+
+        os.replace(temp_path, path)
+
+    except OSError:
+        pass
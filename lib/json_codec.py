@@ -0,0 +1,41 @@
+"""
+Fastest available JSON decoder for websocket messages
+
+orjson --> ujson --> stdlib json, whichever is installed first. All of them
+accept str, orjson also accepts bytes/memoryview, so inflated frames are
+passed without `.decode()` when possible.
+
+Numbers in exchange payloads are strings anyway, so backends give the same
+result; Decimal conversion is done once per field by the stream handlers.
+"""
+import json
+
+try:
+    import orjson
+
+    BACKEND = 'orjson'
+
+    def loads(data):
+        return orjson.loads(data)
+
+except ImportError:
+    try:
+        import ujson
+
+        BACKEND = 'ujson'
+
+        def loads(data):
+            return ujson.loads(data)
+
+    except ImportError:
+        BACKEND = 'json'
+
+        def loads(data):
+            return json.loads(data)
+
+
+def loads_bytes(data: bytes):
+    """
+    Decode utf-8 bytes (e.g. inflated frame) without extra copy for orjson
+    """
+    return loads(data) if BACKEND == 'orjson' else loads(data.decode('utf-8'))
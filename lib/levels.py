@@ -0,0 +1,140 @@
+"""
+Compact order book side for `LevelEvent`
+
+Prices and quantities are kept as scaled integers in one `array('q')`
+(price0, qty0, price1, qty1, ...) with one decimal exponent per column:
+
+  - no Decimal objects are created in stream process or in supervisor loop,
+    the array is pickled (or copied into ring buffer) as raw bytes
+
+  - bots still get list-like levels: `asks[0][0]`, `asks[:5]`,
+    `for price, qty in asks` give Decimals, created only on access
+
+  - `sumQty`, `priceFor` and `asFloats` work on integers directly (database fields,
+    imbalance, impact-aware sizing)
+"""
+from array import array
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+Number = Union[str, int, float, Decimal]
+
+
+def _scaled(value: Number) -> Tuple[int, int]:
+    """
+    Return (coefficient, exponent) of value, exchange strings are parsed without Decimal
+    """
+    if isinstance(value, str) and 'e' not in value and 'E' not in value:
+        head, _, tail = value.partition('.')
+        return int(head + tail), -len(tail)
+
+    value = Decimal(str(value)) if isinstance(value, float) else Decimal(value)
+    exponent = value.as_tuple().exponent
+    return int(value.scaleb(-exponent)), exponent
+
+
+def _num(value: Number) -> Union[str, int, Decimal]:
+    return str(value) if isinstance(value, float) else value
+
+
+def _column(scaled: list) -> Tuple[list, int]:
+    # Common (smallest) exponent for the whole column
+    exponent = min((x for _, x in scaled), default=0)
+    return [coefficient * 10 ** (x - exponent) for coefficient, x in scaled], exponent
+
+
+class Levels(Sequence):
+    __slots__ = ('_values', '_price_exponent', '_qty_exponent')
+
+    def __init__(self, values: array, price_exponent: int, qty_exponent: int):
+        self._values = values
+        self._price_exponent = price_exponent
+        self._qty_exponent = qty_exponent
+
+    @classmethod
+    def fromPairs(cls, levels: Iterable[list], qty_multiplier: Optional[Decimal] = None) -> 'Levels':
+        """
+        Create from exchange levels: [[price, qty, ...], ...] as strings or numbers
+
+        :param qty_multiplier: contract value for exchanges with qty in contracts
+        """
+        levels = list(levels)
+
+        prices, price_exponent = _column([_scaled(x[0]) for x in levels])
+
+        if qty_multiplier is None:
+            qtys, qty_exponent = _column([_scaled(x[1]) for x in levels])
+        else:
+            qtys, qty_exponent = _column([_scaled(Decimal(_num(x[1])) * qty_multiplier) for x in levels])
+
+        values = array('q', [0]) * (2 * len(levels))
+        values[0::2] = array('q', prices)
+        values[1::2] = array('q', qtys)
+
+        return cls(values, price_exponent, qty_exponent)
+
+    def __reduce__(self):
+        return Levels, (self._values, self._price_exponent, self._qty_exponent)
+
+    def __len__(self) -> int:
+        return len(self._values) // 2
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                return [self[x] for x in range(start, stop, step)]
+            return Levels(self._values[2 * start:2 * max(start, stop)], self._price_exponent, self._qty_exponent)
+
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('Levels index out of range')
+
+        return (
+            Decimal(self._values[2 * idx]).scaleb(self._price_exponent),
+            Decimal(self._values[2 * idx + 1]).scaleb(self._qty_exponent),
+        )
+
+    def __iter__(self) -> Iterator[Tuple[Decimal, Decimal]]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Levels, list, tuple)):
+            return len(self) == len(other) and all(tuple(x) == tuple(y) for x, y in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'Levels({[[str(p), str(q)] for p, q in self]})'
+
+    @property
+    def exponents(self) -> Tuple[int, int]:
+        return self._price_exponent, self._qty_exponent
+
+    @property
+    def values(self) -> array:
+        """
+        Raw scaled integers: price0, qty0, price1, qty1...
+        """
+        return self._values
+
+    def sumQty(self, depth: Optional[int] = None) -> Decimal:
+        return Decimal(sum(self._values[1:2 * (depth or len(self)):2])).scaleb(self._qty_exponent)
+
+    def priceFor(self, qty: Decimal) -> Optional[Decimal]:
+        """
+        Worst price reached when taking `qty` from these levels, None if depth is not enough
+        """
+        target, total = Decimal(qty).scaleb(-self._qty_exponent), 0
+        for idx in range(0, len(self._values), 2):
+            total += self._values[idx + 1]
+            if total >= target:
+                return Decimal(self._values[idx]).scaleb(self._price_exponent)
+        return None
+
+    def asFloats(self) -> Iterator[Tuple[float, float]]:
+        price_scale, qty_scale = 10 ** -self._price_exponent, 10 ** -self._qty_exponent
+        for idx in range(0, len(self._values), 2):
+            yield self._values[idx] / price_scale, self._values[idx + 1] / qty_scale
@@ -1,4 +1,3 @@
-import copy
 from typing import Optional
 
 from lib.async_ejector import LogAsyncEjector
@@ -18,6 +17,6 @@ class DbLogger(ConsoleLogger):
     def _post_message(self, message: str, data: dict, level: str):
         super()._post_message(message, data, level)
 
-        # Run async ejector to push data to database
+        # Queue log line to database writer (ejector adds keys: shallow copy)
         LogAsyncEjector(self._database, self._timer,
-                        message, copy.deepcopy(data), level).start()
+                        message, dict(data), level).start()
@@ -0,0 +1,133 @@
+"""
+Local order book maintained from diff-depth (incremental) streams
+
+  - levels are kept as original exchange strings (checksum is calculated over
+    them), keyed by Decimal price with sorted keys (bisect): update is O(log n)
+    search, top-N is a slice
+
+  - sequence/sync rules are exchange specific and live in streams, book only
+    remembers last applied `update_id`
+
+  - `getLevels` returns `Levels` for `LevelEvent`, so bots get as many levels
+    as configured instead of fixed partial depth (5-10)
+"""
+import zlib
+from bisect import bisect_left, insort
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lib.levels import Levels
+
+CHECKSUM_DEPTH = 25  # levels per side in OKEx checksum
+
+
+class BookSide:
+    """
+    One side of the book, best price first (bids are keyed by negative price)
+    """
+    __slots__ = ('_levels', '_keys', '_sign')
+
+    def __init__(self, reverse: bool = False):
+        self._levels: Dict[Decimal, Tuple[str, str]] = {}
+        self._keys: List[Decimal] = []
+        self._sign = -1 if reverse else +1
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def Clear(self):
+        self._levels.clear()
+        self._keys.clear()
+
+    def Set(self, price: str, qty: str):
+        """
+        Set level qty, zero qty removes level
+        """
+        key = self._sign * Decimal(price)
+
+        if float(qty) == 0:
+            if self._levels.pop(key, None) is not None:
+                del self._keys[bisect_left(self._keys, key)]
+
+        else:
+            if key not in self._levels:
+                insort(self._keys, key)
+            self._levels[key] = (price, qty)
+
+    def getTop(self, depth: Optional[int] = None) -> List[Tuple[str, str]]:
+        return [self._levels[x] for x in self._keys[:depth]]
+
+
+class OrderBook:
+    def __init__(self, qty_multiplier: Optional[Decimal] = None):
+        """
+        :param qty_multiplier: contract value for exchanges with qty in contracts
+        """
+        self.asks = BookSide()
+        self.bids = BookSide(reverse=True)
+
+        self.update_id: Optional[int] = None  # Last applied exchange update id (sequence)
+
+        self._qty_multiplier = qty_multiplier
+        self._ready = False
+
+    def isReady(self) -> bool:
+        """
+        True after snapshot, False after `Clear` (gap or checksum error --> resync)
+        """
+        return self._ready
+
+    def setReady(self):
+        self._ready = True
+
+    def Clear(self):
+        self.asks.Clear()
+        self.bids.Clear()
+        self.update_id = None
+        self._ready = False
+
+    def Snapshot(self, asks: Iterable[list], bids: Iterable[list], update_id: Optional[int] = None,
+                 ready: bool = True):
+        """
+        :param ready: False if stream has to apply first update covering snapshot yet (`setReady` then)
+        """
+        self.Clear()
+        self.Update(asks, bids, update_id)
+        self._ready = ready
+
+    def Update(self, asks: Iterable[list], bids: Iterable[list], update_id: Optional[int] = None):
+        """
+        Apply levels as [price, qty, ...] exchange strings
+        """
+        for item in asks:
+            self.asks.Set(item[0], item[1])
+
+        for item in bids:
+            self.bids.Set(item[0], item[1])
+
+        self.update_id = update_id
+
+    def getLevels(self, depth: Optional[int] = None) -> Tuple[Levels, Levels]:
+        """
+        Top `depth` levels (all if None) of asks and bids
+        """
+        return (
+            Levels.fromPairs(self.asks.getTop(depth), qty_multiplier=self._qty_multiplier),
+            Levels.fromPairs(self.bids.getTop(depth), qty_multiplier=self._qty_multiplier),
+        )
+
+    def getChecksum(self) -> int:
+        """
+        OKEx CRC32 (signed) of "bid_price:bid_qty:ask_price:ask_qty:..." for top 25 levels
+        """
+        asks, bids = self.asks.getTop(CHECKSUM_DEPTH), self.bids.getTop(CHECKSUM_DEPTH)
+
+        parts = []
+        for idx in range(CHECKSUM_DEPTH):
+            if idx < len(bids):
+                parts.extend(bids[idx])
+            if idx < len(asks):
+                parts.extend(asks[idx])
+
+        checksum = zlib.crc32(':'.join(parts).encode())
+        return checksum - (1 << 32) if checksum >= (1 << 31) else checksum
@@ -0,0 +1,282 @@
+"""
+Shared memory ring buffer with `multiprocessing.Queue` interface
+
+Used as `AbstractSupervisor.Queue` when config has `transport: {type: ring}`:
+
+  - many writers (stream processes, consumer threads) serialize on one short lock,
+    single reader (supervisor loop) is lock-free
+
+  - no pipe and no feeder thread: records are copied directly into shared memory
+    and the reader is woken up with a semaphore
+
+  - Book/Trade/Candle events are fixed-size binary records, Level events are
+    header + raw bytes of `Levels` arrays; any other object (or event that can't be packed)
+    is pickled into variable-length record
+"""
+import pickle
+import queue
+import struct
+import sys
+import time
+from array import array
+from decimal import Decimal
+from multiprocessing import Lock, Semaphore
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple, Optional
+
+from lib.event import BookEvent, TradeEvent, CandleEvent, LevelEvent
+from lib.levels import Levels
+
+HEADER_SIZE = 64  # head and tail counters (uint64) + padding
+
+STR_SIZE = 24  # max symbol/exchange length for binary records
+
+WAIT_FOR_SPACE = 0.0001  # seconds to wait when ring is full
+
+RECORD = struct.Struct('<IB')  # payload length, record kind
+
+
+class KIND:
+    PICKLE = 0
+    BOOK = 1
+    TRADE = 2
+    CANDLE = 3
+    LEVEL = 4
+
+
+# symbol, exchange, timestamp, latency|finished, trace (received, created), ...
+BOOK = struct.Struct(f'<{STR_SIZE}s{STR_SIZE}sqqqq' + 'qb' * 4)
+TRADE = struct.Struct(f'<{STR_SIZE}s{STR_SIZE}sqqqq' + 'qb' * 2 + '8s')
+CANDLE = struct.Struct(f'<{STR_SIZE}s{STR_SIZE}sq?qq' + 'qb' * 5)
+# ..., n_asks, n_bids, exponents (ask price, ask qty, bid price, bid qty) + `Levels` values
+LEVEL = struct.Struct(f'<{STR_SIZE}s{STR_SIZE}sqqqqHHbbbb')
+
+LEVEL_VALUE_SIZE = 8  # `array('q')` item size
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode()
+    if len(data) > STR_SIZE:
+        raise ValueError(f'String too long for binary record: {value}')
+    return data
+
+
+def _unpack_str(data: bytes) -> str:
+    return data.rstrip(b'\0').decode()
+
+
+def _pack_decimal(value: Decimal) -> Tuple[int, int]:
+    exponent = value.as_tuple().exponent
+    return int(value.scaleb(-exponent)), exponent
+
+
+def _unpack_decimal(coefficient: int, exponent: int) -> Decimal:
+    return Decimal(coefficient).scaleb(exponent)
+
+
+def _pack_trace(trace: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    return trace or (0, 0)
+
+
+def _unpack_trace(received: int, created: int) -> Optional[Tuple[int, int]]:
+    return (received, created) if created else None
+
+
+def encode(item) -> Tuple[int, bytes]:
+    try:
+        if type(item) is BookEvent:
+            return KIND.BOOK, BOOK.pack(
+                _pack_str(item.symbol), _pack_str(item.exchange), item.timestamp, item.latency,
+                *_pack_trace(item.trace),
+                *_pack_decimal(item.ask_price), *_pack_decimal(item.ask_qty),
+                *_pack_decimal(item.bid_price), *_pack_decimal(item.bid_qty),
+            )
+
+        elif type(item) is TradeEvent:
+            return KIND.TRADE, TRADE.pack(
+                _pack_str(item.symbol), _pack_str(item.exchange), item.timestamp, item.latency,
+                *_pack_trace(item.trace),
+                *_pack_decimal(item.price), *_pack_decimal(item.qty),
+                item.side.encode(),
+            )
+
+        elif type(item) is CandleEvent:
+            return KIND.CANDLE, CANDLE.pack(
+                _pack_str(item.symbol), _pack_str(item.exchange), item.timestamp, item.finished,
+                *_pack_trace(item.trace),
+                *_pack_decimal(item.open), *_pack_decimal(item.high), *_pack_decimal(item.low),
+                *_pack_decimal(item.close), *_pack_decimal(item.volume),
+            )
+
+        elif type(item) is LevelEvent:
+            asks = item.asks if type(item.asks) is Levels else Levels.fromPairs(item.asks)
+            bids = item.bids if type(item.bids) is Levels else Levels.fromPairs(item.bids)
+
+            return KIND.LEVEL, LEVEL.pack(
+                _pack_str(item.symbol), _pack_str(item.exchange), item.timestamp, item.latency,
+                *_pack_trace(item.trace),
+                len(asks), len(bids), *asks.exponents, *bids.exponents,
+            ) + asks.values.tobytes() + bids.values.tobytes()
+
+    except (ValueError, TypeError, AttributeError, OverflowError, struct.error):
+        pass
+
+    return KIND.PICKLE, pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode(kind: int, data: bytes):
+    if kind == KIND.BOOK:
+        symbol, exchange, timestamp, latency, received, created, *d = BOOK.unpack(data)
+        return BookEvent(
+            ask_price=_unpack_decimal(d[0], d[1]), ask_qty=_unpack_decimal(d[2], d[3]),
+            bid_price=_unpack_decimal(d[4], d[5]), bid_qty=_unpack_decimal(d[6], d[7]),
+            symbol=_unpack_str(symbol), exchange=_unpack_str(exchange),
+            timestamp=timestamp, latency=latency, trace=_unpack_trace(received, created),
+        )
+
+    elif kind == KIND.TRADE:
+        symbol, exchange, timestamp, latency, received, created, *d, side = TRADE.unpack(data)
+        return TradeEvent(
+            price=_unpack_decimal(d[0], d[1]), qty=_unpack_decimal(d[2], d[3]),
+            side=_unpack_str(side),
+            symbol=_unpack_str(symbol), exchange=_unpack_str(exchange),
+            timestamp=timestamp, latency=latency, trace=_unpack_trace(received, created),
+        )
+
+    elif kind == KIND.CANDLE:
+        symbol, exchange, timestamp, finished, received, created, *d = CANDLE.unpack(data)
+        return CandleEvent(
+            open=_unpack_decimal(d[0], d[1]), high=_unpack_decimal(d[2], d[3]),
+            low=_unpack_decimal(d[4], d[5]), close=_unpack_decimal(d[6], d[7]),
+            volume=_unpack_decimal(d[8], d[9]),
+            symbol=_unpack_str(symbol), exchange=_unpack_str(exchange),
+            timestamp=timestamp, finished=finished, trace=_unpack_trace(received, created),
+        )
+
+    elif kind == KIND.LEVEL:
+        symbol, exchange, timestamp, latency, received, created, n_asks, n_bids, *exponents = \
+            LEVEL.unpack_from(data)
+
+        split = LEVEL.size + 2 * n_asks * LEVEL_VALUE_SIZE
+        asks, bids = array('q'), array('q')
+        asks.frombytes(data[LEVEL.size:split])
+        bids.frombytes(data[split:split + 2 * n_bids * LEVEL_VALUE_SIZE])
+
+        return LevelEvent(
+            asks=Levels(asks, exponents[0], exponents[1]), bids=Levels(bids, exponents[2], exponents[3]),
+            symbol=_unpack_str(symbol), exchange=_unpack_str(exchange),
+            timestamp=timestamp, latency=latency, trace=_unpack_trace(received, created),
+        )
+
+    return pickle.loads(data)
+
+
+class RingBufferQueue:
+    def __init__(self, size: int):
+        self._shm = SharedMemory(create=True, size=HEADER_SIZE + size)
+        self._owner = True
+
+        self._lock = Lock()  # Writers lock
+        self._items = Semaphore(0)  # Amount of records ready to read
+
+        self._attach()
+        self._index[0] = 0  # head: total bytes written
+        self._index[1] = 0  # tail: total bytes read
+
+    def __getstate__(self):
+        return self._shm.name, self._lock, self._items
+
+    def __setstate__(self, state):
+        name, self._lock, self._items = state
+        self._shm = SharedMemory(name=name)
+        self._owner = False
+        self._attach()
+
+    def _attach(self):
+        self._index = self._shm.buf[:16].cast('Q')
+        self._buffer = self._shm.buf[HEADER_SIZE:]
+        self._capacity = len(self._buffer)
+
+    def _write(self, position: int, data: bytes):
+        offset = position % self._capacity
+        first = min(len(data), self._capacity - offset)
+        self._buffer[offset:offset + first] = data[:first]
+        if first < len(data):
+            self._buffer[:len(data) - first] = data[first:]
+
+    def _read(self, position: int, size: int) -> bytes:
+        offset = position % self._capacity
+        first = min(size, self._capacity - offset)
+        data = bytes(self._buffer[offset:offset + first])
+        if first < size:
+            data += bytes(self._buffer[:size - first])
+        return data
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None):
+        kind, payload = encode(item)
+        record = RECORD.pack(len(payload), kind) + payload
+
+        if len(record) > self._capacity:
+            raise ValueError(f'Record size {len(record)} exceeds ring capacity {self._capacity}')
+
+        deadline = time.monotonic() + timeout if block and timeout is not None else None
+
+        if not self._lock.acquire(block, timeout if block else None):
+            raise queue.Full
+
+        try:
+            head = self._index[0]
+
+            # Ring is full: wait for the reader (no longer than timeout, other writers wait on lock)
+            while head + len(record) - self._index[1] > self._capacity:
+                if not block or (deadline is not None and time.monotonic() >= deadline):
+                    raise queue.Full
+                time.sleep(WAIT_FOR_SPACE)
+
+            self._write(head, record)
+            self._index[0] = head + len(record)
+
+        finally:
+            self._lock.release()
+
+        self._items.release()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        if not self._items.acquire(block, timeout if block else None):
+            raise queue.Empty
+
+        tail = self._index[1]
+        size, kind = RECORD.unpack(self._read(tail, RECORD.size))
+        data = self._read(tail + RECORD.size, size)
+        self._index[1] = tail + RECORD.size + size
+
+        return decode(kind, data)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def empty(self) -> bool:
+        return self._index[0] == self._index[1]
+
+    def _release(self):
+        # Views must be released before SharedMemory could be closed
+        self._index.release()
+        self._buffer.release()
+
+    def close(self):
+        try:
+            self._release()
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+        except Exception as e:
+            sys.stderr.write(f'ring buffer: close: {e}\n')
+
+    def __del__(self):
+        try:
+            self._release()
+        except Exception:
+            pass
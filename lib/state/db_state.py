@@ -1,6 +1,5 @@
 import json
 
-from lib.async_ejector import FieldsAsyncEjector
 from lib.constants import DB
 from lib.database import AbstractDatabase
 from lib.factory import AbstractFactory
@@ -16,9 +15,9 @@ class DbState(AbstractState):
         self._database: AbstractDatabase = factory.Database(config, factory, timer)
 
     def Push(self, state: dict):
-        message = json.dumps(state, default=custom_dump).replace('"', '\\"')
-        FieldsAsyncEjector(self._database, self._timer,
-                           **{DB.STATE: message}).start()
+        message = json.dumps(state, default=custom_dump)
+        payload = self._database.Encode(fields={DB.STATE: message}, timestamp=self._timer.Timestamp())
+        self._database.writeEncoded([payload])
 
     def Pop(self) -> dict:
         return self._database.readLast(field=DB.STATE)
\ No newline at end of file
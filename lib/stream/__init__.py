@@ -1,23 +1,179 @@
+import time
 from abc import ABC, abstractmethod
-from typing import Type, Optional
+from dataclasses import dataclass, field
+from typing import Type, Optional, Tuple, List, Callable, NamedTuple, Dict
 
 from lib.constants import KEY
+from lib.database import AbstractDatabase
+from lib.database.no_db import NoDb
+from lib.database.recorder import Recorder, get_recorder
+from lib.defaults import DEFAULT
 from lib.factory import AbstractFactory
+from lib.order_book import OrderBook
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
 
 
+class Connection(NamedTuple):
+    """
+    Websocket connection of the stream, used by `AsyncStreamEngine`
+
+    `attribute` is the stream attribute which engine sets to the connection
+    (stream handlers use `self.<attribute>.send(...)` like with WebSocketApp)
+    """
+    url: str
+    on_message: Callable
+    on_open: Optional[Callable] = None
+    on_close: Optional[Callable] = None
+    attribute: Optional[str] = None
+
+
+@dataclass
+class Product:
+    """
+    Per-symbol state of the stream which serves many symbols over one connection
+    """
+    symbol: str  # target symbol (as in config)
+    exchange: str  # target exchange (as in config)
+    name: str  # symbol in exchange notation (as in stream messages)
+
+    # Variables for "Data Update Watchdog"
+    ask: Optional[float] = None
+    bid: Optional[float] = None
+    previous_ask: Optional[float] = None
+    previous_bid: Optional[float] = None
+    last_update_timestamp: Optional[int] = None
+
+    # Local order book from diff-depth stream (config `order_book`)
+    book: Optional[OrderBook] = None
+    pending: list = field(default_factory=list)  # diff updates received while waiting for REST snapshot
+    snapshot: Optional[dict] = None  # REST snapshot, set by request thread
+    snapshot_requested: bool = False
+    level_timestamp: int = 0  # last level record written to database
+
+    @property
+    def tags(self) -> dict:
+        return {KEY.SYMBOL: self.symbol, KEY.EXCHANGE: self.exchange}
+
+    def isStale(self, now: int) -> bool:
+        """
+        Return True if ask/bid was not updated for DEFAULT.NODATA_TIMEOUT
+        """
+        if self.ask != self.previous_ask or self.bid != self.previous_bid:
+            self.previous_ask = self.ask
+            self.previous_bid = self.bid
+            self.last_update_timestamp = now
+
+        return now - (self.last_update_timestamp or now) > DEFAULT.NODATA_TIMEOUT
+
+
 class AbstractStream(ABC):
+    # True if stream subscribes to all `config[KEY.SYMBOLS]` over one connection,
+    # otherwise service creates one stream per symbol
+    MULTI_SYMBOL = False
+
+    # True if stream implements `_get_connections` and could be run by `AsyncStreamEngine`,
+    # otherwise service runs it in its own process even with `engine: async`
+    SUPPORTS_ASYNC = False
+
     def __init__(self, config: dict, supervisor: AbstractSupervisor, factory: AbstractFactory, timer: AbstractTimer):
         self._config = config
         self._supervisor = supervisor
         self._factory = factory
         self._timer = timer
 
+        self._trace = bool(config.get(KEY.TRACE, False))
+        self._received = 0  # perf_counter_ns when current websocket message was received
+
+        # Columnar market data files (config `recorder`), in addition to or instead of database
+        self._recorder_settings: dict = self._config.get(KEY.RECORDER, None) or {}
+        self._get_recorder()  # Config errors (no pyarrow, unknown format) show up on start
+
     @abstractmethod
     def Run(self, start_timestamp: int = 0, end_timestamp: int = 0):
         pass
 
+    def _get_recorder(self) -> Optional[Recorder]:
+        """
+        Process-wide recorder, looked up instead of kept in stream: stream is pickled
+        to spawned process, which writes files with recorder of its own
+        """
+        if not self._recorder_settings:
+            return None
+
+        return get_recorder(self._recorder_settings[KEY.PATH],
+                            self._recorder_settings.get(KEY.FORMAT, KEY.PARQUET))
+
+    def _create_database(self) -> AbstractDatabase:
+        """
+        Stream database, `recorder: {influx: false}` turns it off (market data goes only to recorder)
+        """
+        settings = self._recorder_settings
+        if settings and not settings.get(KEY.INFLUX_DB, True):
+            return NoDb(self._config, factory=self._factory, timer=self._timer)
+
+        return self._factory.Database(self._config, factory=self._factory, timer=self._timer)
+
+    def _publish(self, event):
+        """
+        Send event to supervisor, market data events are recorded first
+        """
+        recorder = self._get_recorder()
+        if recorder is not None:
+            recorder.Add(event)
+
+        self._supervisor.Queue.put(event)
+
+    def _get_trace(self) -> Optional[Tuple[int, int]]:
+        """
+        Return (received, created) stamps for event created from current message
+        """
+        return (self._received, time.perf_counter_ns()) if self._trace else None
+
+    def _get_products(self, name: Callable[[str], str] = str.upper) -> Dict[str, Product]:
+        """
+        Create products for all stream symbols, key is symbol in exchange notation
+        """
+        symbols = self._config.get(KEY.SYMBOLS, None) or [self._config[KEY.SYMBOL]]
+
+        products = [Product(symbol=x, exchange=self._config[KEY.EXCHANGE], name=name(x)) for x in symbols]
+
+        return {x.name: x for x in products}
+
+    def _get_lag(self) -> int:
+        """
+        Local clock lag to exchange clock, ns. Blocking (ping + REST), so it is
+        called from `Run` (or concurrently by `AsyncStreamEngine`), not from constructor
+        """
+        return 0
+
+    def _get_connections(self) -> List[Connection]:
+        """
+        Websocket connections for `AsyncStreamEngine`, only used if `SUPPORTS_ASYNC`
+        """
+        return []
+
+    def _get_jobs(self) -> List[Tuple[Callable, float]]:
+        """
+        Periodic jobs as (function, interval in seconds)
+        """
+        return []
+
+
+def split_streams(groups: List[List[str]], max_streams: int) -> List[List[str]]:
+    """
+    Pack stream names into connections of at most `max_streams` streams,
+    streams of one group (symbol) always go to the same connection
+    """
+    connections = [[]]
+    for group in groups:
+        if connections[-1] and len(connections[-1]) + len(group) > max_streams:
+            connections.append([])
+        connections[-1].extend(group)
+
+    return connections
+
+
 def get_stream(config: dict, exchange: Optional[str] = None) -> Type[AbstractStream]:
     from lib.stream.okex_perp_websocket_stream import OkexPerpWebsocketStream
     from lib.stream.okex_spot_websocket_stream import OkexSpotWebsocketStream
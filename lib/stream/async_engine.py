@@ -0,0 +1,112 @@
+"""
+Asyncio stream engine: all websocket streams in one process and one event loop
+
+Used by `service.py` when config has `engine: async`, for streams with
+`SUPPORTS_ASYNC` (the rest still run in a process each). Stream objects are
+the same as for the process-per-stream mode, engine only uses their hooks:
+
+  - `_get_lag`: exchange clock calibration, for all streams concurrently
+
+  - `_get_connections`: websocket url and callbacks (messages are handled in the loop)
+
+  - `_get_jobs`: periodic jobs (flush, listen key...), run in default executor
+    because they make blocking database/REST calls
+"""
+import asyncio
+from typing import List, Callable, Optional
+
+import websockets
+
+from lib.constants import KEY
+from lib.factory import AbstractFactory
+from lib.logger import AbstractLogger
+from lib.stream import AbstractStream, Connection
+from lib.timer import AbstractTimer
+
+RECONNECT_TIMEOUT = 1  # seconds before reconnect if connection has no `on_close`
+
+PING_INTERVAL = 20  # seconds between websocket protocol pings
+
+OPCODE_PING = 0x9  # `websocket.ABNF.OPCODE_PING` for streams written for WebSocketApp
+
+
+class AsyncConnection:
+    """
+    WebSocketApp-like `send` for stream handlers and jobs (could be called from any thread)
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, ws):
+        self._loop = loop
+        self._ws = ws
+
+    def send(self, data, opcode: Optional[int] = None):
+        coroutine = self._ws.ping(data) if opcode == OPCODE_PING else self._ws.send(data)
+        asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+
+class AsyncStreamEngine:
+    def __init__(self, config: dict, streams: List[AbstractStream], factory: AbstractFactory, timer: AbstractTimer):
+        self._config = config
+        self._streams = streams
+        self._timer = timer
+
+        self._logger: AbstractLogger = factory.Logger(config, factory=factory, timer=timer)
+
+    def Run(self):
+        asyncio.run(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        started = self._timer.Timestamp()
+        lags = await asyncio.gather(*[loop.run_in_executor(None, x._get_lag) for x in self._streams])
+        for stream, lag in zip(self._streams, lags):
+            stream._adjust = lag
+
+        self._logger.info(f'Lag calibration for {len(self._streams)} streams '
+                          f'in {(self._timer.Timestamp() - started) / KEY.ONE_SECOND:.1f}s', event='ENGINE')
+
+        tasks = []
+        for stream in self._streams:
+            for fn, seconds in stream._get_jobs():
+                tasks.append(self._every(fn, seconds))
+
+            for connection in await loop.run_in_executor(None, stream._get_connections):
+                tasks.append(self._connect(stream, connection))
+
+        await asyncio.gather(*tasks)
+
+    async def _every(self, fn: Callable, seconds: float):
+        loop = asyncio.get_running_loop()
+
+        deadline = loop.time()
+        while True:
+            deadline += seconds
+            await asyncio.sleep(max(0, deadline - loop.time()))
+            try:
+                await loop.run_in_executor(None, fn)
+            except Exception as e:
+                self._logger.error(f'Job {fn.__name__}', event='ENGINE', error=str(e))
+
+    async def _connect(self, stream: AbstractStream, connection: Connection):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            try:
+                async with websockets.connect(connection.url, ping_interval=PING_INTERVAL, max_size=None) as ws:
+                    if connection.attribute is not None:
+                        setattr(stream, connection.attribute, AsyncConnection(loop, ws))
+
+                    if connection.on_open is not None:
+                        connection.on_open()
+
+                    async for message in ws:
+                        connection.on_message(message)
+
+            except Exception as e:
+                self._logger.error(f'Websocket {connection.url}', event='ENGINE', error=str(e))
+
+            # Same behaviour as WebSocketApp: stream decides what to do on close
+            if connection.on_close is not None:
+                await loop.run_in_executor(None, connection.on_close)
+
+            await asyncio.sleep(RECONNECT_TIMEOUT)
@@ -1,26 +1,27 @@
-import copy
-import json
 import os
 import signal
+import time
 from decimal import Decimal
 from pprint import pprint
-from typing import Optional
+from typing import Optional, List, Tuple, Callable
 
 import requests
 import websocket
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from lib.constants import KEY, DB, STATUS, QUEUE
+from lib import json_codec
+from lib.constants import KEY, DB, STATUS
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
+from lib.event import BookEvent, TradeEvent, CandleEvent, LevelEvent
 from lib.exchange.binance_futures_exchange import BinanceFuturesExchange
 from lib.factory import AbstractFactory
-from lib.helpers import custom_dump
+from lib.levels import Levels
 from lib.logger import AbstractLogger
 from lib.ping import get_binance_lag, get_binance_dex_lag
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
-from lib.stream import AbstractStream
+from lib.stream import AbstractStream, Connection
 
 WS_BOOK = '@ticker'
 WS_ALL_BOOK = '$all@allTickers'
@@ -39,14 +40,16 @@ LISTEN_KEY_EXPIRATION_MINUTES = 50
 LEVEL_UPDATE_TIME = 30 * KEY.ONE_SECOND
 
 class BinanceDexWebsocketStream(AbstractStream):
+    SUPPORTS_ASYNC = True
+
     def __init__(self, config: dict, supervisor: AbstractSupervisor, factory: AbstractFactory, timer: AbstractTimer):
         super().__init__(config, supervisor, factory, timer)
 
         # self._exchange = BinanceFuturesExchange(config, factory, timer)
-        self._database: AbstractDatabase = factory.Database(config, factory=factory, timer=timer)
+        self._database: AbstractDatabase = self._create_database()
         self._logger: AbstractLogger = factory.Logger(config, factory=factory, timer=timer)
 
-        self._adjust = get_binance_dex_lag()
+        self._adjust = 0  # Updated by `_get_lag` on Run
 
         self._symbol = self._symbol = self._construct_symbol()
         exchange_name = self._config.get(KEY.EXCHANGE, KEY.EXCHANGE_BINANCE_FUTURES)
@@ -58,8 +61,6 @@ class BinanceDexWebsocketStream(AbstractStream):
 
         self._streams = dict()
 
-        self._buffer = []
-
         self._lock = False
 
         # Variables for "Data Update Watchdog"
@@ -76,6 +77,8 @@ class BinanceDexWebsocketStream(AbstractStream):
     ##############################################################################
 
     def Run(self, start_timestamp: int = 0, end_timestamp: int = 0):
+        self._adjust = self._get_lag()
+
         scheduler = BackgroundScheduler()
         scheduler.add_job(self._flush, 'interval', seconds=1, max_instances=5)
         print(self._get_connection_string())
@@ -89,13 +92,18 @@ class BinanceDexWebsocketStream(AbstractStream):
     #
     ##############################################################################
 
-    def _flush(self):
-        ########################################################################
-        # Lets make data snapshot first and clear old one
-        ########################################################################
-        snapshot = copy.deepcopy(self._buffer)
-        self._buffer.clear()
+    def _get_lag(self) -> int:
+        return get_binance_dex_lag()
+
+    def _get_jobs(self) -> List[Tuple[Callable, float]]:
+        return [(self._flush, 1)]
+
+    def _get_connections(self) -> List[Connection]:
+        return [
+            Connection(url=self._get_connection_string(), on_message=self._on_message),
+        ]
 
+    def _flush(self):
         ########################################################################
         # Data Update Watchdog
         ########################################################################
@@ -111,12 +119,6 @@ class BinanceDexWebsocketStream(AbstractStream):
             self._timer.Sleep(1)
             os._exit(-1)
 
-        ########################################################################
-        # Flush data to database
-        ########################################################################
-        if snapshot:
-            self._database.writeEncoded(snapshot)
-
     def _get_connection_string(self) -> str:
         #  Set correct orderbook handler with "all symbols feature"
         if self._symbol == ALL_SYMBOL_ABBREVIATION:
@@ -163,29 +165,32 @@ class BinanceDexWebsocketStream(AbstractStream):
         }
 
         data = self._database.Encode(fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
-
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.TRADES,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: latency,
-            KEY.PRICE: message["p"],
-            KEY.QTY: message["q"],
-            KEY.SIDE: side,
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+        self._database.writeEncoded([data])
+
+        self._publish(TradeEvent(
+            price=Decimal(message["p"]),
+            qty=Decimal(message["q"]),
+            side=side,
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+            timestamp=exchange_timestamp,
+            latency=latency,
+            trace=self._get_trace(),
+        ))
 
     def _handle_level(self, message: dict, timestamp: int):
         exchange_timestamp = message["lastUpdateId"] * KEY.ONE_SECOND
 
-        ask_5_qty = sum([float(x) for _, x in message['asks'][:5]])
-        ask_10_qty = ask_5_qty + sum([float(x) for _, x in message['asks'][5:]])
+        asks = Levels.fromPairs(message['asks'][:10])
+        bids = Levels.fromPairs(message['bids'][:10])
+
+        ask_5_qty = float(asks.sumQty(5))
+        ask_10_qty = float(asks.sumQty())
 
-        bid_5_qty = sum([float(x) for _, x in message['bids'][:5]])
-        bid_10_qty = bid_5_qty + sum([float(x) for _, x in message['bids'][5:]])
+        bid_5_qty = float(bids.sumQty(5))
+        bid_10_qty = float(bids.sumQty())
 
-        spread = Decimal(message['asks'][0][0]) - Decimal(message['bids'][0][0])
+        spread = asks[0][0] - bids[0][0]
 
         fields = {
             KEY.SPREAD: float(spread),
@@ -195,33 +200,22 @@ class BinanceDexWebsocketStream(AbstractStream):
             KEY.BID_10_QTY: bid_10_qty,
         }
 
-        for side in ['asks', 'bids']:
-            for idx, (price, qty) in enumerate(message[side][:10]):
-                fields[f'ob_{side[0]}p_{idx}'] = float(price)
-                fields[f'ob_{side[0]}q_{idx}'] = float(qty)
+        for side, levels in [('a', asks), ('b', bids)]:
+            for idx, (price, qty) in enumerate(levels.asFloats()):
+                fields[f'ob_{side}p_{idx}'] = price
+                fields[f'ob_{side}q_{idx}'] = qty
 
         data = self._database.Encode(fields=fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
-
-        payload = {
-            KEY.ASKS: [
-                [Decimal(x[0]), Decimal(x[1])]
-                for x in message['asks'][:10]
-            ],
-            KEY.BIDS: [
-                [Decimal(x[0]), Decimal(x[1])]
-                for x in message['bids'][:10]
-            ]
-        }
+        self._database.writeEncoded([data])
 
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.LEVEL,
-            KEY.PAYLOAD: json.dumps(payload, default=custom_dump),
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: 0,
-        })
+        self._publish(LevelEvent(
+            asks=asks,
+            bids=bids,
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+            timestamp=exchange_timestamp,
+            trace=self._get_trace(),
+        ))
 
     def _handle_klines(self, message: dict, timestamp: int):
         print(message)
@@ -235,20 +229,20 @@ class BinanceDexWebsocketStream(AbstractStream):
 
         if finished:
             data = self._database.Encode(fields, timestamp=timestamp)
-            self._buffer.append(data)
-
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.CANDLES,
-            KEY.OPEN: message['k']['o'],
-            KEY.HIGH: message['k']['h'],
-            KEY.LOW: message['k']['l'],
-            KEY.CLOSE: message['k']['c'],
-            KEY.VOLUME: message['k']['v'],
-            KEY.FINISHED: finished,
-            KEY.TIMESTAMP: timestamp,
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+            self._database.writeEncoded([data])
+
+        self._publish(CandleEvent(
+            open=Decimal(message['k']['o']),
+            high=Decimal(message['k']['h']),
+            low=Decimal(message['k']['l']),
+            close=Decimal(message['k']['c']),
+            volume=Decimal(message['k']['v']),
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+            timestamp=timestamp,
+            finished=finished,
+            trace=self._get_trace(),
+        ))
 
     def _handle_book(self, message: dict, timestamp: int):
         exchange_timestamp = message["E"] * KEY.ONE_SECOND
@@ -275,7 +269,7 @@ class BinanceDexWebsocketStream(AbstractStream):
             }
 
             data = self._database.Encode(fields, timestamp=exchange_timestamp)
-            self._buffer.append(data)
+            self._database.writeEncoded([data])
 
         # Save ask/bid price to "Data Update Watchdog"
         self._ask = ask_price
@@ -287,22 +281,23 @@ class BinanceDexWebsocketStream(AbstractStream):
         else:
             symbol = self._target_symbol
 
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.ORDERBOOK,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: latency,
-            KEY.BID_PRICE: message["b"],
-            KEY.BID_QTY: message["B"],
-            KEY.ASK_PRICE: message["a"],
-            KEY.ASK_QTY: message["A"],
-            KEY.SYMBOL: symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+        self._publish(BookEvent(
+            ask_price=ask_price,
+            ask_qty=Decimal(message["A"]),
+            bid_price=bid_price,
+            bid_qty=Decimal(message["B"]),
+            symbol=symbol,
+            exchange=self._target_exchange,
+            timestamp=exchange_timestamp,
+            latency=latency,
+            trace=self._get_trace(),
+        ))
 
     def _on_message(self, message):
+        self._received = time.perf_counter_ns()
         timestamp = self._timer.Timestamp() - self._adjust
         try:
-            message = json.loads(message)
+            message = json_codec.loads(message)
 
             if self._symbol != ALL_SYMBOL_ABBREVIATION:
                 fn = self._streams.get(self._symbol.upper() + '@' + message['stream'], lambda x, y: print(x))
@@ -1,69 +1,85 @@
-import copy
-import json
 import os
 import signal
+import threading
+import time
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, List, Tuple, Callable
 
 import websocket
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from lib.constants import KEY, DB, STATUS, QUEUE
+from lib import json_codec
+from lib.constants import KEY, DB, SIDE, STATUS
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
+from lib.event import BookEvent, TradeEvent, CandleEvent, LevelEvent, AccountEvent, StatusEvent, MessageEvent
 from lib.exchange.binance_futures_exchange import BinanceFuturesExchange
 from lib.factory import AbstractFactory
-from lib.helpers import custom_dump
+from lib.levels import Levels
 from lib.logger import AbstractLogger
+from lib.order_book import OrderBook
 from lib.ping import get_binance_lag
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
-from lib.stream import AbstractStream
+from lib.stream import AbstractStream, Connection, Product, split_streams
 
 WS_FUNDING_RATE = '@markPrice'
 WS_BOOK = '@bookTicker'
 WS_TRADES = '@aggTrade'
 WS_LEVEL = '@depth10@100ms'
+WS_DEPTH = '@depth@0ms'  # diff-depth for local order book
 WS_KLINES = '@kline_1m'
 
 DEFAULT_WSS_URL = 'wss://fstream.binance.com'
 
 LISTEN_KEY_EXPIRATION_MINUTES = 50
 
+DEPTH_SNAPSHOT_LIMIT = 1000  # levels in REST snapshot for local order book
+
 LEVEL_UPDATE_TIME = 30 * KEY.ONE_SECOND
 
+MAX_STREAMS_PER_CONNECTION = 200  # Binance futures combined stream limit
+
+# Binance order status --> StatusEvent status (NEW_INSURANCE, NEW_ADL are not our orders)
+ORDER_STATUS_MAP = {
+    'NEW': STATUS.OPEN,
+    'PARTIALLY_FILLED': STATUS.PARTIALLY_FILLED,
+    'FILLED': STATUS.FILLED,
+    'CANCELED': STATUS.CANCELED,
+    'EXPIRED': STATUS.CANCELED,
+    'EXPIRED_IN_MATCH': STATUS.CANCELED,
+}
+
+
 class BinanceFuturesWebsocketStream(AbstractStream):
+    MULTI_SYMBOL = True
+    SUPPORTS_ASYNC = True
+
     def __init__(self, config: dict, supervisor: AbstractSupervisor, factory: AbstractFactory, timer: AbstractTimer):
         super().__init__(config, supervisor, factory, timer)
 
         self._exchange = BinanceFuturesExchange(config, factory, timer)
-        self._database: AbstractDatabase = factory.Database(config, factory=factory, timer=timer)
+        self._database: AbstractDatabase = self._create_database()
         self._logger: AbstractLogger = factory.Logger(config, factory=factory, timer=timer)
 
-        self._adjust = get_binance_lag()
+        self._adjust = 0  # Updated by `_get_lag` on Run
 
-        self._symbol = self._config[KEY.SYMBOL]
         exchange_name = self._config.get(KEY.EXCHANGE, KEY.EXCHANGE_BINANCE_FUTURES)
         self._wss_url = self._config.get(exchange_name, {}).get(KEY.WSS_URL, None) or DEFAULT_WSS_URL
 
-        # to make code general --> get target products independently
-        self._target_symbol = config[KEY.SYMBOL]
-        self._target_exchange = config[KEY.EXCHANGE]
-        self._target_tags = {KEY.SYMBOL: self._target_symbol, KEY.EXCHANGE: self._target_exchange}
+        # All symbols of the exchange over one connection: exchange symbol --> product state
+        self._products = self._get_products()
 
-        self._streams = dict()
+        # Levels per side sent to bot from local order book, 0 - use partial depth stream
+        self._order_book_depth = int(self._config.get(KEY.ORDER_BOOK, 0) or 0)
+        if self._order_book_depth:
+            for product in self._products.values():
+                product.book = OrderBook()
 
-        self._buffer = []
+        self._streams = dict()
 
         self._lock = False
 
-        # Variables for "Data Update Watchdog"
-        self._ask: Optional[float] = None
-        self._bid: Optional[float] = None
-        self._previous_ask: Optional[float] = None
-        self._previous_bid: Optional[float] = None
-        self._last_update_timestamp: Optional[int] = None
-
 
     ##############################################################################
     #
@@ -72,11 +88,20 @@ class BinanceFuturesWebsocketStream(AbstractStream):
     ##############################################################################
 
     def Run(self, start_timestamp: int = 0, end_timestamp: int = 0):
+        self._adjust = self._get_lag()
+
         scheduler = BackgroundScheduler()
         scheduler.add_job(self._get_listen_key, 'interval', minutes=LISTEN_KEY_EXPIRATION_MINUTES)
         scheduler.add_job(self._flush, 'interval', seconds=1, max_instances=5)
-        ws = websocket.WebSocketApp(self._get_connection_string(), on_message=self._on_message)
+        urls = self._get_connection_strings()
         scheduler.start()
+
+        # Symbols which don't fit into one connection go over extra connections in threads
+        for url in urls[1:]:
+            ws = websocket.WebSocketApp(url, on_message=self._on_message)
+            threading.Thread(target=ws.run_forever, daemon=True).start()
+
+        ws = websocket.WebSocketApp(urls[0], on_message=self._on_message)
         ws.run_forever()
 
     ##############################################################################
@@ -85,34 +110,31 @@ class BinanceFuturesWebsocketStream(AbstractStream):
     #
     ##############################################################################
 
-    def _flush(self):
-        ########################################################################
-        # Lets make data snapshot first and clear old one
-        ########################################################################
-        snapshot = copy.deepcopy(self._buffer)
-        self._buffer.clear()
+    def _get_lag(self) -> int:
+        return get_binance_lag()
+
+    def _get_jobs(self) -> List[Tuple[Callable, float]]:
+        return [
+            (self._flush, 1),
+            (self._get_listen_key, LISTEN_KEY_EXPIRATION_MINUTES * 60),
+        ]
 
+    def _get_connections(self) -> List[Connection]:
+        return [Connection(url=x, on_message=self._on_message) for x in self._get_connection_strings()]
+
+    def _flush(self):
         ########################################################################
         # Data Update Watchdog
         ########################################################################
-        if self._ask != self._previous_ask or self._bid != self._previous_bid:
-            self._previous_ask = self._ask
-            self._previous_bid = self._bid
-            self._last_update_timestamp = self._timer.Timestamp()
-
         now = self._timer.Timestamp()
-        if now - (self._last_update_timestamp or now) > DEFAULT.NODATA_TIMEOUT:
-            self._logger.error(f'Websocket Watchdog: No ask/bid update for {DEFAULT.NODATA_TIMEOUT/KEY.ONE_SECOND}s. Stop.')
+        stale = [x.symbol for x in self._products.values() if x.isStale(now)]
+        if stale:
+            self._logger.error(f'Websocket Watchdog: No ask/bid update for {DEFAULT.NODATA_TIMEOUT/KEY.ONE_SECOND}s '
+                               f'for {stale}. Stop.')
             os.kill(os.getppid(), signal.SIGHUP)
             self._timer.Sleep(1)
             os._exit(-1)
 
-        ########################################################################
-        # Flush data to database
-        ########################################################################
-        if snapshot:
-            self._database.writeEncoded(snapshot)
-
     def _get_listen_key(self):
         listen_key =  self._exchange._request(
             method=KEY.POST,
@@ -126,124 +148,233 @@ class BinanceFuturesWebsocketStream(AbstractStream):
 
 
 
-    def _get_connection_string(self) -> str:
-        self._streams[self._symbol.lower() + WS_TRADES] = self._handle_trades
-        self._streams[self._symbol.lower() + WS_BOOK] = self._handle_book
-        self._streams[self._symbol.lower() + WS_LEVEL] = self._handle_level
-        self._streams[self._symbol.lower() + WS_KLINES] = self._handle_klines
-        self._streams[self._symbol.lower() + WS_FUNDING_RATE] = self._handle_funding_rate
+    def _get_connection_strings(self) -> List[str]:
+        # Combined streams for all symbols, messages are routed to product by message["s"],
+        # no more than MAX_STREAMS_PER_CONNECTION streams per connection
+        groups = []
 
         listen_key = self._get_listen_key()
         if listen_key is not None:
             self._streams[listen_key] = self._handle_order
+            groups.append([listen_key])
+
+        for name in self._products.keys():
+            streams = {
+                name.lower() + WS_TRADES: self._handle_trades,
+                name.lower() + WS_BOOK: self._handle_book,
+                name.lower() + WS_KLINES: self._handle_klines,
+                name.lower() + WS_FUNDING_RATE: self._handle_funding_rate,
+            }
+            if self._order_book_depth:
+                streams[name.lower() + WS_DEPTH] = self._handle_depth
+            else:
+                streams[name.lower() + WS_LEVEL] = self._handle_level
+
+            self._streams.update(streams)
+            groups.append(list(streams))
+
+        return [self._wss_url + '/stream?streams=' + '/'.join(x)
+                for x in split_streams(groups, MAX_STREAMS_PER_CONNECTION)]
 
-        return self._wss_url + '/stream?streams=' + '/'.join(self._streams.keys())
+    def _encode(self, product: Product, fields: dict, timestamp: int) -> str:
+        return self._database.Encode(fields, timestamp=timestamp, tags=product.tags)
 
     def _handle_funding_rate(self, message: dict, timestamp: int):
-        data = self._database.Encode(
+        product = self._products[message["s"]]
+
+        data = self._encode(
+            product,
             fields={
                 KEY.MARK_PRICE: float(message["p"]),
                 KEY.INDEX_PRICE: float(message["i"]),
                 KEY.FUNDING_RATE: float(message["r"]),
             },
             timestamp=timestamp)
-        self._buffer.append(data)
+        self._database.writeEncoded([data])
 
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.MESSAGE,
-            KEY.PAYLOAD: json.dumps({
+        self._publish(MessageEvent(
+            payload={
                 KEY.TYPE: KEY.FUNDING_RATE,
-                KEY.SYMBOL: self._target_symbol,
-                KEY.EXCHANGE: self._target_exchange,
+                KEY.SYMBOL: product.symbol,
+                KEY.EXCHANGE: product.exchange,
                 KEY.FUNDING_RATE: float(message["r"]),
-            }, default=custom_dump),
-            KEY.TIMESTAMP: timestamp,
-            KEY.LATENCY: 0,
-        })
+            },
+            timestamp=timestamp,
+        ))
 
     def _handle_trades(self, message: dict, timestamp: int):
+        product = self._products[message["s"]]
         exchange_timestamp = message["T"] * KEY.ONE_MS
         latency = timestamp - exchange_timestamp
 
 
-        price, side = float(message["p"]), KEY.NONE
+        price, side = Decimal(message["p"]), KEY.NONE
+        qty = Decimal(message["q"])
 
-        if all([self._ask, self._bid]):
-            if price <= self._bid:
+        if all([product.ask, product.bid]):
+            if price <= product.bid:
                 side = KEY.SELL,
-            elif price <= self._ask:
+            elif price <= product.ask:
                 side = KEY.BUY
 
         fields = {
             KEY.PRICE: price,
-            KEY.QTY: float(message["q"]),
+            KEY.QTY: qty,
             KEY.SIDE: side,
             'is_buyer_market_maker': message["m"],
             DB.TRADE_LATENCY: latency,
         }
 
-        data = self._database.Encode(fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
+        data = self._encode(product, fields, timestamp=exchange_timestamp)
+        self._database.writeEncoded([data])
 
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.TRADES,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: latency,
-            KEY.PRICE: message["p"],
-            KEY.QTY: message["q"],
-            KEY.SIDE: side,
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+        self._publish(TradeEvent(
+            price=price,
+            qty=qty,
+            side=side,
+            symbol=product.symbol,
+            exchange=product.exchange,
+            timestamp=exchange_timestamp,
+            latency=latency,
+            trace=self._get_trace(),
+        ))
 
     def _handle_level(self, message: dict, timestamp: int):
-        exchange_timestamp = message["T"] * KEY.ONE_MS
+        product = self._products[message["s"]]
 
-        ask_5_qty = sum([float(x) for _, x in message['a'][:5]])
-        ask_10_qty = ask_5_qty + sum([float(x) for _, x in message['a'][5:]])
+        # Levels are parsed once into scaled integers, Decimals are created only when bot reads them
+        asks = Levels.fromPairs(message['a'][:10])
+        bids = Levels.fromPairs(message['b'][:10])
 
-        bid_5_qty = sum([float(x) for _, x in message['b'][:5]])
-        bid_10_qty = bid_5_qty + sum([float(x) for _, x in message['b'][5:]])
+        self._put_level(product, asks, bids, exchange_timestamp=message["T"] * KEY.ONE_MS)
 
-        spread = Decimal(message['a'][0][0]) - Decimal(message['b'][0][0])
+    def _handle_depth(self, message: dict, timestamp: int):
+        product = self._products[message["s"]]
+        book = product.book
 
-        fields = {
-            KEY.SPREAD: float(spread),
-            KEY.ASK_5_QTY: ask_5_qty,
-            KEY.ASK_10_QTY: ask_10_qty,
-            KEY.BID_5_QTY: bid_5_qty,
-            KEY.BID_10_QTY: bid_10_qty,
-        }
+        if not book.isReady():
+            self._sync_book(product, message)
 
-        for side in ['a', 'b']:
-            for idx, (price, qty) in enumerate(message[side][:10]):
-                fields[f'ob_{side}p_{idx}'] = float(price)
-                fields[f'ob_{side}q_{idx}'] = float(qty)
-
-        data = self._database.Encode(fields=fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
-
-        payload = {
-            KEY.ASKS: [
-                [Decimal(x[0]), Decimal(x[1])]
-                for x in message['a'][:10]
-            ],
-            KEY.BIDS: [
-                [Decimal(x[0]), Decimal(x[1])]
-                for x in message['b'][:10]
-            ]
-        }
+        elif message['pu'] == book.update_id:
+            book.Update(message['a'], message['b'], update_id=message['u'])
 
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.LEVEL,
-            KEY.PAYLOAD: json.dumps(payload, default=custom_dump),
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: 0,
-        })
+        else:
+            self._logger.warning(f'Order book gap for {product.symbol}. Resync', event='ORDER_BOOK',
+                                 update_id=book.update_id, pu=message['pu'])
+            book.Clear()
+            self._sync_book(product, message)
+
+        if not book.isReady():
+            return
+
+        exchange_timestamp = message["T"] * KEY.ONE_MS
+        asks, bids = book.getLevels(self._order_book_depth)
+
+        # Database gets the same top 10 fields as with partial depth stream, not more often than before
+        write = exchange_timestamp - product.level_timestamp >= DEFAULT.LEVEL_DB_INTERVAL
+        if write:
+            product.level_timestamp = exchange_timestamp
+
+        self._put_level(product, asks, bids, exchange_timestamp, write=write)
+
+    def _sync_book(self, product: Product, message: dict):
+        """
+        Diff-depth sync: buffer updates --> REST snapshot --> drop updates older than snapshot,
+        first update has to cover `lastUpdateId` (book is not ready until it comes),
+        every next one has `pu` == previous `u`
+        """
+        book = product.book
+        product.pending.append(message)
+
+        snapshot, product.snapshot = product.snapshot, None
+        if snapshot is not None:
+            product.snapshot_requested = False
+
+            last_update_id = snapshot.get('lastUpdateId', None)
+            if last_update_id is None:
+                self._logger.error(f'Order book snapshot for {product.symbol}', event='ORDER_BOOK', payload=snapshot)
+                product.pending.clear()
+                return
+
+            book.Snapshot(snapshot['asks'], snapshot['bids'], update_id=last_update_id, ready=False)
+
+        elif book.update_id is None:
+            # Snapshot is late: oldest updates go (if snapshot is older than the rest, sync fails and asks again)
+            if len(product.pending) > DEFAULT.ORDER_BOOK_MAX_PENDING:
+                del product.pending[:DEFAULT.ORDER_BOOK_MAX_PENDING // 2]
+
+            if not product.snapshot_requested:
+                product.snapshot_requested = True
+                threading.Thread(target=self._request_snapshot, args=(product,), daemon=True).start()
+            return
+
+        pending, product.pending = product.pending, []
+        for item in pending:
+            if book.isReady():
+                synced = item['pu'] == book.update_id
+
+            elif item['u'] < book.update_id:
+                continue
+
+            else:
+                synced = item['U'] <= book.update_id
+
+            if not synced:
+                # Gap, or snapshot is older than buffered updates: request new one on next update
+                book.Clear()
+                return
+
+            book.Update(item['a'], item['b'], update_id=item['u'])
+            book.setReady()
+
+    def _request_snapshot(self, product: Product):
+        snapshot = None
+        try:
+            snapshot = self._exchange._request(
+                method=KEY.GET,
+                endpoint='/fapi/v1/depth',
+                params=dict(symbol=product.name, limit=DEPTH_SNAPSHOT_LIMIT),
+            )
+        except Exception as e:
+            self._logger.error(f'Order book snapshot for {product.symbol}', event='ORDER_BOOK', error=str(e))
+        finally:
+            product.snapshot = snapshot
+            if snapshot is None:
+                # Next diff update asks again
+                product.snapshot_requested = False
+
+    def _put_level(self, product: Product, asks: Levels, bids: Levels, exchange_timestamp: int, write: bool = True):
+        if not asks or not bids:
+            return
+
+        if write:
+            fields = {
+                KEY.SPREAD: asks[0][0] - bids[0][0],
+                KEY.ASK_5_QTY: asks.sumQty(5),
+                KEY.ASK_10_QTY: asks.sumQty(10),
+                KEY.BID_5_QTY: bids.sumQty(5),
+                KEY.BID_10_QTY: bids.sumQty(10),
+            }
+
+            for side, levels in [('a', asks), ('b', bids)]:
+                for idx, (price, qty) in enumerate(levels[:10].asFloats()):
+                    fields[f'ob_{side}p_{idx}'] = price
+                    fields[f'ob_{side}q_{idx}'] = qty
+
+            data = self._encode(product, fields=fields, timestamp=exchange_timestamp)
+            self._database.writeEncoded([data])
+
+        self._publish(LevelEvent(
+            asks=asks,
+            bids=bids,
+            symbol=product.symbol,
+            exchange=product.exchange,
+            timestamp=exchange_timestamp,
+            trace=self._get_trace(),
+        ))
 
     def _handle_klines(self, message: dict, timestamp: int):
+        product = self._products[message["s"]]
         finished = message['k']['x']
         timestamp = message['k']['t'] * KEY.ONE_MS
 
@@ -252,52 +383,53 @@ class BinanceFuturesWebsocketStream(AbstractStream):
             fields[field] = float(message['k'][field[0]])
 
         if finished:
-            data = self._database.Encode(fields, timestamp=timestamp)
-            self._buffer.append(data)
-
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.CANDLES,
-            KEY.OPEN: message['k']['o'],
-            KEY.HIGH: message['k']['h'],
-            KEY.LOW: message['k']['l'],
-            KEY.CLOSE: message['k']['c'],
-            KEY.VOLUME: message['k']['v'],
-            KEY.FINISHED: finished,
-            KEY.TIMESTAMP: timestamp,
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+            data = self._encode(product, fields, timestamp=timestamp)
+            self._database.writeEncoded([data])
+
+        self._publish(CandleEvent(
+            open=Decimal(message['k']['o']),
+            high=Decimal(message['k']['h']),
+            low=Decimal(message['k']['l']),
+            close=Decimal(message['k']['c']),
+            volume=Decimal(message['k']['v']),
+            symbol=product.symbol,
+            exchange=product.exchange,
+            timestamp=timestamp,
+            finished=finished,
+            trace=self._get_trace(),
+        ))
 
     def _handle_book(self, message: dict, timestamp: int):
+        product = self._products[message["s"]]
         exchange_timestamp = message["T"] * KEY.ONE_MS
         latency = timestamp - exchange_timestamp
 
         fields = {
-            KEY.BID_PRICE: float(message["b"]),
-            KEY.BID_QTY: float(message["B"]),
-            KEY.ASK_PRICE: float(message["a"]),
-            KEY.ASK_QTY: float(message["A"]),
+            KEY.BID_PRICE: Decimal(message["b"]),
+            KEY.BID_QTY: Decimal(message["B"]),
+            KEY.ASK_PRICE: Decimal(message["a"]),
+            KEY.ASK_QTY: Decimal(message["A"]),
             DB.BOOK_LATENCY: int(latency),
         }
 
         # Save ask/bid price to "Data Update Watchdog"
-        self._ask = fields[KEY.ASK_PRICE]
-        self._bid = fields[KEY.BID_PRICE]
-
-        data = self._database.Encode(fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
-
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.ORDERBOOK,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: latency,
-            KEY.BID_PRICE: message["b"],
-            KEY.BID_QTY: message["B"],
-            KEY.ASK_PRICE: message["a"],
-            KEY.ASK_QTY: message["A"],
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+        product.ask = fields[KEY.ASK_PRICE]
+        product.bid = fields[KEY.BID_PRICE]
+
+        data = self._encode(product, fields, timestamp=exchange_timestamp)
+        self._database.writeEncoded([data])
+
+        self._publish(BookEvent(
+            ask_price=fields[KEY.ASK_PRICE],
+            ask_qty=fields[KEY.ASK_QTY],
+            bid_price=fields[KEY.BID_PRICE],
+            bid_qty=fields[KEY.BID_QTY],
+            symbol=product.symbol,
+            exchange=product.exchange,
+            timestamp=exchange_timestamp,
+            latency=latency,
+            trace=self._get_trace(),
+        ))
 
     def _handle_order(self, message: dict, timestamp: int):
         exchange_timestamp = message["T"] * KEY.ONE_MS
@@ -307,8 +439,24 @@ class BinanceFuturesWebsocketStream(AbstractStream):
         if message['e'] == 'ORDER_TRADE_UPDATE':
             order = message['o']
             status = order['X']
+            product = self._products.get(order['s'], None)
+
+            # Order tracker of exchange: fills move position, finished orders leave their level
+            if product is not None and status in ORDER_STATUS_MAP:
+                qty = Decimal(order['q'])
+                self._publish(StatusEvent(
+                    order_id=order['c'],
+                    status=ORDER_STATUS_MAP[status],
+                    price=Decimal(order['p']) or None,
+                    qty=qty if order['S'] == SIDE.BUY else -qty,
+                    pct=Decimal(order['z']) / qty if qty else Decimal(0),
+                    symbol=product.symbol,
+                    exchange=product.exchange,
+                    trade_id=str(order['t']) if order.get('t', 0) else None,
+                ))
+
             if status in [STATUS.FILLED, STATUS.PARTIALLY_FILLED]:
-                if order['s'] == self._symbol:
+                if product is not None:
                     pnl = float(order['rp'])
                     commission = float(order.get('n', '0'))
                     order_id = order['c']
@@ -316,11 +464,11 @@ class BinanceFuturesWebsocketStream(AbstractStream):
                     side = order['S']
                     qty = float(order['q'])
 
-                    data = self._database.Encode(fields={
+                    data = self._encode(product, fields={
                         KEY.REALIZED_PNL: pnl,
                         KEY.COMMISSION: commission
                     }, timestamp=exchange_timestamp)
-                    self._buffer.append(data)
+                    self._database.writeEncoded([data])
 
                     self._logger.warning(f'{status} event registered', event=status, pnl=pnl, commission=commission,
                                          orderId=order_id, price=average_price, side=side, qty=qty, payload=message)
@@ -336,33 +484,34 @@ class BinanceFuturesWebsocketStream(AbstractStream):
                 }
                 print(f'ACCOUNT: {fields}')
                 data = self._database.Encode(fields=fields, timestamp=exchange_timestamp)
-                self._buffer.append(data)
+                self._database.writeEncoded([data])
 
 
             for item in message['a']['P']:
-                if item['s'] == self._symbol:
+                product = self._products.get(item['s'], None)
+                if product is not None:
                     portfolio = float(item['pa'])
                     entry = float(item['ep'])
 
                     fields = {KEY.ENTRY: entry, KEY.PORTFOLIO: portfolio}
-                    data = self._database.Encode(fields=fields, timestamp=exchange_timestamp)
-                    self._buffer.append(data)
+                    data = self._encode(product, fields=fields, timestamp=exchange_timestamp)
+                    self._database.writeEncoded([data])
 
-                    self._supervisor.Queue.put({
-                        QUEUE.QUEUE: QUEUE.ACCOUNT,
-                        KEY.PRICE: item['ep'],
-                        KEY.QTY: item['pa'],
-                        KEY.SYMBOL: self._target_symbol,
-                        KEY.EXCHANGE: self._target_exchange,
-                    })
+                    self._publish(AccountEvent(
+                        price=Decimal(item['ep']),
+                        qty=Decimal(item['pa']),
+                        symbol=product.symbol,
+                        exchange=product.exchange,
+                    ))
 
                     self._logger.warning(f'ACCOUNT UPDATE event registered', event='ACCOUNT',
                                       portfolio=portfolio, entry=entry, payload=item)
 
     def _on_message(self, message):
+        self._received = time.perf_counter_ns()
         timestamp = self._timer.Timestamp() - self._adjust
         try:
-            message = json.loads(message)
+            message = json_codec.loads(message)
 
             fn = self._streams.get(message['stream'], lambda x, y: print(x))
             fn(message['data'], timestamp)
@@ -1,40 +1,71 @@
-import copy
-import json
 import os
 import signal
+import threading
+import time
 from decimal import Decimal
+from functools import partial
 from pprint import pprint
-from typing import Optional, Tuple, Union
+from typing import Optional, Tuple, Union, List, Callable
 
 import websocket
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from lib.constants import KEY, DB, STATUS, QUEUE
+from lib import json_codec
+from lib.constants import KEY, DB, SIDE, STATUS
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
+from lib.event import (
+    BookEvent,
+    TradeEvent,
+    CandleEvent,
+    LevelEvent,
+    AccountEvent,
+    StatusEvent,
+)
 from lib.exchange.binance_spot_exchange import BinanceSpotExchange
 from lib.factory import AbstractFactory
-from lib.helpers import custom_dump
+from lib.levels import Levels
 from lib.logger import AbstractLogger
+from lib.order_book import OrderBook
 from lib.ping import get_binance_lag
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
-from lib.stream import AbstractStream
+from lib.stream import AbstractStream, Connection, Product, split_streams
 
 WS_FUNDING_RATE = "@markPrice@1s"
 WS_BOOK = "@bookTicker"
 WS_TRADES = "@aggTrade"
 WS_LEVEL = "@depth10@100ms"
+WS_DEPTH = "@depth@100ms"  # diff-depth for local order book (fastest for spot)
 WS_KLINES = "@kline_1m"
 
 DEFAULT_WSS_URL = "wss://stream.binance.com:9443"
 
 LISTEN_KEY_EXPIRATION_MINUTES = 50
 
+DEPTH_SNAPSHOT_LIMIT = 1000  # levels in REST snapshot for local order book
+
 LEVEL_UPDATE_TIME = 30 * KEY.ONE_SECOND
 
+# Spot takes up to 1024 streams per connection, fewer keep url short
+MAX_STREAMS_PER_CONNECTION = 200
+
+# Binance order status --> StatusEvent status
+ORDER_STATUS_MAP = {
+    "NEW": STATUS.OPEN,
+    "PARTIALLY_FILLED": STATUS.PARTIALLY_FILLED,
+    "FILLED": STATUS.FILLED,
+    "CANCELED": STATUS.CANCELED,
+    "REJECTED": STATUS.CANCELED,
+    "EXPIRED": STATUS.CANCELED,
+    "EXPIRED_IN_MATCH": STATUS.CANCELED,
+}
+
 
 class BinanceSpotWebsocketStream(AbstractStream):
+    MULTI_SYMBOL = True
+    SUPPORTS_ASYNC = True
+
     def __init__(
         self,
         config: dict,
@@ -45,19 +76,22 @@ class BinanceSpotWebsocketStream(AbstractStream):
         super().__init__(config, supervisor, factory, timer)
 
         self._exchange = BinanceSpotExchange(self._config, factory, timer)
-        self._database: AbstractDatabase = factory.Database(
-            self._config, factory=factory, timer=timer
-        )
+        self._database: AbstractDatabase = self._create_database()
         self._logger: AbstractLogger = factory.Logger(
             self._config, factory=factory, timer=timer
         )
 
-        self._adjust = get_binance_lag()
+        self._adjust = 0  # Updated by `_get_lag` on Run
 
-        if KEY.SYMBOLS in self._config.keys():
-            self._symbols = self._config[KEY.SYMBOLS]
-        else:
-            self._symbols = self._config[KEY.SYMBOL]
+        # All symbols of the exchange over one connection: exchange symbol --> product state
+        self._products = self._get_products()
+
+        # Levels per side sent to bot from local order book, 0 - use partial depth stream
+        self._order_book_depth = int(self._config.get(KEY.ORDER_BOOK, 0) or 0)
+        if self._order_book_depth:
+            for product in self._products.values():
+                product.book = OrderBook()
+        self._symbols = [x.symbol for x in self._products.values()]
         exchange_name = self._config.get(KEY.EXCHANGE, KEY.EXCHANGE_BINANCE_SPOT)
         self._wss_url = (
             self._config.get(exchange_name, {}).get(KEY.WSS_URL, None)
@@ -79,17 +113,8 @@ class BinanceSpotWebsocketStream(AbstractStream):
 
         self._streams = dict()
 
-        self._buffer = []
-
         self._lock = False
 
-        # Variables for "Data Update Watchdog"
-        self._ask: Optional[float] = None
-        self._bid: Optional[float] = None
-        self._previous_ask: Optional[float] = None
-        self._previous_bid: Optional[float] = None
-        self._last_update_timestamp: Optional[int] = None
-
         # Variables for pnl tracking
         self._current = self._exchange.getPosition()
 
@@ -100,15 +125,22 @@ class BinanceSpotWebsocketStream(AbstractStream):
     ##############################################################################
 
     def Run(self, start_timestamp: int = 0, end_timestamp: int = 0):
+        self._adjust = self._get_lag()
+
         scheduler = BackgroundScheduler()
         scheduler.add_job(
             self._get_listen_key, "interval", minutes=LISTEN_KEY_EXPIRATION_MINUTES,
         )
         scheduler.add_job(self._flush, "interval", seconds=1, max_instances=15)
-        ws = websocket.WebSocketApp(
-            self._get_connection_string(), on_message=self._on_message
-        )
+        urls = self._get_connection_strings()
         scheduler.start()
+
+        # Symbols which don't fit into one connection go over extra ones in threads
+        for url in urls[1:]:
+            ws = websocket.WebSocketApp(url, on_message=self._on_message)
+            threading.Thread(target=ws.run_forever, daemon=True).start()
+
+        ws = websocket.WebSocketApp(urls[0], on_message=self._on_message)
         ws.run_forever()
 
     ##############################################################################
@@ -117,35 +149,38 @@ class BinanceSpotWebsocketStream(AbstractStream):
     #
     ##############################################################################
 
-    def _flush(self):
-        ########################################################################
-        # Lets make data snapshot first and clear old one
-        ########################################################################
-        snapshot = copy.deepcopy(self._buffer)
-        self._buffer.clear()
+    def _get_lag(self) -> int:
+        return get_binance_lag()
 
+    def _get_jobs(self) -> List[Tuple[Callable, float]]:
+        return [
+            (self._flush, 1),
+            (self._get_listen_key, LISTEN_KEY_EXPIRATION_MINUTES * 60),
+        ]
+
+    def _get_connections(self) -> List[Connection]:
+        return [
+            Connection(url=x, on_message=self._on_message)
+            for x in self._get_connection_strings()
+        ]
+
+    def _flush(self):
         ########################################################################
         # Data Update Watchdog
         ########################################################################
-        if self._ask != self._previous_ask or self._bid != self._previous_bid:
-            self._previous_ask = self._ask
-            self._previous_bid = self._bid
-            self._last_update_timestamp = self._timer.Timestamp()
-
         now = self._timer.Timestamp()
-        if now - (self._last_update_timestamp or now) > DEFAULT.NODATA_TIMEOUT:
+        stale = [x.symbol for x in self._products.values() if x.isStale(now)]
+        if stale:
             self._logger.error(
-                f"Websocket Watchdog: No ask/bid update for {DEFAULT.NODATA_TIMEOUT/KEY.ONE_SECOND}s. Stop."
+                f"Websocket Watchdog: No ask/bid update for {DEFAULT.NODATA_TIMEOUT/KEY.ONE_SECOND}s for {stale}. Stop."
             )
             os.kill(os.getppid(), signal.SIGHUP)
             self._timer.Sleep(1)
             os._exit(-1)
 
-        ########################################################################
-        # Flush data to database
-        ########################################################################
-        #if snapshot:
-        #    self._database.writeEncoded(snapshot)
+    def _write(self, data: str):
+        # Database writes are off for spot stream
+        pass
 
     def _get_listen_key(self):
         listen_key = self._exchange._request(
@@ -156,106 +191,240 @@ class BinanceSpotWebsocketStream(AbstractStream):
 
         return listen_key
 
-    def _get_connection_string(self) -> str:
+    def _get_connection_strings(self) -> List[str]:
 
-        for symbol in self._symbols:
-            self._streams[symbol.lower() + WS_TRADES] = self._handle_trades
-            self._streams[symbol.lower() + WS_BOOK] = self._handle_book
-            self._streams[symbol.lower() + WS_LEVEL] = self._handle_level
-            self._streams[symbol.lower() + WS_KLINES] = self._handle_klines
+        # Combined streams for all symbols, handlers are bound to product by stream
+        # name (partial depth messages have no symbol), no more than
+        # MAX_STREAMS_PER_CONNECTION streams per connection
+        groups = []
 
         listen_key = self._get_listen_key()
         if listen_key is not None:
             self._streams[listen_key] = self._handle_order
+            groups.append([listen_key])
 
-        self._logger.warning(
-            "Connecting to websocket: "
-            + self._wss_url
-            + "/stream?streams="
-            + "/".join(self._streams.keys())
-        )
+        for name, product in self._products.items():
+            streams = {
+                name.lower() + WS_TRADES: partial(self._handle_trades, product),
+                name.lower() + WS_BOOK: partial(self._handle_book, product),
+                name.lower() + WS_KLINES: partial(self._handle_klines, product),
+            }
+            if self._order_book_depth:
+                streams[name.lower() + WS_DEPTH] = partial(self._handle_depth, product)
+            else:
+                streams[name.lower() + WS_LEVEL] = partial(self._handle_level, product)
+
+            self._streams.update(streams)
+            groups.append(list(streams))
+
+        urls = [
+            self._wss_url + "/stream?streams=" + "/".join(x)
+            for x in split_streams(groups, MAX_STREAMS_PER_CONNECTION)
+        ]
 
-        return self._wss_url + "/stream?streams=" + "/".join(self._streams.keys())
+        for url in urls:
+            self._logger.warning("Connecting to websocket: " + url)
 
-    def _handle_trades(self, message: dict, timestamp: int):
+        return urls
+
+    def _encode(self, product: Product, fields: dict, timestamp: int) -> str:
+        return self._database.Encode(fields, timestamp=timestamp, tags=product.tags)
+
+    def _handle_trades(self, product: Product, message: dict, timestamp: int):
         exchange_timestamp = message["T"] * KEY.ONE_MS
         latency = timestamp - exchange_timestamp
 
-        price, side = float(message["p"]), KEY.NONE
+        price, side = Decimal(message["p"]), KEY.NONE
+        qty = Decimal(message["q"])
 
-        if all([self._ask, self._bid]):
-            if price <= self._bid:
+        if all([product.ask, product.bid]):
+            if price <= product.bid:
                 side = (KEY.SELL,)
-            elif price <= self._ask:
+            elif price <= product.ask:
                 side = KEY.BUY
 
         fields = {
             KEY.PRICE: price,
-            KEY.SYMBOL: message["s"],
-            KEY.QTY: float(message["q"]),
+            KEY.QTY: qty,
             KEY.SIDE: side,
             "is_buyer_market_maker": message["m"],
             DB.TRADE_LATENCY: latency,
         }
 
-        data = self._database.Encode(fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
-
-        self._supervisor.Queue.put(
-            {
-                QUEUE.QUEUE: QUEUE.TRADES,
-                KEY.SYMBOL: message["s"],
-                KEY.TIMESTAMP: exchange_timestamp,
-                KEY.LATENCY: latency,
-                KEY.PRICE: message["p"],
-                KEY.QTY: message["q"],
-                KEY.SIDE: side,
-                KEY.EXCHANGE: self._target_exchange,
-            }
+        data = self._encode(product, fields, timestamp=exchange_timestamp)
+        self._write(data)
+
+        self._publish(
+            TradeEvent(
+                price=price,
+                qty=qty,
+                side=side,
+                symbol=product.symbol,
+                exchange=product.exchange,
+                timestamp=exchange_timestamp,
+                latency=latency,
+                trace=self._get_trace(),
+            )
         )
 
-    def _handle_level(self, message: dict, timestamp: int):
-        ask_5_qty = sum([float(x) for _, x in message["asks"][:5]])
-        ask_10_qty = ask_5_qty + sum([float(x) for _, x in message["asks"][5:]])
+    def _handle_level(self, product: Product, message: dict, timestamp: int):
+        # Levels are parsed once into scaled integers, Decimals are created only when bot reads them
+        asks = Levels.fromPairs(message["asks"][:10])
+        bids = Levels.fromPairs(message["bids"][:10])
 
-        bid_5_qty = sum([float(x) for _, x in message["bids"][:5]])
-        bid_10_qty = bid_5_qty + sum([float(x) for _, x in message["bids"][5:]])
+        self._put_level(product, asks, bids, timestamp)
 
-        spread = Decimal(message["asks"][0][0]) - Decimal(message["bids"][0][0])
+    def _handle_depth(self, product: Product, message: dict, timestamp: int):
+        book = product.book
 
-        fields = {
-            KEY.SPREAD: float(spread),
-            KEY.ASK_5_QTY: ask_5_qty,
-            KEY.ASK_10_QTY: ask_10_qty,
-            KEY.BID_5_QTY: bid_5_qty,
-            KEY.BID_10_QTY: bid_10_qty,
-        }
+        if not book.isReady():
+            self._sync_book(product, message)
 
-        for side, field in [("asks", "a"), ("bids", "b")]:
-            for idx, (price, qty) in enumerate(message[side][:10]):
-                fields[f"ob_{field}p_{idx}"] = float(price)
-                fields[f"ob_{field}q_{idx}"] = float(qty)
+        elif message["U"] == book.update_id + 1:
+            book.Update(message["a"], message["b"], update_id=message["u"])
+
+        else:
+            self._logger.warning(
+                f"Order book gap for {product.symbol}. Resync",
+                event="ORDER_BOOK",
+                update_id=book.update_id,
+                U=message["U"],
+            )
+            book.Clear()
+            self._sync_book(product, message)
+
+        if not book.isReady():
+            return
+
+        exchange_timestamp = message["E"] * KEY.ONE_MS
+        asks, bids = book.getLevels(self._order_book_depth)
+
+        # Database gets the same top 10 fields as with partial depth stream, not more often than before
+        write = exchange_timestamp - product.level_timestamp >= DEFAULT.LEVEL_DB_INTERVAL
+        if write:
+            product.level_timestamp = exchange_timestamp
+
+        self._put_level(product, asks, bids, exchange_timestamp, write=write)
+
+    def _sync_book(self, product: Product, message: dict):
+        """
+        Diff-depth sync: buffer updates --> REST snapshot --> drop updates older than snapshot,
+        first update has to cover `lastUpdateId` + 1 (book is not ready until it comes),
+        every next one starts with previous `u` + 1
+        """
+        book = product.book
+        product.pending.append(message)
+
+        snapshot, product.snapshot = product.snapshot, None
+        if snapshot is not None:
+            product.snapshot_requested = False
+
+            last_update_id = snapshot.get("lastUpdateId", None)
+            if last_update_id is None:
+                self._logger.error(
+                    f"Order book snapshot for {product.symbol}",
+                    event="ORDER_BOOK",
+                    payload=snapshot,
+                )
+                product.pending.clear()
+                return
 
-        data = self._database.Encode(fields=fields, timestamp=timestamp)
-        self._buffer.append(data)
+            book.Snapshot(
+                snapshot["asks"], snapshot["bids"], update_id=last_update_id, ready=False
+            )
 
-        payload = {
-            KEY.ASKS: [[Decimal(x[0]), Decimal(x[1])] for x in message["asks"][:10]],
-            KEY.BIDS: [[Decimal(x[0]), Decimal(x[1])] for x in message["bids"][:10]],
-        }
+        elif book.update_id is None:
+            # Snapshot is late: oldest updates go (if snapshot is older than the rest,
+            # sync fails and asks again)
+            if len(product.pending) > DEFAULT.ORDER_BOOK_MAX_PENDING:
+                del product.pending[: DEFAULT.ORDER_BOOK_MAX_PENDING // 2]
+
+            if not product.snapshot_requested:
+                product.snapshot_requested = True
+                threading.Thread(
+                    target=self._request_snapshot, args=(product,), daemon=True
+                ).start()
+            return
+
+        pending, product.pending = product.pending, []
+        for item in pending:
+            if book.isReady():
+                synced = item["U"] == book.update_id + 1
+
+            elif item["u"] <= book.update_id:
+                continue
+
+            else:
+                synced = item["U"] <= book.update_id + 1
+
+            if not synced:
+                # Gap, or snapshot is older than buffered updates: request new one on next update
+                book.Clear()
+                return
+
+            book.Update(item["a"], item["b"], update_id=item["u"])
+            book.setReady()
+
+    def _request_snapshot(self, product: Product):
+        snapshot = None
+        try:
+            snapshot = self._exchange._request(
+                method=KEY.GET,
+                endpoint="/api/v3/depth",
+                params=dict(symbol=product.name, limit=DEPTH_SNAPSHOT_LIMIT),
+            )
+        except Exception as e:
+            self._logger.error(
+                f"Order book snapshot for {product.symbol}",
+                event="ORDER_BOOK",
+                error=str(e),
+            )
+        finally:
+            product.snapshot = snapshot
+            if snapshot is None:
+                # Next diff update asks again
+                product.snapshot_requested = False
 
-        self._supervisor.Queue.put(
-            {
-                QUEUE.QUEUE: QUEUE.LEVEL,
-                KEY.SYMBOL: message["s"],
-                KEY.PAYLOAD: json.dumps(payload, default=custom_dump),
-                KEY.EXCHANGE: self._target_exchange,
-                KEY.TIMESTAMP: timestamp,
-                KEY.LATENCY: 0,
+    def _put_level(
+        self,
+        product: Product,
+        asks: Levels,
+        bids: Levels,
+        timestamp: int,
+        write: bool = True,
+    ):
+        if not asks or not bids:
+            return
+
+        if write:
+            fields = {
+                KEY.SPREAD: asks[0][0] - bids[0][0],
+                KEY.ASK_5_QTY: asks.sumQty(5),
+                KEY.ASK_10_QTY: asks.sumQty(10),
+                KEY.BID_5_QTY: bids.sumQty(5),
+                KEY.BID_10_QTY: bids.sumQty(10),
             }
+
+            for field, levels in [("a", asks), ("b", bids)]:
+                for idx, (price, qty) in enumerate(levels[:10].asFloats()):
+                    fields[f"ob_{field}p_{idx}"] = price
+                    fields[f"ob_{field}q_{idx}"] = qty
+
+            data = self._encode(product, fields=fields, timestamp=timestamp)
+            self._write(data)
+
+        self._publish(
+            LevelEvent(
+                asks=asks,
+                bids=bids,
+                symbol=product.symbol,
+                exchange=product.exchange,
+                timestamp=timestamp,
+                trace=self._get_trace(),
+            )
         )
 
-    def _handle_klines(self, message: dict, timestamp: int):
+    def _handle_klines(self, product: Product, message: dict, timestamp: int):
         finished = message["k"]["x"]
         timestamp = message["k"]["t"] * KEY.ONE_MS
 
@@ -264,56 +433,55 @@ class BinanceSpotWebsocketStream(AbstractStream):
             fields[field] = float(message["k"][field[0]])
 
         if finished:
-            data = self._database.Encode(fields, timestamp=timestamp)
-            self._buffer.append(data)
-
-        self._supervisor.Queue.put(
-            {
-                QUEUE.QUEUE: QUEUE.CANDLES,
-                KEY.SYMBOL: message["s"],
-                KEY.OPEN: message["k"]["o"],
-                KEY.HIGH: message["k"]["h"],
-                KEY.LOW: message["k"]["l"],
-                KEY.CLOSE: message["k"]["c"],
-                KEY.VOLUME: message["k"]["v"],
-                KEY.FINISHED: finished,
-                KEY.TIMESTAMP: timestamp,
-                KEY.EXCHANGE: self._target_exchange,
-            }
+            data = self._encode(product, fields, timestamp=timestamp)
+            self._write(data)
+
+        self._publish(
+            CandleEvent(
+                open=Decimal(message["k"]["o"]),
+                high=Decimal(message["k"]["h"]),
+                low=Decimal(message["k"]["l"]),
+                close=Decimal(message["k"]["c"]),
+                volume=Decimal(message["k"]["v"]),
+                symbol=product.symbol,
+                exchange=product.exchange,
+                timestamp=timestamp,
+                finished=finished,
+                trace=self._get_trace(),
+            )
         )
 
-    def _handle_book(self, message: dict, timestamp: int):
+    def _handle_book(self, product: Product, message: dict, timestamp: int):
         exchange_timestamp = timestamp
         latency = 0
 
         fields = {
-            KEY.BID_PRICE: float(message["b"]),
-            KEY.SYMBOL: message["s"],
-            KEY.BID_QTY: float(message["B"]),
-            KEY.ASK_PRICE: float(message["a"]),
-            KEY.ASK_QTY: float(message["A"]),
+            KEY.BID_PRICE: Decimal(message["b"]),
+            KEY.BID_QTY: Decimal(message["B"]),
+            KEY.ASK_PRICE: Decimal(message["a"]),
+            KEY.ASK_QTY: Decimal(message["A"]),
             DB.BOOK_LATENCY: latency,
         }
 
         # Save ask/bid price to "Data Update Watchdog"
-        self._ask = fields[KEY.ASK_PRICE]
-        self._bid = fields[KEY.BID_PRICE]
-
-        data = self._database.Encode(fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
-
-        self._supervisor.Queue.put(
-            {
-                QUEUE.QUEUE: QUEUE.ORDERBOOK,
-                KEY.SYMBOL: message["s"],
-                KEY.TIMESTAMP: exchange_timestamp,
-                KEY.LATENCY: latency,
-                KEY.BID_PRICE: message["b"],
-                KEY.BID_QTY: message["B"],
-                KEY.ASK_PRICE: message["a"],
-                KEY.ASK_QTY: message["A"],
-                KEY.EXCHANGE: self._target_exchange,
-            }
+        product.ask = fields[KEY.ASK_PRICE]
+        product.bid = fields[KEY.BID_PRICE]
+
+        data = self._encode(product, fields, timestamp=exchange_timestamp)
+        self._write(data)
+
+        self._publish(
+            BookEvent(
+                ask_price=fields[KEY.ASK_PRICE],
+                ask_qty=fields[KEY.ASK_QTY],
+                bid_price=fields[KEY.BID_PRICE],
+                bid_qty=fields[KEY.BID_QTY],
+                symbol=product.symbol,
+                exchange=product.exchange,
+                timestamp=exchange_timestamp,
+                latency=latency,
+                trace=self._get_trace(),
+            )
         )
 
     def _get_price_pnl(
@@ -335,6 +503,24 @@ class BinanceSpotWebsocketStream(AbstractStream):
             ts = self._timer.Timestamp()
             exchange_timestamp += ts - int(ts / KEY.ONE_MS) * KEY.ONE_MS
 
+            # Order tracker of exchange: fills move position, finished orders leave their level
+            product = self._products.get(message["s"], None)
+            if product is not None and message["X"] in ORDER_STATUS_MAP:
+                qty = Decimal(message["q"])
+                self._publish(
+                    StatusEvent(
+                        # Canceled order has its own id in `C` (`c` is id of cancel request)
+                        order_id=message.get("C") or message["c"],
+                        status=ORDER_STATUS_MAP[message["X"]],
+                        price=Decimal(message["p"]) or None,
+                        qty=qty if message["S"] == SIDE.BUY else -qty,
+                        pct=Decimal(message["z"]) / qty if qty else Decimal(0),
+                        symbol=product.symbol,
+                        exchange=product.exchange,
+                        trade_id=str(message["t"]) if message["t"] != -1 else None,
+                    )
+                )
+
             if message["x"] == "TRADE":
                 traded_qty = Decimal(message["l"])
                 traded_price = Decimal(message["L"])
@@ -361,16 +547,15 @@ class BinanceSpotWebsocketStream(AbstractStream):
                     },
                     timestamp=exchange_timestamp,
                 )
-                self._buffer.append(data)
-
-                self._supervisor.Queue.put(
-                    {
-                        QUEUE.QUEUE: QUEUE.ACCOUNT,
-                        KEY.SYMBOL: message["s"],
-                        KEY.PRICE: self._current.price,
-                        KEY.QTY: self._current.qty,
-                        KEY.EXCHANGE: self._target_exchange,
-                    }
+                self._write(data)
+
+                self._publish(
+                    AccountEvent(
+                        price=self._current.price,
+                        qty=self._current.qty,
+                        symbol=message["s"],
+                        exchange=self._target_exchange,
+                    )
                 )
 
                 self._logger.warning(
@@ -394,9 +579,10 @@ class BinanceSpotWebsocketStream(AbstractStream):
                 )
 
     def _on_message(self, message):
+        self._received = time.perf_counter_ns()
         timestamp = self._timer.Timestamp() - self._adjust
         try:
-            message = json.loads(message)
+            message = json_codec.loads(message)
 
             fn = self._streams.get(message["stream"], lambda x, y: print(x))
             fn(message["data"], timestamp)
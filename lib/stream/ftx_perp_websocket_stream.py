@@ -1,4 +1,3 @@
-import copy
 import hmac
 import json
 import os
@@ -8,22 +7,24 @@ import time
 import zlib
 from decimal import Decimal
 from pprint import pprint
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List, Callable
 
 import websocket
 from apscheduler.schedulers.background import BackgroundScheduler
 from websocket import WebSocketApp
 
-from lib.constants import KEY, DB, QUEUE
+from lib import json_codec
+from lib.constants import KEY, DB
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
+from lib.event import BookEvent, AccountEvent
 from lib.exchange import Order
 from lib.exchange.ftx_perp_exchange import FtxPerpExchange
 from lib.factory import AbstractFactory
-from lib.helpers import custom_dump, sign
+from lib.helpers import sign
 from lib.logger import AbstractLogger
 from lib.ping import get_ftx_lag
-from lib.stream import AbstractStream
+from lib.stream import AbstractStream, Connection
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
 from lib.vault import AbstractVault, VAULT
@@ -42,16 +43,18 @@ WS_FILLS = 'fills'
 
 
 class FtxPerpWebsocketStream(AbstractStream):
+    SUPPORTS_ASYNC = True
+
     def __init__(self, config: dict, supervisor: AbstractSupervisor, factory: AbstractFactory, timer: AbstractTimer):
         super().__init__(config, supervisor, factory, timer)
 
 
         self._exchange = FtxPerpExchange(config, factory, timer)
-        self._database: AbstractDatabase = factory.Database(config, factory=factory, timer=timer)
+        self._database: AbstractDatabase = self._create_database()
         self._logger: AbstractLogger = factory.Logger(config, factory=factory, timer=timer)
         self._vault: AbstractVault = factory.Vault(config, factory=factory, timer=timer)
 
-        self._adjust = get_ftx_lag()
+        self._adjust = 0  # Updated by `_get_lag` on Run
 
         self._symbol = self._config[KEY.SYMBOL]
         self._symbol = self._construct_symbol()
@@ -71,8 +74,6 @@ class FtxPerpWebsocketStream(AbstractStream):
 
         self._streams = dict()
 
-        self._buffer = []
-
         self._lock = False
 
         self._previous_candle: Optional[dict] = None
@@ -89,6 +90,8 @@ class FtxPerpWebsocketStream(AbstractStream):
 
 
     def Run(self, start_timestamp: int = 0, end_timestamp: int = 0):
+        self._adjust = self._get_lag()
+
         scheduler = BackgroundScheduler()
         scheduler.add_job(self._flush, 'interval', seconds=1, max_instances=5)
         scheduler.add_job(self._on_ping, 'interval', seconds=15, max_instances=1)
@@ -117,6 +120,18 @@ class FtxPerpWebsocketStream(AbstractStream):
     # Private Methods
     #
     ##############################################################################
+
+    def _get_lag(self) -> int:
+        return get_ftx_lag()
+
+    def _get_jobs(self) -> List[Tuple[Callable, float]]:
+        return [(self._flush, 1), (self._on_ping, 15)]
+
+    def _get_connections(self) -> List[Connection]:
+        return [
+            Connection(url=self._wss_url, on_message=self._on_message, on_open=self._on_open,
+                       on_close=self._on_close, attribute='_wss'),
+        ]
     """
     Return symbol name in FTX notation
     """
@@ -126,12 +141,6 @@ class FtxPerpWebsocketStream(AbstractStream):
                 return f'{self._symbol.upper()[:-len(_tail)]}-PERP'
 
     def _flush(self):
-        ########################################################################
-        # Lets make data snapshot first and clear old one
-        ########################################################################
-        snapshot = copy.deepcopy(self._buffer)
-        self._buffer.clear()
-
         ########################################################################
         # Data Update Watchdog
         ########################################################################
@@ -147,19 +156,14 @@ class FtxPerpWebsocketStream(AbstractStream):
             self._timer.Sleep(1)
             os._exit(-1)
 
-        ########################################################################
-        # Flush data to database
-        ########################################################################
-        if snapshot:
-            self._database.writeEncoded(snapshot)
-
     def _inflate(self, data):
         return zlib.decompress(data, 16+zlib.MAX_WBITS)
 
     def _on_message(self, message):
+        self._received = time.perf_counter_ns()
         timestamp = self._timer.Timestamp() - self._adjust
 
-        message = json.loads(message)
+        message = json_codec.loads(message)
 
         fn = self._streams.get(message['channel'], lambda x, y: print('UNDEFINED', message))
         fn(message, timestamp)
@@ -196,19 +200,19 @@ class FtxPerpWebsocketStream(AbstractStream):
         self._bid = fields[KEY.BID_PRICE]
 
         data = self._database.Encode(fields, tags=self._target_tags, timestamp=exchange_timestamp)
-        self._buffer.append(data)
-
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.ORDERBOOK,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: latency,
-            KEY.BID_PRICE: str(fields[KEY.BID_PRICE]),
-            KEY.BID_QTY: str(fields[KEY.BID_QTY]),
-            KEY.ASK_PRICE: str(fields[KEY.ASK_PRICE]),
-            KEY.ASK_QTY: str(fields[KEY.ASK_QTY]),
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+        self._database.writeEncoded([data])
+
+        self._publish(BookEvent(
+            ask_price=Decimal(str(fields[KEY.ASK_PRICE])),
+            ask_qty=Decimal(str(fields[KEY.ASK_QTY])),
+            bid_price=Decimal(str(fields[KEY.BID_PRICE])),
+            bid_qty=Decimal(str(fields[KEY.BID_QTY])),
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+            timestamp=exchange_timestamp,
+            latency=latency,
+            trace=self._get_trace(),
+        ))
 
     def _handle_klines(self, message: dict, timestamp: int):
         return
@@ -275,15 +279,14 @@ class FtxPerpWebsocketStream(AbstractStream):
                     tags=self._target_tags,
                     timestamp=self._timer.Timestamp())
 
-                self._buffer.append(data)
+                self._database.writeEncoded([data])
 
-                self._supervisor.Queue.put({
-                    QUEUE.QUEUE: QUEUE.ACCOUNT,
-                    KEY.PRICE: str(item['recentAverageOpenPrice']),
-                    KEY.QTY: str(item['netSize']),
-                    KEY.SYMBOL: self._target_symbol,
-                    KEY.EXCHANGE: self._target_exchange,
-                })
+                self._publish(AccountEvent(
+                    price=entry,
+                    qty=portfolio,
+                    symbol=self._target_symbol,
+                    exchange=self._target_exchange,
+                ))
                 self._logger.warning(f'ACCOUNT UPDATE event registered', event='ACCOUNT',
                                      portfolio=item['netSize'], entry=item['recentAverageOpenPrice'], payload=item)
 
@@ -1,5 +1,4 @@
 import base64
-import copy
 import hashlib
 import hmac
 import json
@@ -12,7 +11,7 @@ import uuid
 import zlib
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List, Callable
 import urllib.parse
 
 import requests
@@ -20,15 +19,17 @@ import websocket
 from apscheduler.schedulers.background import BackgroundScheduler
 from websocket import WebSocketApp
 
-from lib.constants import KEY, DB, QUEUE
+from lib import json_codec
+from lib.constants import KEY, DB
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
+from lib.event import BookEvent, TradeEvent, CandleEvent, LevelEvent, MessageEvent
 from lib.exchange.huobi_swap_exchange import HuobiSwapExchange
 from lib.factory import AbstractFactory
-from lib.helpers import custom_dump
+from lib.levels import Levels
 from lib.logger import AbstractLogger
 from lib.ping import get_huobi_lag
-from lib.stream import AbstractStream
+from lib.stream import AbstractStream, Connection
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
 from lib.vault import AbstractVault, VAULT
@@ -49,15 +50,17 @@ WS_ACCOUNT = 'accounts_cross.{symbol}'
 
 
 class HuobiSwapWebsocketStream(AbstractStream):
+    SUPPORTS_ASYNC = True
+
     def __init__(self, config: dict, supervisor: AbstractSupervisor, factory: AbstractFactory, timer: AbstractTimer):
         super().__init__(config, supervisor, factory, timer)
 
         self._exchange = HuobiSwapExchange(config, factory, timer)
-        self._database: AbstractDatabase = factory.Database(config, factory=factory, timer=timer)
+        self._database: AbstractDatabase = self._create_database()
         self._logger: AbstractLogger = factory.Logger(config, factory=factory, timer=timer)
         self._vault: AbstractVault = factory.Vault(config, factory=factory, timer=timer)
 
-        self._adjust = get_huobi_lag()
+        self._adjust = 0  # Updated by `_get_lag` on Run
 
         self._symbol = self._construct_symbol()
         self._target_side = self._construct_side()
@@ -79,8 +82,6 @@ class HuobiSwapWebsocketStream(AbstractStream):
 
         self._streams = dict()
 
-        self._buffer = []
-
         self._lock = False
 
         self._previous_candle: Optional[dict] = None
@@ -93,6 +94,8 @@ class HuobiSwapWebsocketStream(AbstractStream):
         self._last_update_timestamp: Optional[int] = None
 
     def Run(self, start_timestamp: int = 0, end_timestamp: int = 0):
+        self._adjust = self._get_lag()
+
         scheduler = BackgroundScheduler()
         scheduler.add_job(self._flush, 'interval', seconds=1, max_instances=5)
 
@@ -126,6 +129,20 @@ class HuobiSwapWebsocketStream(AbstractStream):
     #
     ##############################################################################
 
+    def _get_lag(self) -> int:
+        return get_huobi_lag()
+
+    def _get_jobs(self) -> List[Tuple[Callable, float]]:
+        return [(self._flush, 1)]
+
+    def _get_connections(self) -> List[Connection]:
+        return [
+            Connection(url=self._wss_url + '/linear-swap-ws', on_message=self._on_message_market,
+                       on_open=self._on_open_market, on_close=self._on_close, attribute='_wss_market'),
+            Connection(url=self._wss_url + '/linear-swap-notification', on_message=self._on_message_notifications,
+                       on_open=self._on_open_notifications, on_close=self._on_close, attribute='_wss_notifications'),
+        ]
+
     def _get_contract_value(self):
         r = requests.get(DEFAULT_REST_URL + '/linear-swap-api/v1/swap_contract_info',
                          params=dict(contract_code=self._symbol))
@@ -157,12 +174,6 @@ class HuobiSwapWebsocketStream(AbstractStream):
 
 
     def _flush(self):
-        ########################################################################
-        # Lets make data snapshot first and clear old one
-        ########################################################################
-        snapshot = copy.deepcopy(self._buffer)
-        self._buffer.clear()
-
         ########################################################################
         # Data Update Watchdog
         ########################################################################
@@ -178,19 +189,13 @@ class HuobiSwapWebsocketStream(AbstractStream):
             self._timer.Sleep(1)
             os._exit(-1)
 
-        ########################################################################
-        # Flush data to database
-        ########################################################################
-        if snapshot:
-            self._database.writeEncoded(snapshot)
-
     def _inflate(self, data):
         return zlib.decompress(data, 16+zlib.MAX_WBITS)
 
     def _on_message_market(self, message):
+        self._received = time.perf_counter_ns()
         timestamp = self._timer.Timestamp() - self._adjust
-        message = self._inflate(message).decode('utf-8')
-        message = json.loads(message)
+        message = json_codec.loads_bytes(self._inflate(message))
 
         if 'ch' in message:
             fn = self._streams.get(message['ch'], lambda x, y: print(message))
@@ -203,9 +208,9 @@ class HuobiSwapWebsocketStream(AbstractStream):
             print(message)
 
     def _on_message_notifications(self, message):
+        self._received = time.perf_counter_ns()
         timestamp = self._timer.Timestamp() - self._adjust
-        message = self._inflate(message).decode('utf-8')
-        message = json.loads(message)
+        message = json_codec.loads_bytes(self._inflate(message))
 
         if 'topic' in message:
             fn = self._streams.get(message['topic'], lambda x, y: print(message))
@@ -226,32 +231,31 @@ class HuobiSwapWebsocketStream(AbstractStream):
                     KEY.FUNDING_RATE: float(item["funding_rate"]),
                 },
                 timestamp=timestamp)
-            self._buffer.append(data)
+            self._database.writeEncoded([data])
 
-            self._supervisor.Queue.put({
-                QUEUE.QUEUE: QUEUE.MESSAGE,
-                KEY.PAYLOAD: json.dumps({
+            self._publish(MessageEvent(
+                payload={
                     KEY.TYPE: KEY.FUNDING_RATE,
                     KEY.SYMBOL: self._target_symbol,
                     KEY.EXCHANGE: self._target_exchange,
                     KEY.FUNDING_RATE: float(item["funding_rate"]),
-                }, default=custom_dump),
-                KEY.TIMESTAMP: timestamp,
-                KEY.LATENCY: 0,
-            })
+                },
+                timestamp=timestamp,
+            ))
 
     def _handle_level(self, message: dict, timestamp: int):
         exchange_timestamp = message['ts'] * KEY.ONE_MS
         latency = timestamp - exchange_timestamp
 
-        bids = message['tick']['bids'][0:5]
-        asks = message['tick']['asks'][0:5]
+        # Levels are parsed once into scaled integers, Decimals are created only when bot reads them
+        asks = Levels.fromPairs(message['tick']['asks'][:10], qty_multiplier=self._contract_value)
+        bids = Levels.fromPairs(message['tick']['bids'][:10], qty_multiplier=self._contract_value)
 
-        ask_5_qty = sum([Decimal(x) for _, x, in asks]) * self._contract_value
+        ask_5_qty = asks.sumQty(5)
 
-        bid_5_qty = sum([Decimal(x) for _, x, in bids]) * self._contract_value
+        bid_5_qty = bids.sumQty(5)
 
-        spread = Decimal(str(asks[0][0])) - Decimal(str(bids[0][0]))
+        spread = asks[0][0] - bids[0][0]
 
         fields = {
             KEY.SPREAD: spread,
@@ -259,27 +263,22 @@ class HuobiSwapWebsocketStream(AbstractStream):
             KEY.BID_5_QTY: bid_5_qty,
         }
 
-        for side, key in [('a', 'asks'), ('b', 'bids')]:
-            for idx, (price, qty) in enumerate(message['tick'][key][:10]):
-                fields[f'ob_{side}p_{idx}'] = float(price)
-                fields[f'ob_{side}q_{idx}'] = float(qty) * float(self._contract_value)
+        for side, levels in [('a', asks), ('b', bids)]:
+            for idx, (price, qty) in enumerate(levels.asFloats()):
+                fields[f'ob_{side}p_{idx}'] = price
+                fields[f'ob_{side}q_{idx}'] = qty
 
         data = self._database.Encode(fields=fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
+        self._database.writeEncoded([data])
 
-        payload = {
-            KEY.ASKS: [[Decimal(str(x[0])), Decimal(str(x[1])) * self._contract_value] for x in asks],
-            KEY.BIDS: [[Decimal(str(x[0])), Decimal(str(x[1])) * self._contract_value] for x in bids]
-        }
-
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.LEVEL,
-            KEY.PAYLOAD: json.dumps(payload, default=custom_dump),
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: 0,
-        })
+        self._publish(LevelEvent(
+            asks=asks[:5],
+            bids=bids[:5],
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+            timestamp=exchange_timestamp,
+            trace=self._get_trace(),
+        ))
 
     def _handle_trade(self, message: dict, timestamp: int):
         exchange_timestamp = message['ts'] * KEY.ONE_MS
@@ -299,29 +298,29 @@ class HuobiSwapWebsocketStream(AbstractStream):
         }
 
         data = self._database.Encode(fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
-
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.TRADES,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: latency,
-            KEY.PRICE: str(price),
-            KEY.QTY: str(qty),
-            KEY.SIDE: side,
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+        self._database.writeEncoded([data])
+
+        self._publish(TradeEvent(
+            price=Decimal(str(price)),
+            qty=Decimal(str(qty)),
+            side=side,
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+            timestamp=exchange_timestamp,
+            latency=latency,
+            trace=self._get_trace(),
+        ))
 
     def _handle_book(self, message: dict, timestamp: int):
         exchange_timestamp = message['ts'] * KEY.ONE_MS
         latency = timestamp - exchange_timestamp
 
         fields = {
-            KEY.BID_PRICE: float(message['tick']['bid'][0]),
-            KEY.BID_QTY: float(message['tick']['bid'][1]),
+            KEY.BID_PRICE: Decimal(str(message['tick']['bid'][0])),
+            KEY.BID_QTY: Decimal(str(message['tick']['bid'][1])),
 
-            KEY.ASK_PRICE: float(message['tick']['ask'][0]),
-            KEY.ASK_QTY: float(message['tick']['ask'][1]),
+            KEY.ASK_PRICE: Decimal(str(message['tick']['ask'][0])),
+            KEY.ASK_QTY: Decimal(str(message['tick']['ask'][1])),
 
             DB.BOOK_LATENCY: latency,
         }
@@ -331,19 +330,19 @@ class HuobiSwapWebsocketStream(AbstractStream):
         self._bid = fields[KEY.BID_PRICE]
 
         data = self._database.Encode(fields, timestamp=exchange_timestamp)
-        self._buffer.append(data)
-
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.ORDERBOOK,
-            KEY.TIMESTAMP: exchange_timestamp,
-            KEY.LATENCY: latency,
-            KEY.BID_PRICE: str(fields[KEY.BID_PRICE]),
-            KEY.BID_QTY: str(fields[KEY.BID_QTY]),
-            KEY.ASK_PRICE: str(fields[KEY.ASK_PRICE]),
-            KEY.ASK_QTY: str(fields[KEY.ASK_QTY]),
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+        self._database.writeEncoded([data])
+
+        self._publish(BookEvent(
+            ask_price=fields[KEY.ASK_PRICE],
+            ask_qty=fields[KEY.ASK_QTY],
+            bid_price=fields[KEY.BID_PRICE],
+            bid_qty=fields[KEY.BID_QTY],
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+            timestamp=exchange_timestamp,
+            latency=latency,
+            trace=self._get_trace(),
+        ))
 
     def _handle_klines(self, message: dict, timestamp: int):
         _timestamp = message['ts']
@@ -369,20 +368,20 @@ class HuobiSwapWebsocketStream(AbstractStream):
                     fields[field] = self._previous_candle[field]
 
                 data = self._database.Encode(fields, timestamp=self._previous_candle[KEY.TIMESTAMP])
-                self._buffer.append(data)
-
-            self._supervisor.Queue.put({
-                QUEUE.QUEUE: QUEUE.CANDLES,
-                KEY.OPEN: self._previous_candle[KEY.OPEN],
-                KEY.HIGH: self._previous_candle[KEY.HIGH],
-                KEY.LOW: self._previous_candle[KEY.LOW],
-                KEY.CLOSE: self._previous_candle[KEY.CLOSE],
-                KEY.VOLUME: self._previous_candle[KEY.VOLUME],
-                KEY.FINISHED: _finished,
-                KEY.TIMESTAMP: self._previous_candle[KEY.TIMESTAMP],
-                KEY.SYMBOL: self._target_symbol,
-                KEY.EXCHANGE: self._target_exchange,
-            })
+                self._database.writeEncoded([data])
+
+            self._publish(CandleEvent(
+                open=Decimal(str(self._previous_candle[KEY.OPEN])),
+                high=Decimal(str(self._previous_candle[KEY.HIGH])),
+                low=Decimal(str(self._previous_candle[KEY.LOW])),
+                close=Decimal(str(self._previous_candle[KEY.CLOSE])),
+                volume=Decimal(str(self._previous_candle[KEY.VOLUME])),
+                symbol=self._target_symbol,
+                exchange=self._target_exchange,
+                timestamp=self._previous_candle[KEY.TIMESTAMP],
+                finished=_finished,
+                trace=self._get_trace(),
+            ))
 
         self._previous_candle = {
             KEY.TIMESTAMP: exchange_timestamp,
@@ -1,11 +1,10 @@
-import copy
 import json
 import os
 import signal
 import time
 from decimal import Decimal
 from pprint import pprint
-from typing import Optional, Tuple, Union
+from typing import Optional, Tuple, Union, List, Callable
 
 import hmac
 import base64
@@ -17,22 +16,26 @@ import zlib
 from apscheduler.schedulers.background import BackgroundScheduler
 from websocket import WebSocketApp
 
-from lib.constants import KEY, DB, STATUS, QUEUE
+from lib import json_codec
+from lib.constants import KEY, DB, STATUS
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
+from lib.event import BookEvent, TradeEvent, CandleEvent, LevelEvent, AccountEvent, StatusEvent, MessageEvent
 from lib.factory import AbstractFactory
-from lib.helpers import custom_dump
+from lib.levels import Levels
 from lib.logger import AbstractLogger
+from lib.order_book import OrderBook
 from lib.ping import get_okex_lag
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
-from lib.stream import AbstractStream
+from lib.stream import AbstractStream, Connection
 from lib.vault import AbstractVault, VAULT
 
 WS_FUNDING_RATE = 'swap/funding_rate'
 WS_BOOK = 'swap/ticker'
 WS_TRADES = 'swap/trade'
 WS_LEVEL = 'swap/depth5'
+WS_DEPTH = 'swap/depth_l2_tbt'  # tick-by-tick diff-depth for local order book
 WS_KLINES = 'swap/candle60s'
 WS_POSITION = 'swap/position'
 WS_ORDER = 'swap/order'
@@ -47,14 +50,16 @@ LISTEN_KEY_EXPIRATION_MINUTES = 50
 LEVEL_UPDATE_TIME = 30 * KEY.ONE_SECOND
 
 class OkexPerpWebsocketStream(AbstractStream):
+    SUPPORTS_ASYNC = True
+
     def __init__(self, config: dict, supervisor: AbstractSupervisor, factory: AbstractFactory, timer: AbstractTimer):
         super().__init__(config, supervisor, factory, timer)
 
-        self._database: AbstractDatabase = factory.Database(config, factory=factory, timer=timer)
+        self._database: AbstractDatabase = self._create_database()
         self._logger: AbstractLogger = factory.Logger(config, factory=factory, timer=timer)
         self._vault: AbstractVault = factory.Vault(config, factory=factory, timer=timer)
 
-        self._adjust = get_okex_lag()
+        self._adjust = 0  # Updated by `_get_lag` on Run
 
         self._symbol = self._construct_symbol()
         self._target_side = self._construct_side()
@@ -75,12 +80,15 @@ class OkexPerpWebsocketStream(AbstractStream):
 
         self._contract_value = self._get_contract_value()
 
+        # Levels per side sent to bot from local order book, 0 - use partial depth stream
+        self._order_book_depth = int(self._config.get(KEY.ORDER_BOOK, 0) or 0)
+        self._book = OrderBook(qty_multiplier=self._contract_value)
+        self._level_timestamp = 0  # last level record written to database
+
         self._account: Optional[Decimal] = None
 
         self._streams = dict()
 
-        self._buffer = []
-
         self._lock = False
 
         self._is_login = False  # This flag became True when login is successful
@@ -107,6 +115,8 @@ class OkexPerpWebsocketStream(AbstractStream):
     ##############################################################################
 
     def Run(self, start_timestamp: int = 0, end_timestamp: int = 0):
+        self._adjust = self._get_lag()
+
         scheduler = BackgroundScheduler()
         scheduler.add_job(self._flush, 'interval', seconds=1, max_instances=5)
         self._wss = websocket.WebSocketApp(self._wss_url,
@@ -124,6 +134,18 @@ class OkexPerpWebsocketStream(AbstractStream):
     # Private Methods
     #
     ##############################################################################
+
+    def _get_lag(self) -> int:
+        return get_okex_lag()
+
+    def _get_jobs(self) -> List[Tuple[Callable, float]]:
+        return [(self._flush, 1)]
+
+    def _get_connections(self) -> List[Connection]:
+        return [
+            Connection(url=self._wss_url, on_message=self._on_message, on_open=self._on_open,
+                       on_close=self._on_close, attribute='_wss'),
+        ]
     def _get_contract_value(self) -> Union[int, Decimal]:
         r = requests.get(DEFAULT_REST_URL + '/api/swap/v3/instruments')
 
@@ -155,12 +177,6 @@ class OkexPerpWebsocketStream(AbstractStream):
         return side
 
     def _flush(self):
-        ########################################################################
-        # Lets make data snapshot first and clear old one
-        ########################################################################
-        snapshot = copy.deepcopy(self._buffer)
-        self._buffer.clear()
-
         ########################################################################
         # Data Update Watchdog
         ########################################################################
@@ -174,12 +190,6 @@ class OkexPerpWebsocketStream(AbstractStream):
             self._logger.error(f'Websocket Watchdog: No ask/bid update for {DEFAULT.NODATA_TIMEOUT/KEY.ONE_SECOND}s. Stop.')
             self._on_close()
 
-        ########################################################################
-        # Flush data to database
-        ########################################################################
-        if snapshot:
-            self._database.writeEncoded(snapshot)
-
     def _handle_funding_rate(self, message: dict, timestamp: int):
         for item in message:
             data = self._database.Encode(
@@ -188,19 +198,17 @@ class OkexPerpWebsocketStream(AbstractStream):
                     KEY.ESTIMATED_RATE: float(item["estimated_rate"]),
                 },
                 timestamp=timestamp)
-            self._buffer.append(data)
+            self._database.writeEncoded([data])
 
-            self._supervisor.Queue.put({
-                QUEUE.QUEUE: QUEUE.MESSAGE,
-                KEY.PAYLOAD: json.dumps({
+            self._publish(MessageEvent(
+                payload={
                     KEY.TYPE: KEY.FUNDING_RATE,
                     KEY.SYMBOL: self._target_symbol,
                     KEY.EXCHANGE: self._target_exchange,
                     KEY.FUNDING_RATE: float(item["funding_rate"]),
-                }, default=custom_dump),
-                KEY.TIMESTAMP: timestamp,
-                KEY.LATENCY: 0,
-            })
+                },
+                timestamp=timestamp,
+            ))
 
 
 
@@ -219,59 +227,90 @@ class OkexPerpWebsocketStream(AbstractStream):
             }
 
             data = self._database.Encode(fields, timestamp=exchange_timestamp)
-            self._buffer.append(data)
+            self._database.writeEncoded([data])
 
-            self._supervisor.Queue.put({
-                QUEUE.QUEUE: QUEUE.TRADES,
-                KEY.TIMESTAMP: exchange_timestamp,
-                KEY.LATENCY: latency,
-                KEY.PRICE: item["price"],
-                KEY.QTY: item["size"],
-                KEY.SIDE: item["side"],
-                KEY.SYMBOL: self._target_symbol,
-                KEY.EXCHANGE: self._target_exchange,
-            })
+            self._publish(TradeEvent(
+                price=Decimal(item["price"]),
+                qty=Decimal(item["size"]),
+                side=item["side"],
+                symbol=self._target_symbol,
+                exchange=self._target_exchange,
+                timestamp=exchange_timestamp,
+                latency=latency,
+                trace=self._get_trace(),
+            ))
 
 
     def _handle_level(self, message: dict, timestamp: int):
         for item in message:
             exchange_timestamp = ciso8601.parse_datetime(item['timestamp'])
             exchange_timestamp = int(exchange_timestamp.timestamp() * 1e3) * KEY.ONE_MS
-            latency = timestamp - exchange_timestamp
 
-            ask_5_qty = sum([Decimal(x) for _, x, _, _ in item['asks'][:5]]) * self._contract_value
+            # Levels are parsed once into scaled integers, Decimals are created only when bot reads them
+            asks = Levels.fromPairs(item['asks'], qty_multiplier=self._contract_value)
+            bids = Levels.fromPairs(item['bids'], qty_multiplier=self._contract_value)
+
+            self._put_level(asks, bids, exchange_timestamp)
+
+    def _handle_depth(self, message: dict, timestamp: int):
+        for item in message['data']:
+            if message.get('action', None) == 'partial':
+                self._book.Snapshot(item['asks'], item['bids'])
+            elif self._book.isReady():
+                self._book.Update(item['asks'], item['bids'])
+            else:
+                continue
 
-            bid_5_qty = sum([Decimal(x) for _, x, _, _ in item['bids'][:5]]) * self._contract_value
+            if self._book.getChecksum() != item['checksum']:
+                self._logger.warning(f'Order book checksum error. Resubscribe', event='ORDER_BOOK',
+                                     checksum=item['checksum'])
+                self._book.Clear()
 
-            spread = Decimal(item['asks'][0][0]) - Decimal(item['bids'][0][0])
+                # New subscription starts with `partial` (full snapshot)
+                subscriptions = [f'{WS_DEPTH}:{self._symbol}']
+                self._wss.send(json.dumps(dict(op='unsubscribe', args=subscriptions)))
+                self._wss.send(json.dumps(dict(op='subscribe', args=subscriptions)))
+                return
 
+            exchange_timestamp = ciso8601.parse_datetime(item['timestamp'])
+            exchange_timestamp = int(exchange_timestamp.timestamp() * 1e3) * KEY.ONE_MS
+
+            asks, bids = self._book.getLevels(self._order_book_depth)
+
+            # Database gets the same top 5 fields as with partial depth stream, not more often than before
+            write = exchange_timestamp - self._level_timestamp >= DEFAULT.LEVEL_DB_INTERVAL
+            if write:
+                self._level_timestamp = exchange_timestamp
+
+            self._put_level(asks, bids, exchange_timestamp, write=write)
+
+    def _put_level(self, asks: Levels, bids: Levels, exchange_timestamp: int, write: bool = True):
+        if not asks or not bids:
+            return
+
+        if write:
             fields = {
-                KEY.SPREAD: float(spread),
-                KEY.ASK_5_QTY: ask_5_qty,
-                KEY.BID_5_QTY: bid_5_qty,
+                KEY.SPREAD: float(asks[0][0] - bids[0][0]),
+                KEY.ASK_5_QTY: asks.sumQty(5),
+                KEY.BID_5_QTY: bids.sumQty(5),
             }
 
-            for side, key in [('a', 'asks'), ('b', 'bids')]:
-                for idx, (price, qty, _, _) in enumerate(item[key][:5]):
-                    fields[f'ob_{side}p_{idx}'] = float(price)
-                    fields[f'ob_{side}q_{idx}'] = float(qty) * float(self._contract_value)
+            for side, levels in [('a', asks), ('b', bids)]:
+                for idx, (price, qty) in enumerate(levels[:5].asFloats()):
+                    fields[f'ob_{side}p_{idx}'] = price
+                    fields[f'ob_{side}q_{idx}'] = qty
 
             data = self._database.Encode(fields=fields, timestamp=exchange_timestamp)
-            self._buffer.append(data)
+            self._database.writeEncoded([data])
 
-            payload = {
-                KEY.ASKS: [[Decimal(x[0]), Decimal(x[1]) * self._contract_value] for x in item['asks']],
-                KEY.BIDS: [[Decimal(x[0]), Decimal(x[1]) * self._contract_value] for x in item['bids']]
-            }
-
-            self._supervisor.Queue.put({
-                QUEUE.QUEUE: QUEUE.LEVEL,
-                KEY.PAYLOAD: json.dumps(payload, default=custom_dump),
-                KEY.SYMBOL: self._target_symbol,
-                KEY.EXCHANGE: self._target_exchange,
-                KEY.TIMESTAMP: exchange_timestamp,
-                KEY.LATENCY: 0,
-            })
+        self._publish(LevelEvent(
+            asks=asks,
+            bids=bids,
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+            timestamp=exchange_timestamp,
+            trace=self._get_trace(),
+        ))
 
     def _handle_klines(self, message: dict, timestamp: int):
         for item in message:
@@ -294,20 +333,20 @@ class OkexPerpWebsocketStream(AbstractStream):
                         fields[field] = float(self._previous_candle[field])
 
                     data = self._database.Encode(fields, timestamp=self._previous_candle[KEY.TIMESTAMP])
-                    self._buffer.append(data)
-
-                self._supervisor.Queue.put({
-                    QUEUE.QUEUE: QUEUE.CANDLES,
-                    KEY.OPEN: self._previous_candle[KEY.OPEN],
-                    KEY.HIGH: self._previous_candle[KEY.HIGH],
-                    KEY.LOW: self._previous_candle[KEY.LOW],
-                    KEY.CLOSE: self._previous_candle[KEY.CLOSE],
-                    KEY.VOLUME: self._previous_candle[KEY.VOLUME],
-                    KEY.FINISHED: _finished,
-                    KEY.TIMESTAMP: self._previous_candle[KEY.TIMESTAMP],
-                    KEY.SYMBOL: self._target_symbol,
-                    KEY.EXCHANGE: self._target_exchange,
-                })
+                    self._database.writeEncoded([data])
+
+                self._publish(CandleEvent(
+                    open=Decimal(self._previous_candle[KEY.OPEN]),
+                    high=Decimal(self._previous_candle[KEY.HIGH]),
+                    low=Decimal(self._previous_candle[KEY.LOW]),
+                    close=Decimal(self._previous_candle[KEY.CLOSE]),
+                    volume=Decimal(self._previous_candle[KEY.VOLUME]),
+                    symbol=self._target_symbol,
+                    exchange=self._target_exchange,
+                    timestamp=self._previous_candle[KEY.TIMESTAMP],
+                    finished=_finished,
+                    trace=self._get_trace(),
+                ))
 
             self._previous_candle = {
                 KEY.TIMESTAMP: exchange_timestamp,
@@ -326,9 +365,9 @@ class OkexPerpWebsocketStream(AbstractStream):
             latency = timestamp - exchange_timestamp
 
             fields = {
-                KEY.BID_PRICE: float(item["best_bid"]),
+                KEY.BID_PRICE: Decimal(item["best_bid"]),
                 KEY.BID_QTY: Decimal(item["best_bid_size"]) * self._contract_value,
-                KEY.ASK_PRICE: float(item["best_ask"]),
+                KEY.ASK_PRICE: Decimal(item["best_ask"]),
                 KEY.ASK_QTY: Decimal(item["best_ask_size"]) * self._contract_value,
                 DB.BOOK_LATENCY: latency,
             }
@@ -338,19 +377,19 @@ class OkexPerpWebsocketStream(AbstractStream):
             self._bid = fields[KEY.BID_PRICE]
 
             data = self._database.Encode(fields, timestamp=exchange_timestamp)
-            self._buffer.append(data)
-
-            self._supervisor.Queue.put({
-                QUEUE.QUEUE: QUEUE.ORDERBOOK,
-                KEY.TIMESTAMP: exchange_timestamp,
-                KEY.LATENCY: latency,
-                KEY.BID_PRICE: item["best_bid"],
-                KEY.BID_QTY: str(Decimal(item["best_bid_size"]) * self._contract_value),
-                KEY.ASK_PRICE: item["best_ask"],
-                KEY.ASK_QTY: str(Decimal(item["best_ask_size"]) * self._contract_value),
-                KEY.SYMBOL: self._target_symbol,
-                KEY.EXCHANGE: self._target_exchange,
-            })
+            self._database.writeEncoded([data])
+
+            self._publish(BookEvent(
+                ask_price=fields[KEY.ASK_PRICE],
+                ask_qty=fields[KEY.ASK_QTY],
+                bid_price=fields[KEY.BID_PRICE],
+                bid_qty=fields[KEY.BID_QTY],
+                symbol=self._target_symbol,
+                exchange=self._target_exchange,
+                timestamp=exchange_timestamp,
+                latency=latency,
+                trace=self._get_trace(),
+            ))
 
     def _handle_order(self, message: dict, timestamp: int):
         for item in message:
@@ -383,17 +422,20 @@ class OkexPerpWebsocketStream(AbstractStream):
                 qty = Decimal(item['size']) * self._contract_value
                 filled_qty = Decimal(item['filled_qty']) * self._contract_value
 
+                # Id of last fill ("0" if nothing filled yet)
+                trade_id = item.get('last_fill_id', '0')
+
                 # publish to Hazelcast
-                self._supervisor.Queue.put({
-                    QUEUE.QUEUE: QUEUE.STATUS,
-                    KEY.ORDER_ID: order_id,
-                    KEY.STATUS: status,
-                    KEY.PRICE: str(price),
-                    KEY.QTY: str(side * qty),
-                    KEY.PCT: str(filled_qty / qty),
-                    KEY.SYMBOL: self._target_symbol,
-                    KEY.EXCHANGE: self._target_exchange,
-                })
+                self._publish(StatusEvent(
+                    order_id=order_id,
+                    status=status,
+                    price=Decimal(item['price']),
+                    qty=side * qty,
+                    pct=filled_qty / qty,
+                    symbol=self._target_symbol,
+                    exchange=self._target_exchange,
+                    trade_id=trade_id if trade_id not in ('', '0') else None,
+                ))
 
 
                 self._logger.warning(f'{status} event registered', event=status, commission=commission,
@@ -405,7 +447,7 @@ class OkexPerpWebsocketStream(AbstractStream):
                     data = self._database.Encode(fields={
                         KEY.COMMISSION: commission
                     }, timestamp=exchange_timestamp)
-                    self._buffer.append(data)
+                    self._database.writeEncoded([data])
 
     def _handle_account(self, message: dict, timestamp: int):
         for item in message:
@@ -422,7 +464,7 @@ class OkexPerpWebsocketStream(AbstractStream):
             data = self._database.Encode(fields={
                 KEY.REALIZED_PNL: pnl
             }, timestamp=exchange_timestamp)
-            self._buffer.append(data)
+            self._database.writeEncoded([data])
 
     def _handle_position(self, message: dict, timestamp: int):
         for item in message:
@@ -447,15 +489,14 @@ class OkexPerpWebsocketStream(AbstractStream):
                 data = self._database.Encode(
                     fields={KEY.ENTRY: entry, KEY.PORTFOLIO: portfolio},
                     timestamp=exchange_timestamp)
-                self._buffer.append(data)
+                self._database.writeEncoded([data])
 
-                self._supervisor.Queue.put({
-                    QUEUE.QUEUE: QUEUE.ACCOUNT,
-                    KEY.PRICE: entry,
-                    KEY.QTY: portfolio,
-                    KEY.SYMBOL: self._target_symbol,
-                    KEY.EXCHANGE: self._target_exchange,
-                })
+                self._publish(AccountEvent(
+                    price=entry,
+                    qty=portfolio,
+                    symbol=self._target_symbol,
+                    exchange=self._target_exchange,
+                ))
 
                 self._logger.warning(f'ACCOUNT UPDATE event registered', event='ACCOUNT',
                                      portfolio=portfolio, entry=entry, payload=holding)
@@ -475,17 +516,18 @@ class OkexPerpWebsocketStream(AbstractStream):
             self._make_subscriptions()
 
     def _on_message(self, message):
+        self._received = time.perf_counter_ns()
         timestamp = self._timer.Timestamp() - self._adjust
         try:
-            message = self._inflate(message).decode('utf-8')
-            message = json.loads(message)
+            message = json_codec.loads_bytes(self._inflate(message))
 
             if message.get('event', None) == 'login':
                 stream = 'login'
                 data = message
             else:
                 stream = message.get('table', None)
-                data = message.get('data', None)
+                # Order book needs `action` (partial/update) of the whole message
+                data = message if stream == WS_DEPTH else message.get('data', None)
 
             fn = self._streams.get(stream, lambda x, y: print(message))
 
@@ -513,7 +555,7 @@ class OkexPerpWebsocketStream(AbstractStream):
             (WS_FUNDING_RATE, self._handle_funding_rate),
             (WS_BOOK, self._handle_book),
             (WS_KLINES, self._handle_klines),
-            (WS_LEVEL, self._handle_level),
+            (WS_DEPTH, self._handle_depth) if self._order_book_depth else (WS_LEVEL, self._handle_level),
             (WS_TRADES, self._handle_trades),
             (WS_POSITION, self._handle_position),
             (WS_ORDER, self._handle_order),
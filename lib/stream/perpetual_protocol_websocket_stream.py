@@ -1,4 +1,3 @@
-import copy
 import json
 import time
 from decimal import Decimal
@@ -7,13 +6,14 @@ from typing import Optional, Tuple
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from lib.constants import KEY, DB, QUEUE
+from lib.constants import KEY, DB
 from lib.database import AbstractDatabase
 from lib.defaults import DEFAULT
+from lib.event import BookEvent, AccountEvent, MessageEvent
 from lib.exchange import Order, Book
 from lib.exchange.perpetual_protocol_exchange import PerpetualProtocolExchange
 from lib.factory import AbstractFactory
-from lib.helpers import custom_dump, sign
+from lib.helpers import sign
 from lib.logger import AbstractLogger
 from lib.ping import get_ftx_lag
 from lib.stream import AbstractStream
@@ -29,7 +29,7 @@ class PerpetualProtocolWebsocketStream(AbstractStream):
 
         self._exchange = PerpetualProtocolExchange(config, factory, timer)
 
-        self._database: AbstractDatabase = factory.Database(config, factory=factory, timer=timer)
+        self._database: AbstractDatabase = self._create_database()
         self._logger: AbstractLogger = factory.Logger(config, factory=factory, timer=timer)
         self._vault: AbstractVault = factory.Vault(config, factory=factory, timer=timer)
 
@@ -41,8 +41,6 @@ class PerpetualProtocolWebsocketStream(AbstractStream):
         self._target_exchange = config[KEY.EXCHANGE]
         self._target_tags = {KEY.SYMBOL: self._target_symbol, KEY.EXCHANGE: self._target_exchange}
 
-        self._buffer = []
-
         # Variables for realizedPnl calculations
         self._current_position: Order = self._exchange.getPosition()
 
@@ -50,7 +48,7 @@ class PerpetualProtocolWebsocketStream(AbstractStream):
 
     def Run(self, start_timestamp: int = 0, end_timestamp: int = 0):
         scheduler = BackgroundScheduler()
-        scheduler.add_job(self._flush_and_update, 'interval', seconds=1, max_instances=5)
+        scheduler.add_job(self._update, 'interval', seconds=1, max_instances=5)
 
         # Run scheduler
         scheduler.start()
@@ -73,20 +71,8 @@ class PerpetualProtocolWebsocketStream(AbstractStream):
             if self._symbol.upper().endswith(_tail):
                 return f'{self._symbol.upper()[:-len(_tail)]}USDC'
 
-    def _flush(self):
-        ########################################################################
-        # Lets make data snapshot first and clear old one
-        ########################################################################
-        snapshot = copy.deepcopy(self._buffer)
-        self._buffer.clear()
-
-        ########################################################################
-        # Flush data to database
-        ########################################################################
-        if snapshot:
-            self._database.writeEncoded(snapshot)
-
     def _update_book(self):
+        self._received = time.perf_counter_ns()
         self._current_book = self._exchange.getBook()
         timestamp = self._timer.Timestamp()
 
@@ -101,19 +87,18 @@ class PerpetualProtocolWebsocketStream(AbstractStream):
         }
 
         data = self._database.Encode(fields, tags=self._target_tags, timestamp=timestamp)
-        self._buffer.append(data)
-
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.ORDERBOOK,
-            KEY.TIMESTAMP: timestamp,
-            KEY.LATENCY: 0,
-            KEY.BID_PRICE: str(fields[KEY.BID_PRICE]),
-            KEY.BID_QTY: str(fields[KEY.BID_QTY]),
-            KEY.ASK_PRICE: str(fields[KEY.ASK_PRICE]),
-            KEY.ASK_QTY: str(fields[KEY.ASK_QTY]),
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+        self._database.writeEncoded([data])
+
+        self._publish(BookEvent(
+            ask_price=Decimal(str(fields[KEY.ASK_PRICE])),
+            ask_qty=Decimal(str(fields[KEY.ASK_QTY])),
+            bid_price=Decimal(str(fields[KEY.BID_PRICE])),
+            bid_qty=Decimal(str(fields[KEY.BID_QTY])),
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+            timestamp=timestamp,
+            trace=self._get_trace(),
+        ))
 
     def _update_positions(self):
         position = self._exchange.getPosition()
@@ -158,15 +143,14 @@ class PerpetualProtocolWebsocketStream(AbstractStream):
             tags=self._target_tags,
             timestamp=self._timer.Timestamp())
 
-        self._buffer.append(data)
+        self._database.writeEncoded([data])
 
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.ACCOUNT,
-            KEY.PRICE: str(entry_price),
-            KEY.QTY: str(qty),
-            KEY.SYMBOL: self._target_symbol,
-            KEY.EXCHANGE: self._target_exchange,
-        })
+        self._publish(AccountEvent(
+            price=Decimal(str(entry_price)),
+            qty=Decimal(str(qty)),
+            symbol=self._target_symbol,
+            exchange=self._target_exchange,
+        ))
 
         self._logger.warning(f'ACCOUNT UPDATE event registered', event='ACCOUNT',
                              portfolio=qty, entry=entry_price, pnl=pnl)
@@ -178,25 +162,19 @@ class PerpetualProtocolWebsocketStream(AbstractStream):
         funding_rate = self._exchange.getFundingRate()
 
         data = self._database.Encode(fields={KEY.FUNDING_RATE: funding_rate}, timestamp=timestamp)
-        self._buffer.append(data)
+        self._database.writeEncoded([data])
 
-        self._supervisor.Queue.put({
-            QUEUE.QUEUE: QUEUE.MESSAGE,
-            KEY.PAYLOAD: json.dumps({
+        self._publish(MessageEvent(
+            payload={
                 KEY.TYPE: KEY.FUNDING_RATE,
                 KEY.SYMBOL: self._target_symbol,
                 KEY.EXCHANGE: self._target_exchange,
                 KEY.FUNDING_RATE: funding_rate,
-            }, default=custom_dump),
-            KEY.TIMESTAMP: timestamp,
-            KEY.LATENCY: 0,
-        })
+            },
+            timestamp=timestamp,
+        ))
 
     def _update(self):
         self._update_book()
         self._update_positions()
         self._update_funding_rate()
-
-    def _flush_and_update(self):
-        self._update()
-        self._flush()
\ No newline at end of file
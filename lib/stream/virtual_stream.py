@@ -5,6 +5,7 @@ from pprint import pprint
 from typing import Optional, List, Dict, Tuple, Union
 
 from lib.constants import KEY, DB, STATUS, QUEUE
+from lib.event import BookEvent, TradeEvent, CandleEvent, AccountEvent
 from lib.exchange import Order, Book
 from lib.factory import AbstractFactory
 from lib.history import AbstractHistory
@@ -98,46 +99,43 @@ class VirtualStream(AbstractStream):
 
                     self._timer.setTimestamp(_timestamp)
 
-                    items.append({
-                        QUEUE.QUEUE: QUEUE.ORDERBOOK,
-                        KEY.ASK_PRICE: str(item[KEY.ASK_PRICE]),
-                        KEY.ASK_QTY: str(item[KEY.ASK_QTY]),
-                        KEY.BID_PRICE: str(item[KEY.BID_PRICE]),
-                        KEY.BID_QTY: str(item[KEY.BID_QTY]),
-                        KEY.TIMESTAMP: item[KEY.TIMESTAMP],
-                        KEY.LATENCY: item[DB.BOOK_LATENCY],
-                        KEY.SYMBOL: self._symbol,
-                        KEY.EXCHANGE: self._exchange,
-                    })
+                    items.append(BookEvent(
+                        ask_price=Decimal(str(item[KEY.ASK_PRICE])),
+                        ask_qty=Decimal(str(item[KEY.ASK_QTY])),
+                        bid_price=Decimal(str(item[KEY.BID_PRICE])),
+                        bid_qty=Decimal(str(item[KEY.BID_QTY])),
+                        symbol=self._symbol,
+                        exchange=self._exchange,
+                        timestamp=item[KEY.TIMESTAMP],
+                        latency=item[DB.BOOK_LATENCY],
+                    ))
 
                 if item[KEY.CLOSE] is not None:
                     self._timer.setTimestamp(item[KEY.TIMESTAMP])
 
-                    items.append({
-                        QUEUE.QUEUE: QUEUE.CANDLES,
-                        KEY.OPEN: str(item[KEY.OPEN]),
-                        KEY.HIGH: str(item[KEY.HIGH]),
-                        KEY.LOW: str(item[KEY.LOW]),
-                        KEY.CLOSE: str(item[KEY.CLOSE]),
-                        KEY.VOLUME: str(item[KEY.VOLUME]),
-                        KEY.SYMBOL: self._symbol,
-                        KEY.EXCHANGE: self._exchange,
-                        KEY.TIMESTAMP: item[KEY.TIMESTAMP],
-                    })
+                    items.append(CandleEvent(
+                        open=Decimal(str(item[KEY.OPEN])),
+                        high=Decimal(str(item[KEY.HIGH])),
+                        low=Decimal(str(item[KEY.LOW])),
+                        close=Decimal(str(item[KEY.CLOSE])),
+                        volume=Decimal(str(item[KEY.VOLUME])),
+                        symbol=self._symbol,
+                        exchange=self._exchange,
+                        timestamp=item[KEY.TIMESTAMP],
+                    ))
 
                 if item[KEY.PRICE] is not None:
                     self._timer.setTimestamp(item[KEY.TIMESTAMP] + item[DB.TRADE_LATENCY])
 
-                    items.append({
-                        QUEUE.QUEUE: QUEUE.TRADES,
-                        KEY.PRICE: str(item[KEY.PRICE]),
-                        KEY.QTY: str(item[KEY.QTY]),
-                        KEY.SIDE: str(item[KEY.SIDE]),
-                        KEY.TIMESTAMP: item[KEY.TIMESTAMP],
-                        KEY.LATENCY: item[DB.TRADE_LATENCY],
-                        KEY.SYMBOL: self._symbol,
-                        KEY.EXCHANGE: self._exchange,
-                    })
+                    items.append(TradeEvent(
+                        price=Decimal(str(item[KEY.PRICE])),
+                        qty=Decimal(str(item[KEY.QTY])),
+                        side=str(item[KEY.SIDE]),
+                        symbol=self._symbol,
+                        exchange=self._exchange,
+                        timestamp=item[KEY.TIMESTAMP],
+                        latency=item[DB.TRADE_LATENCY],
+                    ))
 
                 for element in items:
                     yield element
@@ -148,7 +146,7 @@ class VirtualStream(AbstractStream):
     #
     ##############################################################################
 
-    def _handle_open_orders_and_create_items(self, product: Tuple[str, str], book: Book, timestamp: int) -> List[dict]:
+    def _handle_open_orders_and_create_items(self, product: Tuple[str, str], book: Book, timestamp: int) -> List[AccountEvent]:
         delete_me = []
         return_me = []
         symbol, exchange = product  # decode Tuple to symbol and exchange
@@ -184,13 +182,12 @@ class VirtualStream(AbstractStream):
                         self._portfolio[product][KEY.QTY] = current_qty + _order.qty
 
                         # Create message
-                        return_me.append({
-                                QUEUE.QUEUE: QUEUE.ACCOUNT,
-                                KEY.PRICE: str(self._portfolio[product][KEY.PRICE]),
-                                KEY.QTY: str(self._portfolio[product][KEY.QTY]),
-                                KEY.SYMBOL: symbol,
-                                KEY.EXCHANGE: exchange,
-                            })
+                        return_me.append(AccountEvent(
+                            price=Decimal(str(self._portfolio[product][KEY.PRICE])),
+                            qty=Decimal(str(self._portfolio[product][KEY.QTY])),
+                            symbol=symbol,
+                            exchange=exchange,
+                        ))
 
                         # We will delete this order from open orders list
                         delete_me.append(id)
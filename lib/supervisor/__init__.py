@@ -1,8 +1,13 @@
 import multiprocessing
 from abc import ABC, abstractmethod
+from typing import Callable, Dict
 
 from bot import AbstractBot
+from lib.constants import KEY
+from lib.defaults import DEFAULT
+from lib.event import BookEvent, TradeEvent, CandleEvent, LevelEvent, AccountEvent, StatusEvent, MessageEvent
 from lib.factory import AbstractFactory
+from lib.ring_buffer import RingBufferQueue
 from lib.timer import AbstractTimer
 
 
@@ -13,8 +18,119 @@ class AbstractSupervisor(ABC):
         self._factory = factory
         self._timer = timer
 
-        self.Queue = multiprocessing.Queue()
+        self.Queue = self._create_queue()
 
     @abstractmethod
     def Run(self, bot: AbstractBot):
-        pass
\ No newline at end of file
+        pass
+
+    def _create_queue(self):
+        """
+        Create events transport between streams and supervisor:
+
+          - `multiprocessing.Queue` by default
+
+          - shared memory ring buffer if config has `transport: {type: ring}`
+        """
+        transport = self._config.get(KEY.TRANSPORT, None) or {}
+
+        if transport.get(KEY.TYPE, None) == KEY.RING:
+            return RingBufferQueue(size=int(transport.get(KEY.SIZE, None) or DEFAULT.RING_SIZE))
+
+        return multiprocessing.Queue()
+
+    def _get_handlers(self, bot: AbstractBot) -> Dict[type, Callable]:
+        """
+        Create dispatch table: event type --> bot handler
+
+        Events are already decoded by producers, so handlers only map
+        event fields to bot callback arguments
+        """
+        timer = self._timer
+
+        def on_book(event: BookEvent):
+            bot.onOrderbook(
+                askPrice=event.ask_price,
+                askQty=event.ask_qty,
+                bidPrice=event.bid_price,
+                bidQty=event.bid_qty,
+                symbol=event.symbol,
+                exchange=event.exchange,
+                latency=event.latency,
+                timestamp=event.timestamp,
+            )
+
+        def on_trade(event: TradeEvent):
+            bot.onTrade(
+                price=event.price,
+                qty=event.qty,
+                side=event.side,
+                symbol=event.symbol,
+                exchange=event.exchange,
+                latency=event.latency,
+                timestamp=event.timestamp,
+            )
+
+        def on_candle(event: CandleEvent):
+            bot.onCandle(
+                open=event.open,
+                high=event.high,
+                low=event.low,
+                close=event.close,
+                volume=event.volume,
+                symbol=event.symbol,
+                exchange=event.exchange,
+                finished=event.finished,
+                timestamp=event.timestamp,
+            )
+
+        def on_level(event: LevelEvent):
+            bot.onSnapshot(
+                asks=event.asks,
+                bids=event.bids,
+                symbol=event.symbol,
+                exchange=event.exchange,
+                timestamp=event.timestamp,
+            )
+
+        def on_account(event: AccountEvent):
+            bot.onAccount(
+                price=event.price,
+                qty=event.qty,
+                symbol=event.symbol,
+                exchange=event.exchange,
+                timestamp=timer.Timestamp(),
+            )
+
+        def on_status(event: StatusEvent):
+            bot.onStatus(
+                orderId=event.order_id,
+                status=event.status,
+                price=event.price,
+                qty=event.qty,
+                pct=event.pct,
+                symbol=event.symbol,
+                exchange=event.exchange,
+                timestamp=timer.Timestamp(),
+                tradeId=event.trade_id,
+            )
+
+        def on_message(event: MessageEvent):
+            try:
+                bot.onMessage(
+                    message=event.payload,
+                    timestamp=event.timestamp,
+                    latency=event.latency,
+                )
+            except:
+                pass
+
+        return {
+            BookEvent: on_book,
+            TradeEvent: on_trade,
+            CandleEvent: on_candle,
+            LevelEvent: on_level,
+            AccountEvent: on_account,
+            StatusEvent: on_status,
+            MessageEvent: on_message,
+        }
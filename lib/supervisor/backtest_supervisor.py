@@ -1,15 +1,12 @@
-import json
 from datetime import datetime
-from decimal import Decimal
 from typing import Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from bot import AbstractBot
-from lib.constants import KEY, QUEUE
+from lib.constants import KEY
 from lib.defaults import DEFAULT
 from lib.factory import AbstractFactory
-from lib.helpers import custom_load
 from lib.stream.virtual_stream import VirtualStream
 from lib.supervisor import AbstractSupervisor
 from lib.timer import AbstractTimer
@@ -28,60 +25,7 @@ class BacktestSupervisor(AbstractSupervisor):
         self._timer.setTimestamp(self._start_timestamp)
 
     def Run(self, bot: AbstractBot):
-        for item in self._stream.Run(self._start_timestamp, self._end_timestamp):
-            if item[QUEUE.QUEUE] == QUEUE.ORDERBOOK:
-                bot.onOrderbook(
-                    askPrice=Decimal(item[KEY.ASK_PRICE]),
-                    askQty=Decimal(item[KEY.ASK_QTY]),
-                    bidPrice=Decimal(item[KEY.BID_PRICE]),
-                    bidQty=Decimal(item[KEY.BID_QTY]),
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    latency=item[KEY.LATENCY],
-                    timestamp=item[KEY.TIMESTAMP]
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.TRADES:
-                bot.onTrade(
-                    price=Decimal(item[KEY.PRICE]),
-                    qty=Decimal(item[KEY.QTY]),
-                    side=item[KEY.SIDE],
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    latency=item[KEY.LATENCY],
-                    timestamp=item[KEY.TIMESTAMP]
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.CANDLES:
-                bot.onCandle(
-                    open=Decimal(item[KEY.OPEN]),
-                    high=Decimal(item[KEY.HIGH]),
-                    low=Decimal(item[KEY.LOW]),
-                    close=Decimal(item[KEY.CLOSE]),
-                    volume=Decimal(item[KEY.VOLUME]),
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    finished=True,
-                    timestamp=item[KEY.TIMESTAMP]
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.ACCOUNT:
-                bot.onAccount(
-                    price=Decimal(item[KEY.PRICE]),
-                    qty=Decimal(item[KEY.QTY]),
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    timestamp=self._timer.Timestamp(),
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.MESSAGE:
-                try:
-                    payload = json.loads(item[KEY.PAYLOAD], object_hook=custom_load)
-                    bot.onMessage(
-                        message=payload,
-                        timestamp=item[KEY.TIMESTAMP],
-                        latency=item[KEY.LATENCY],
-                    )
-                except:
-                    pass
+        handlers = self._get_handlers(bot)
 
+        for item in self._stream.Run(self._start_timestamp, self._end_timestamp):
+            handlers[type(item)](item)
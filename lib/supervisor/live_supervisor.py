@@ -1,19 +1,39 @@
-import json
+import queue
+import time
 from datetime import datetime
-from decimal import Decimal
-from typing import Optional
+from typing import Optional, List, Dict, Callable
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from bot import AbstractBot
-from lib.constants import KEY, QUEUE
+from lib.constants import KEY, DB, MAX_BATCH
 from lib.defaults import DEFAULT
-from lib.helpers import custom_load
+from lib.event import BookEvent, LevelEvent, EVENT_QUEUE
+from lib.factory import AbstractFactory
 from lib.supervisor import AbstractSupervisor
+from lib.timer import AbstractTimer
+from lib.tracer import TRACER, STAGE
 from lib.watchdog import Watchdog
 
+# Only these events could be replaced by newer one for the same (symbol, exchange)
+CONFLATED_EVENTS = (BookEvent, LevelEvent)
+
+CONFLATION_REPORT_MINUTES = 1
+
 
 class LiveSupervisor(AbstractSupervisor):
+    def __init__(self, config: dict, factory: AbstractFactory, timer: AbstractTimer):
+        super().__init__(config, factory, timer)
+
+        self._conflation = bool(self._config.get(KEY.CONFLATION, False))
+
+        # How many book/level updates were dropped because newer one was in the queue
+        self.Conflated = 0
+
+        self._trace = bool(self._config.get(KEY.TRACE, False))
+        if self._trace:
+            TRACER.Enable()
+
     def Run(self, bot: AbstractBot, watchdog: Optional[Watchdog] = None):
         self._watchdog = watchdog
 
@@ -40,99 +60,113 @@ class LiveSupervisor(AbstractSupervisor):
             start_date=start_date,
             max_instances=1,
         )
+
+        if self._conflation or self._trace:
+            self._database = self._factory.Database(self._config, self._factory, self._timer)
+
+        if self._conflation:
+            scheduler.add_job(
+                self._report_conflated,
+                "interval",
+                minutes=CONFLATION_REPORT_MINUTES,
+                start_date=start_date,
+                max_instances=1,
+            )
+
+        if self._trace:
+            scheduler.add_job(
+                self._flush_trace,
+                "interval",
+                seconds=DEFAULT.TRACE_FLUSH_SECONDS,
+                start_date=start_date,
+                max_instances=1,
+            )
+
         scheduler.start()
 
         ###############################################################
         # Run message loop
         ###############################################################
+        handlers = self._get_handlers(bot)
+
         while True:
             """
-            NOTE: onTime message not available now: 
-            
+            NOTE: onTime message not available now:
+
                   Reason: to decrease CPU load
-                  
+
                   Solution: May be change to "onSecond" behaviour and send them every second. TBD/
             """
-            item = self.Queue.get()
+            items = self._get_conflated() if self._conflation else [self.Queue.get()]
 
-            if self._watchdog is not None:
-                if self._watchdog.shutdown_in_progress:
-                    break
-
-            if item[QUEUE.QUEUE] == QUEUE.ORDERBOOK:
-                bot.onOrderbook(
-                    askPrice=Decimal(item[KEY.ASK_PRICE]),
-                    askQty=Decimal(item[KEY.ASK_QTY]),
-                    bidPrice=Decimal(item[KEY.BID_PRICE]),
-                    bidQty=Decimal(item[KEY.BID_QTY]),
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    latency=item[KEY.LATENCY],
-                    timestamp=item[KEY.TIMESTAMP],
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.TRADES:
-                bot.onTrade(
-                    price=Decimal(item[KEY.PRICE]),
-                    qty=Decimal(item[KEY.QTY]),
-                    side=item[KEY.SIDE],
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    latency=item[KEY.LATENCY],
-                    timestamp=item[KEY.TIMESTAMP],
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.ACCOUNT:
-                bot.onAccount(
-                    price=Decimal(item[KEY.PRICE]),
-                    qty=Decimal(item[KEY.QTY]),
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    timestamp=self._timer.Timestamp(),
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.STATUS:
-                bot.onStatus(
-                    orderId=item[KEY.ORDER_ID],
-                    status=item[KEY.STATUS],
-                    price=Decimal(item[KEY.PRICE]),
-                    qty=Decimal(item[KEY.QTY]),
-                    pct=Decimal(item[KEY.PCT]),
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    timestamp=self._timer.Timestamp(),
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.CANDLES:
-                bot.onCandle(
-                    open=Decimal(item[KEY.OPEN]),
-                    high=Decimal(item[KEY.HIGH]),
-                    low=Decimal(item[KEY.LOW]),
-                    close=Decimal(item[KEY.CLOSE]),
-                    volume=Decimal(item[KEY.VOLUME]),
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    finished=item[KEY.FINISHED],
-                    timestamp=item[KEY.TIMESTAMP],
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.LEVEL:
-                payload = json.loads(item[KEY.PAYLOAD], object_hook=custom_load)
-                bot.onSnapshot(
-                    asks=payload[KEY.ASKS],
-                    bids=payload[KEY.BIDS],
-                    symbol=item[KEY.SYMBOL],
-                    exchange=item[KEY.EXCHANGE],
-                    timestamp=item[KEY.TIMESTAMP],
-                )
-
-            elif item[QUEUE.QUEUE] == QUEUE.MESSAGE:
-                try:
-                    payload = json.loads(item[KEY.PAYLOAD], object_hook=custom_load)
-                    bot.onMessage(
-                        message=payload,
-                        timestamp=item[KEY.TIMESTAMP],
-                        latency=item[KEY.LATENCY],
-                    )
-                except:
-                    pass
+            for item in items:
+                if self._watchdog is not None:
+                    if self._watchdog.shutdown_in_progress:
+                        return
+
+                if self._trace:
+                    self._dispatch_traced(handlers, item)
+                else:
+                    handlers[type(item)](item)
+
+    def _get_conflated(self) -> List:
+        """
+        Wait for the first event and drain everything already queued (up to MAX_BATCH).
+
+        Book and Level events are conflated: only the latest one per (symbol, exchange)
+        is kept, on the position of the latest one. All other events (trades, status,
+        account, messages...) are kept in original order.
+        """
+        batch, latest = [], dict()
+
+        item = self.Queue.get()
+
+        while True:
+            if isinstance(item, CONFLATED_EVENTS):
+                key = (type(item), item.symbol, item.exchange)
+
+                idx = latest.get(key, None)
+                if idx is not None:
+                    batch[idx] = None
+                    self.Conflated += 1
+
+                latest[key] = len(batch)
+
+            batch.append(item)
+
+            if len(batch) >= MAX_BATCH:
+                break
+
+            try:
+                item = self.Queue.get_nowait()
+            except queue.Empty:
+                break
+
+        return [x for x in batch if x is not None]
+
+    def _dispatch_traced(self, handlers: Dict[type, Callable], item):
+        kind = EVENT_QUEUE.get(type(item), None)
+        start = time.perf_counter_ns()
+
+        trace = getattr(item, 'trace', None)
+        if trace is not None:
+            received, created = trace
+            TRACER.Add(STAGE.PARSE, kind, created - received)
+            TRACER.Add(STAGE.QUEUE, kind, start - created)
+
+        handlers[type(item)](item)
+
+        TRACER.Add(STAGE.BOT, kind, time.perf_counter_ns() - start)
+
+    def _flush_trace(self):
+        fields = TRACER.Pop()
+        if fields:
+            payload = self._database.Encode(fields=fields, timestamp=self._timer.Timestamp())
+            self._database.writeEncoded([payload])
+
+    def _report_conflated(self):
+        payload = self._database.Encode(
+            fields={DB.CONFLATED: self.Conflated},
+            timestamp=self._timer.Timestamp(),
+        )
+        self._database.writeEncoded([payload])
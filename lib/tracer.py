@@ -0,0 +1,80 @@
+"""
+Process-wide latency tracer
+
+Every measure is `time.perf_counter_ns` delta (monotonic and same for all
+processes on the host) grouped by (stage, kind):
+
+  - parse: websocket message received --> event created (stream process)
+
+  - queue: event created --> event taken by supervisor loop (put + wait + get)
+
+  - bot: bot handler duration
+
+  - order: exchange REST request duration, kind is request method
+    (`ws_{method}` for orders sent over websocket API)
+
+  - dispatch: wait in order/ejector executor queue, kind is priority
+
+Samples are kept in bounded deques and converted to p50/p99/max/count
+fields by `Pop`, which LiveSupervisor flushes to database periodically.
+Tracer does nothing until `Enable` is called (`trace: true` in config).
+"""
+import threading
+from collections import deque
+from typing import Dict, Tuple
+
+MAX_SAMPLES = 10_000
+
+
+class STAGE:
+    PARSE = "parse"
+    QUEUE = "queue"
+    BOT = "bot"
+    ORDER = "order"
+    DISPATCH = "dispatch"
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self._samples: Dict[Tuple[str, str], deque] = dict()
+        self._lock = threading.Lock()  # Add (any thread) vs swap in Pop
+
+    def Enable(self):
+        self.enabled = True
+
+    def Add(self, stage: str, kind: str, value: int):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            samples = self._samples.get((stage, kind), None)
+            if samples is None:
+                samples = self._samples[(stage, kind)] = deque(maxlen=MAX_SAMPLES)
+            samples.append(value)
+
+    def Pop(self) -> Dict[str, int]:
+        """
+        Return aggregated fields since previous call and clear samples
+
+        :return: {'_trace_{stage}_{kind}_p50': ..., '_p99', '_max', '_count'}
+        """
+        with self._lock:
+            samples, self._samples = self._samples, dict()
+
+        fields = dict()
+        for (stage, kind), values in samples.items():
+            values = sorted(values)
+            if not values:
+                continue
+
+            prefix = f'_trace_{stage}_{kind}'
+            fields[f'{prefix}_p50'] = values[len(values) // 2]
+            fields[f'{prefix}_p99'] = values[min(len(values) - 1, int(len(values) * 0.99))]
+            fields[f'{prefix}_max'] = values[-1]
+            fields[f'{prefix}_count'] = len(values)
+
+        return fields
+
+
+TRACER = Tracer()
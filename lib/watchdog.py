@@ -6,6 +6,8 @@ import traceback
 
 import psutil
 
+from lib.database.batch_writer import flush_all
+from lib.database.recorder import flush_all as flush_recorders
 from lib.factory import AbstractFactory
 from lib.logger import AbstractLogger
 from lib.timer import AbstractTimer
@@ -47,6 +49,10 @@ class Watchdog:
             except Exception as e:
                 sys.stderr.write(f'Shutdown Error: {e}, Traceback: {traceback.format_exc()}')
 
+        # os._exit skips atexit: write pending logs/metrics (with ones from handlers) and market data now
+        flush_all()
+        flush_recorders()
+
         pid = os.getpid()
         parent = psutil.Process(pid)
         children = parent.children(recursive=True)
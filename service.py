@@ -38,25 +38,41 @@ if __name__ == "__main__":
     watchdog = Watchdog(config, factory, timer)
     watchdog.addHandler(bot.Clean)
     watchdog.addHandler(messages.Close)
+    watchdog.addHandler(supervisor.Queue.close)
 
     merger = Merger([(list, "override"), (dict, "merge")], ["override"], ["override"])
+    websocket_streams = []
     for exchange, symbols in config[KEY.SUBSCRIPTION].items():
-        # Create and run websocket datasource
-
-        stream = get_stream(config, exchange=exchange)(
-            config=merger.merge(
-                config,
-                {KEY.SYMBOL: symbols[0], KEY.SYMBOLS: symbols, KEY.EXCHANGE: exchange},
-            ),
-            supervisor=supervisor,
-            factory=factory,
-            timer=timer,
-        )
-
-        if stream.__class__.__name__ == "PerpetualProtocolWebsocketStream":
-            threading.Thread(target=stream.Run, daemon=True).start()
-        else:
-            multiprocessing.Process(target=stream.Run, daemon=True).start()
+        stream_class = get_stream(config, exchange=exchange)
+
+        # One connection for all symbols if stream supports it, otherwise stream per symbol
+        groups = [symbols] if stream_class.MULTI_SYMBOL else [[x] for x in symbols]
+
+        for group in groups:
+            # Create and run websocket datasource
+            stream = stream_class(
+                config=merger.merge(
+                    config,
+                    {KEY.SYMBOL: group[0], KEY.SYMBOLS: group, KEY.EXCHANGE: exchange},
+                ),
+                supervisor=supervisor,
+                factory=factory,
+                timer=timer,
+            )
+
+            if stream.__class__.__name__ == "PerpetualProtocolWebsocketStream":
+                threading.Thread(target=stream.Run, daemon=True).start()
+            elif config.get(KEY.ENGINE, None) == KEY.ASYNC and stream_class.SUPPORTS_ASYNC:
+                websocket_streams.append(stream)
+            else:
+                multiprocessing.Process(target=stream.Run, daemon=True).start()
+
+    # All websocket streams in one process with asyncio event loop
+    if websocket_streams:
+        from lib.stream.async_engine import AsyncStreamEngine
+
+        engine = AsyncStreamEngine(config, websocket_streams, factory, timer)
+        multiprocessing.Process(target=engine.Run, daemon=True).start()
 
     # Run bot
     supervisor.Run(bot, watchdog)
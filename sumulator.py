@@ -14,7 +14,7 @@ if __name__ == '__main__':
 
     config = create_subscriptions(config)
 
-    factory, timer = BacktestFactory(), VirtualTimer()
+    factory, timer = BacktestFactory(config), VirtualTimer()
 
     supervisor = BacktestSupervisor(config, factory, timer)
 
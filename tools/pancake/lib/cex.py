@@ -10,6 +10,7 @@ from http import HTTPStatus
 from typing import Dict, List, Optional, Tuple, Union
 
 import requests
+from lib.instruments import get_instruments
 from tools.pancake.lib.constants import CONSTANTS, KEY, ExecutionReport
 from tools.pancake.lib.lib import execute_order, timeit
 
@@ -50,13 +51,18 @@ class Cex:
             print(f'No "key" or "secret" found: {config}')
             exit(-1)
 
-        self._exchange_info = self._get_exchange_info()
+        # Same instruments cache as `BINANCE.SPOT` exchange in bots
+        self._instruments = get_instruments(
+            "BINANCE.SPOT", lambda: self._get_exchange_info()["symbols"]
+        )
 
-        self.reference = self._get_reference(self._exchange_info)
+        self.reference = self._get_reference(self._instruments)
 
-    def _get_reference(self, exchange_info: dict) -> Dict[str, Dict[str, float]]:
+    def _get_reference(
+        self, instruments: Dict[str, dict]
+    ) -> Dict[str, Dict[str, float]]:
         return_me = {}
-        for item in exchange_info["symbols"]:
+        for item in instruments.values():
             return_me[item["symbol"]] = {}
 
             return_me[item["symbol"]][KEY.QUOTE_PRECISION] = int(